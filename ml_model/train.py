@@ -4,18 +4,69 @@ Week 6: Train RandomForest model with comprehensive features
 """
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import train_test_split, KFold, ParameterGrid, cross_val_score
+from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor, GradientBoostingRegressor
+from sklearn.linear_model import Ridge
 from sklearn.metrics import mean_squared_error, r2_score
 import joblib, json
+import argparse
+import hashlib
 import os
+import random
 import sys
+import time
 
 # Add project root to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def train_model(dataset_path="dataset.csv", output_dir="."):
-    """Train RandomForest model with comprehensive evaluation"""
+# Default production model configuration
+DEFAULT_MODEL_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+    'random_state': 42
+}
+
+# Model families available to the hyperparameter search
+MODEL_FAMILIES = {
+    'random_forest': RandomForestRegressor,
+    'extra_trees': ExtraTreesRegressor,
+    'gradient_boosting': GradientBoostingRegressor,
+    'ridge': Ridge,
+}
+
+# Default search space: family -> parameter grid
+DEFAULT_SEARCH_SPACE = {
+    'random_forest': {
+        'n_estimators': [100, 200],
+        'max_depth': [None, 10, 20],
+        'min_samples_split': [2, 5],
+        'min_samples_leaf': [1, 2],
+    },
+    'extra_trees': {
+        'n_estimators': [100, 200],
+        'max_depth': [None, 10],
+        'min_samples_leaf': [1, 2],
+    },
+    'gradient_boosting': {
+        'n_estimators': [100, 200],
+        'learning_rate': [0.05, 0.1],
+        'max_depth': [2, 3],
+    },
+    'ridge': {
+        'alpha': [0.1, 1.0, 10.0],
+    },
+}
+
+# Search metric -> (sklearn scorer name, sign to turn the scorer into the reported value)
+SEARCH_METRICS = {
+    'r2': ('r2', 1),
+    'mse': ('neg_mean_squared_error', -1),
+}
+
+def load_dataset(dataset_path):
+    """Load dataset CSV and split it into features and target"""
     
     # Check if dataset exists
     if not os.path.exists(dataset_path):
@@ -47,50 +98,162 @@ def train_model(dataset_path="dataset.csv", output_dir="."):
     # Handle missing values
     X = X.fillna(0)
     
-    # Split data
+    return X, y, feature_columns
+
+def _stratify_bins(y, bins=5):
+    """Score bins for a stratified split, or None when a bin is too small to split"""
+    binned = pd.cut(y, bins=bins, labels=False)
+    if binned.value_counts().min() < 2:
+        return None
+    return binned
+
+def build_model(family='random_forest', params=None, n_jobs=None):
+    """Instantiate a model family with the given parameters"""
+    model_class = MODEL_FAMILIES[family]
+    params = dict(params or {})
+    supported = model_class().get_params()
+    if n_jobs is not None and 'n_jobs' in supported:
+        params['n_jobs'] = n_jobs
+    if 'random_state' in supported:
+        params.setdefault('random_state', 42)
+    return model_class(**params)
+
+def _search_candidates(search_space, n_iter=None, random_state=42):
+    """Expand the search space into (family, params) candidates, optionally sampled"""
+    candidates = [
+        (family, params)
+        for family, grid in search_space.items()
+        for params in ParameterGrid(grid)
+    ]
+    if n_iter is not None and n_iter < len(candidates):
+        candidates = random.Random(random_state).sample(candidates, n_iter)
+    return candidates
+
+def _evaluate_candidate(family, params, X, y, cv, metric):
+    """Cross-validate one candidate; runs inside a search worker"""
+    scorer, sign = SEARCH_METRICS[metric]
+    start = time.perf_counter()
+    # One core per candidate: the search itself is what runs in parallel
+    model = build_model(family, params, n_jobs=1)
+    scores = cross_val_score(model, X, y, cv=cv, scoring=scorer, error_score=np.nan)
+    scores = sign * scores
+    return {
+        "family": family,
+        "params": params,
+        "cv_mean": float(np.nanmean(scores)) if not np.all(np.isnan(scores)) else None,
+        "cv_std": float(np.nanstd(scores)) if not np.all(np.isnan(scores)) else None,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+def search_models(X, y, search_space=None, metric='r2', cv=5, n_jobs=-1,
+                  time_budget=None, n_iter=None, random_state=42):
+    """Cross-validated search over model families and hyperparameters in parallel.
+
+    Candidates are dispatched in rounds of one candidate per worker; once the
+    time budget is spent no further rounds are started.
+    """
+    search_space = search_space or DEFAULT_SEARCH_SPACE
+    unknown = set(search_space) - set(MODEL_FAMILIES)
+    if unknown:
+        raise ValueError(f"Unknown model families: {sorted(unknown)}")
+    
+    candidates = _search_candidates(search_space, n_iter, random_state)
+    folds = KFold(n_splits=max(2, min(cv, len(X))), shuffle=True, random_state=random_state)
+    workers = joblib.effective_n_jobs(n_jobs)
+    
+    print(f"Searching {len(candidates)} candidates with {folds.get_n_splits()}-fold CV on {workers} workers...")
+    start = time.perf_counter()
+    trials = []
+    with joblib.Parallel(n_jobs=workers) as parallel:
+        for i in range(0, len(candidates), workers):
+            if time_budget is not None and time.perf_counter() - start >= time_budget:
+                print(f"Time budget of {time_budget}s reached, stopping search.")
+                break
+            batch = candidates[i:i + workers]
+            trials += parallel(
+                joblib.delayed(_evaluate_candidate)(family, params, X, y, folds, metric)
+                for family, params in batch
+            )
+    
+    # Higher is better for r2, lower for mse
+    lower_is_better = SEARCH_METRICS[metric][1] < 0
+    scored = [t for t in trials if t["cv_mean"] is not None]
+    if not scored:
+        raise ValueError("No search candidate produced a valid cross-validation score")
+    best = (min if lower_is_better else max)(scored, key=lambda t: t["cv_mean"])
+    
+    summary = {
+        "metric": metric,
+        "cv_folds": folds.get_n_splits(),
+        "n_jobs": workers,
+        "time_budget": time_budget,
+        "seconds": round(time.perf_counter() - start, 3),
+        "n_candidates": len(candidates),
+        "n_evaluated": len(trials),
+        "best": best,
+        "trials": trials,
+    }
+    return best, summary
+
+def dataset_fingerprint(dataset_path, chunksize=50000):
+    """Order-independent SHA-256 of the dataset contents, computed chunk by chunk"""
+    row_sum, row_xor, n_rows, columns = 0, 0, 0, None
+    for chunk in iter_dataset_chunks(dataset_path, chunksize):
+        columns = list(chunk.columns)
+        hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy(dtype=np.uint64)
+        # Sum and xor are commutative, so row order does not matter
+        row_sum = (row_sum + int(hashes.sum(dtype=np.uint64))) % 2**64
+        row_xor ^= int(np.bitwise_xor.reduce(hashes)) if len(hashes) else 0
+        n_rows += len(hashes)
+    digest = hashlib.sha256(",".join(columns or []).encode())
+    digest.update(f"{n_rows}:{row_sum}:{row_xor}".encode())
+    return digest.hexdigest()
+
+def split_dataset(X, y):
+    """Hold out 20% of the rows for evaluation"""
     X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=pd.cut(y, bins=5, labels=False)
+        X, y, test_size=0.2, random_state=42, stratify=_stratify_bins(y)
     )
     
     print(f"Training set: {X_train.shape[0]} samples")
     print(f"Test set: {X_test.shape[0]} samples")
-    
-    # Initialize and train model
-    model_params = {
-        'n_estimators': 100,
-        'max_depth': 10,
-        'min_samples_split': 5,
-        'min_samples_leaf': 2,
-        'random_state': 42
-    }
-    
-    print("Training RandomForest model...")
-    model = RandomForestRegressor(**model_params)
-    
-    # Train on full training set
-    model.fit(X_train, y_train)
+    return X_train, X_test, y_train, y_test
+
+def evaluate_and_save(model, feature_columns, X_test, y_test, metrics, output_dir="."):
+    """Score the model on the held-out rows, print a report and save model.pkl/metrics.json"""
     
     # Predictions
     y_pred = model.predict(X_test)
     
     # Calculate metrics
-    metrics = {
-        "mse": float(mean_squared_error(y_test, y_pred)),
-        "r2": float(r2_score(y_test, y_pred)),
-        "n_train": int(len(X_train)),
-        "n_test": int(len(X_test))
-    }
+    metrics["mse"] = float(mean_squared_error(y_test, y_pred))
+    metrics["r2"] = float(r2_score(y_test, y_pred))
+    metrics["rmse"] = float(np.sqrt(metrics["mse"]))
+    
+    return report_and_save(model, feature_columns, metrics, output_dir)
+
+def report_and_save(model, feature_columns, metrics, output_dir="."):
+    """Print the training report and save model.pkl/metrics.json"""
     
-    # Feature importance
-    feature_importance = dict(zip(feature_columns, model.feature_importances_))
+    # Feature importance (linear families expose coefficients instead)
+    estimator = getattr(model, '_final_estimator', model)
+    importances = getattr(estimator, 'feature_importances_', None)
+    if importances is None:
+        importances = np.abs(getattr(estimator, 'coef_', np.zeros(len(feature_columns))))
+    feature_importance = dict(zip(feature_columns, (float(v) for v in importances)))
     feature_importance = dict(sorted(feature_importance.items(), key=lambda x: x[1], reverse=True))
     
     # Print results
     print("\n" + "="*50)
     print("MODEL TRAINING RESULTS")
     print("="*50)
-    print(f"Mean Squared Error: {metrics['mse']:.2f}")
-    print(f"R² Score: {metrics['r2']:.3f}")
+    if metrics.get('mse') is not None:
+        print(f"Mean Squared Error: {metrics['mse']:.2f}")
+        print(f"R² Score: {metrics['r2']:.3f}")
+        if metrics.get('optimistic_evaluation'):
+            print("(Optimistic: earlier trees may have been trained on the held-out rows.)")
+    else:
+        print("No held-out rows, model was not evaluated.")
     
     print("\nFEATURE IMPORTANCE:")
     for feature, importance in feature_importance.items():
@@ -109,9 +272,311 @@ def train_model(dataset_path="dataset.csv", output_dir="."):
     
     return model, metrics, feature_importance
 
+def train_model(dataset_path="dataset.csv", output_dir=".", search=False, search_space=None,
+                metric='r2', cv=5, n_jobs=-1, time_budget=None, n_iter=None,
+                model_family='random_forest', model_params=None):
+    """Train RandomForest model with comprehensive evaluation.
+
+    With ``search=True`` the model family and hyperparameters are picked by a
+    parallel cross-validated search instead of the default configuration;
+    otherwise ``model_family``/``model_params`` are trained as given.
+    """
+    
+    loaded = load_dataset(dataset_path)
+    if loaded is None:
+        return None
+    X, y, feature_columns = loaded
+    
+    # Split data
+    X_train, X_test, y_train, y_test = split_dataset(X, y)
+    
+    # Initialize and train model
+    search_summary = None
+    if search:
+        best, search_summary = search_models(
+            X_train, y_train, search_space=search_space, metric=metric, cv=cv,
+            n_jobs=n_jobs, time_budget=time_budget, n_iter=n_iter
+        )
+        model_family, model_params = best["family"], best["params"]
+        print(f"Best candidate: {model_family} {model_params} (CV {metric}: {best['cv_mean']:.3f})")
+    elif model_params is None:
+        model_params = DEFAULT_MODEL_PARAMS if model_family == 'random_forest' else {}
+    
+    print(f"Training {model_family} model...")
+    model = build_model(model_family, model_params, n_jobs=n_jobs)
+    
+    # Train on full training set
+    fit_start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - fit_start
+    
+    metrics = {
+        "n_train": int(len(X_train)),
+        "n_test": int(len(X_test)),
+        "model_family": model_family,
+        "model_params": model_params,
+        "fit_seconds": round(fit_seconds, 3),
+        "data_fingerprint": dataset_fingerprint(dataset_path),
+    }
+    if hasattr(model, 'estimators_'):
+        # Per-tree cost of a from-scratch fit, used to report incremental savings
+        metrics["fit_seconds_per_tree"] = fit_seconds / len(model.estimators_)
+    if search_summary is not None:
+        metrics["search"] = search_summary
+    
+    return evaluate_and_save(model, feature_columns, X_test, y_test, metrics, output_dir)
+
+def train_incremental(dataset_path, previous_model_path, previous_metrics=None, output_dir=".",
+                      add_trees=25, max_trees=None, n_jobs=-1):
+    """Grow the previous forest with trees fitted on the current dataset.
+
+    The existing trees are kept and ``add_trees`` new ones are fitted via
+    ``warm_start``; with ``max_trees`` the oldest trees are dropped so stale
+    data ages out. Falls back to a full ``train_model`` when the previous
+    model cannot be warm-started (missing, other family or other features).
+
+    The held-out rows are a fresh split, so the old trees may have been
+    trained on some of them: the reported scores are optimistic and
+    metrics.json says so (``optimistic_evaluation``).
+    """
+    previous_metrics = previous_metrics or {}
+    
+    loaded = load_dataset(dataset_path)
+    if loaded is None:
+        return None
+    X, y, feature_columns = loaded
+    
+    model = joblib.load(previous_model_path) if os.path.exists(previous_model_path) else None
+    warm_startable = (
+        isinstance(model, (RandomForestRegressor, ExtraTreesRegressor))
+        and list(getattr(model, 'feature_names_in_', [])) == feature_columns
+    )
+    if not warm_startable:
+        print("Previous model cannot be warm-started, running a full retrain.")
+        return train_model(dataset_path, output_dir, n_jobs=n_jobs)
+    
+    X_train, X_test, y_train, y_test = split_dataset(X, y)
+    
+    previous_trees = len(model.estimators_)
+    if max_trees is not None and previous_trees + add_trees > max_trees:
+        # Drop the oldest trees to make room for the new ones
+        keep = max(max_trees - add_trees, 0)
+        model.estimators_ = model.estimators_[len(model.estimators_) - keep:]
+    
+    print(f"Adding {add_trees} trees to a forest of {len(model.estimators_)}...")
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + add_trees, n_jobs=n_jobs)
+    
+    fit_start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - fit_start
+    model.set_params(warm_start=False)
+    
+    # A from-scratch fit of a forest this size, based on the last full fit's per-tree cost
+    per_tree = previous_metrics.get("fit_seconds_per_tree")
+    full_fit_estimate = per_tree * len(model.estimators_) if per_tree else None
+    
+    metrics = {
+        "n_train": int(len(X_train)),
+        "n_test": int(len(X_test)),
+        "model_family": previous_metrics.get("model_family", "random_forest"),
+        "model_params": previous_metrics.get("model_params", {}),
+        "fit_seconds": round(fit_seconds, 3),
+        "data_fingerprint": dataset_fingerprint(dataset_path),
+        # The kept trees may have seen the held-out rows in an earlier fit
+        "optimistic_evaluation": True,
+        "incremental": {
+            "previous_trees": previous_trees,
+            "added_trees": add_trees,
+            "total_trees": len(model.estimators_),
+            "full_fit_seconds_estimate": round(full_fit_estimate, 3) if full_fit_estimate else None,
+            "seconds_saved": round(full_fit_estimate - fit_seconds, 3) if full_fit_estimate else None,
+        },
+    }
+    if per_tree:
+        metrics["fit_seconds_per_tree"] = per_tree
+    
+    return evaluate_and_save(model, feature_columns, X_test, y_test, metrics, output_dir)
+
+def iter_dataset_chunks(dataset_path, chunksize=50000):
+    """Stream a CSV or Parquet dataset as DataFrames of at most `chunksize` rows"""
+    if str(dataset_path).endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet datasets requires pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(dataset_path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(dataset_path, chunksize=chunksize)
+
+def _holdout_mask(chunk, start_row, holdout_fraction):
+    """Deterministic per-row holdout, keyed on student_id when present"""
+    if 'student_id' in chunk.columns:
+        keys = chunk['student_id'].to_numpy(dtype=np.uint64)
+    else:
+        keys = np.arange(start_row, start_row + len(chunk), dtype=np.uint64)
+    # Multiplicative hash spreads consecutive ids evenly across buckets
+    buckets = (keys * np.uint64(2654435761)) % np.uint64(1000)
+    return buckets < int(holdout_fraction * 1000)
+
+def _iter_split_chunks(dataset_path, chunksize, holdout_fraction):
+    """Yield (X_train, y_train, X_test, y_test, feature_columns) per chunk"""
+    start_row = 0
+    for chunk in iter_dataset_chunks(dataset_path, chunksize):
+        if 'score' not in chunk.columns:
+            raise ValueError("Missing required columns: ['score']")
+        feature_columns = [col for col in chunk.columns if col not in ['student_id', 'score']]
+        test = _holdout_mask(chunk, start_row, holdout_fraction)
+        start_row += len(chunk)
+        X = chunk[feature_columns].fillna(0)
+        y = chunk["score"]
+        yield X[~test], y[~test], X[test], y[test], feature_columns
+
+def train_streaming(dataset_path="dataset.csv", output_dir=".", chunksize=50000, learner='forest',
+                    trees_per_chunk=10, epochs=5, holdout_fraction=0.2, n_jobs=-1):
+    """Train without loading the dataset into memory.
+
+    The dataset is read in chunks of ``chunksize`` rows, so peak memory is
+    bounded by the chunk size plus the model:
+
+    * ``forest``: each chunk grows the forest by ``trees_per_chunk`` trees
+      via ``warm_start`` (a bagged forest over chunks).
+    * ``sgd``: a StandardScaler and SGDRegressor trained with
+      ``partial_fit`` over ``epochs`` passes.
+
+    A deterministic holdout (hashed on student_id) is evaluated in a final
+    streaming pass.
+    """
+    if not os.path.exists(dataset_path):
+        print(f"Error: Dataset file '{dataset_path}' not found!")
+        return None
+    
+    print(f"Streaming {dataset_path} in chunks of {chunksize} rows ({learner})...")
+    fit_start = time.perf_counter()
+    n_train = 0
+    feature_columns = None
+    
+    if learner == 'forest':
+        params = {k: v for k, v in DEFAULT_MODEL_PARAMS.items() if k != 'n_estimators'}
+        model = build_model('random_forest', params, n_jobs=n_jobs)
+        model.set_params(warm_start=True, n_estimators=0)
+        for X_train, y_train, _, _, feature_columns in _iter_split_chunks(dataset_path, chunksize, holdout_fraction):
+            if len(X_train) == 0:
+                continue
+            model.set_params(n_estimators=model.n_estimators + trees_per_chunk)
+            model.fit(X_train, y_train)
+            n_train += len(X_train)
+        if n_train:
+            model.set_params(warm_start=False)
+    elif learner == 'sgd':
+        from sklearn.linear_model import SGDRegressor
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import StandardScaler
+        
+        scaler = StandardScaler()
+        for X_train, _, _, _, feature_columns in _iter_split_chunks(dataset_path, chunksize, holdout_fraction):
+            if len(X_train):
+                scaler.partial_fit(X_train)
+                n_train += len(X_train)
+        regressor = SGDRegressor(random_state=42)
+        for epoch in range(epochs if n_train else 0):
+            for X_train, y_train, _, _, _ in _iter_split_chunks(dataset_path, chunksize, holdout_fraction):
+                if len(X_train):
+                    regressor.partial_fit(scaler.transform(X_train), y_train)
+        model = Pipeline([('scaler', scaler), ('sgd', regressor)])
+    else:
+        raise ValueError(f"Unknown streaming learner: {learner}")
+    
+    if not n_train:
+        print("Error: No training rows in dataset.")
+        return None
+    fit_seconds = time.perf_counter() - fit_start
+    
+    # Streaming evaluation: accumulate squared error and target moments
+    n_test, sse, y_sum, y_sq_sum = 0, 0.0, 0.0, 0.0
+    for _, _, X_test, y_test, _ in _iter_split_chunks(dataset_path, chunksize, holdout_fraction):
+        if len(X_test) == 0:
+            continue
+        y_true = y_test.to_numpy(dtype=float)
+        sse += float(np.sum((y_true - model.predict(X_test)) ** 2))
+        y_sum += float(y_true.sum())
+        y_sq_sum += float(np.sum(y_true ** 2))
+        n_test += len(y_true)
+    
+    metrics = {
+        "n_train": int(n_train),
+        "n_test": int(n_test),
+        "model_family": 'random_forest' if learner == 'forest' else 'sgd',
+        "model_params": model.get_params(deep=False) if learner == 'forest' else {},
+        "fit_seconds": round(fit_seconds, 3),
+        "data_fingerprint": dataset_fingerprint(dataset_path, chunksize),
+        "streaming": {"chunksize": chunksize, "learner": learner},
+    }
+    metrics["model_params"] = {k: v for k, v in metrics["model_params"].items()
+                               if isinstance(v, (int, float, str, bool, type(None)))}
+    if n_test:
+        sst = y_sq_sum - y_sum ** 2 / n_test
+        metrics["mse"] = sse / n_test
+        metrics["r2"] = float(1 - sse / sst) if sst > 0 else 0.0
+        metrics["rmse"] = float(np.sqrt(metrics["mse"]))
+    
+    return report_and_save(model, feature_columns, metrics, output_dir)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the engagement score model")
+    parser.add_argument('--dataset', default='dataset.csv', help='Dataset CSV path (default: dataset.csv)')
+    parser.add_argument('--output-dir', default='.', help='Where to write model.pkl and metrics.json')
+    parser.add_argument('--search', action='store_true',
+                        help='Run a cross-validated search over model families and hyperparameters')
+    parser.add_argument('--search-space', help='JSON file mapping model family -> parameter grid')
+    parser.add_argument('--metric', choices=sorted(SEARCH_METRICS), default='r2',
+                        help='Metric used to pick the best candidate (default: r2)')
+    parser.add_argument('--cv', type=int, default=5, help='Cross-validation folds (default: 5)')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='Parallel workers, -1 for all cores (default: -1)')
+    parser.add_argument('--time-budget', type=float, help='Stop starting new candidates after this many seconds')
+    parser.add_argument('--n-iter', type=int, help='Randomly sample this many candidates from the space')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Warm-start the model in --output-dir with trees fitted on the dataset')
+    parser.add_argument('--add-trees', type=int, default=25, help='Trees added per incremental run (default: 25)')
+    parser.add_argument('--max-trees', type=int, help='Drop the oldest trees beyond this forest size')
+    parser.add_argument('--stream', action='store_true',
+                        help='Train out-of-core from dataset chunks (CSV or .parquet)')
+    parser.add_argument('--chunksize', type=int, default=50000, help='Rows per streamed chunk (default: 50000)')
+    parser.add_argument('--learner', choices=['forest', 'sgd'], default='forest',
+                        help='Incremental learner for --stream (default: forest)')
+    parser.add_argument('--trees-per-chunk', type=int, default=10,
+                        help='Trees added per chunk by the streaming forest (default: 10)')
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args()
+    search_space = None
+    if args.search_space:
+        with open(args.search_space) as f:
+            search_space = json.load(f)
+    
     # Train model
-    result = train_model()
+    if args.stream:
+        result = train_streaming(
+            args.dataset, args.output_dir, chunksize=args.chunksize, learner=args.learner,
+            trees_per_chunk=args.trees_per_chunk, n_jobs=args.n_jobs
+        )
+    elif args.incremental:
+        previous_metrics = {}
+        metrics_path = os.path.join(args.output_dir, "metrics.json")
+        if os.path.exists(metrics_path):
+            with open(metrics_path) as f:
+                previous_metrics = json.load(f)
+        result = train_incremental(
+            args.dataset, os.path.join(args.output_dir, "model.pkl"), previous_metrics,
+            args.output_dir, add_trees=args.add_trees, max_trees=args.max_trees, n_jobs=args.n_jobs
+        )
+    else:
+        result = train_model(
+            args.dataset, args.output_dir, search=args.search, search_space=search_space,
+            metric=args.metric, cv=args.cv, n_jobs=args.n_jobs,
+            time_budget=args.time_budget, n_iter=args.n_iter
+        )
     
     if result:
         print("\n" + "="*50)
@@ -1,9 +1,11 @@
+from django import forms
 from django.contrib import admin
 from .models import (
     TextbookSection, TextbookPage, TextbookSlide,
     RevisionQuestion, RevisionQuestionAttempt, RevisionQuestionAttemptDetail,
-    WritingInteraction, UserSlideRead, UserSlideReadSession
+    WritingInteraction, UserSlideRead, UserSlideReadSession, DailyEngagementSummary, ImportRun
 )
+from .admin_utils import LargeTableAdmin, UserInputFilter, id_filter
 
 @admin.register(TextbookSection)
 class TextbookSectionAdmin(admin.ModelAdmin):
@@ -15,6 +17,8 @@ class TextbookPageAdmin(admin.ModelAdmin):
     list_display = ('id','page_title','get_sections')
     search_fields = ('page_title',)
     filter_horizontal = ('sections',)
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('sections')
     def get_sections(self, obj):
         return ", ".join([s.section_title for s in obj.sections.all()])
     get_sections.short_description = "Sections"
@@ -24,6 +28,8 @@ class TextbookSlideAdmin(admin.ModelAdmin):
     list_display = ('id','slide_title','get_pages')
     search_fields = ('slide_title',)
     filter_horizontal = ('pages',)
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('pages')
     def get_pages(self, obj):
         return ", ".join([p.page_title for p in obj.pages.all()])
     get_pages.short_description = "Pages"
@@ -31,29 +37,105 @@ class TextbookSlideAdmin(admin.ModelAdmin):
 @admin.register(RevisionQuestion)
 class RevisionQuestionAdmin(admin.ModelAdmin):
     list_display = ('id','textbook_page')
-    list_filter = ('textbook_page',)
+    list_filter = (id_filter('textbook_page', 'page id'),)
+    list_select_related = ('textbook_page',)
+    search_fields = ('id',)
+    autocomplete_fields = ('textbook_page',)
 
 @admin.register(RevisionQuestionAttempt)
-class RevisionQuestionAttemptAdmin(admin.ModelAdmin):
+class RevisionQuestionAttemptAdmin(LargeTableAdmin):
     list_display = ('id','user','question','viewed','correct','processed')
-    list_filter = ('user','question','processed')
+    list_filter = (UserInputFilter, id_filter('question'), 'processed')
+    list_select_related = ('user','question')
+    raw_id_fields = ('user','question')
 
 @admin.register(RevisionQuestionAttemptDetail)
-class RevisionQuestionAttemptDetailAdmin(admin.ModelAdmin):
+class RevisionQuestionAttemptDetailAdmin(LargeTableAdmin):
     list_display = ('id','attempt','is_correct','timestamp','processed')
-    list_filter = ('is_correct','processed')
+    list_filter = (UserInputFilter, id_filter('attempt'), 'is_correct', 'processed')
+    list_select_related = ('attempt__user',)
+    raw_id_fields = ('attempt','user')
+
+class WritingInteractionForm(forms.ModelForm):
+    """Edits the compressed text bodies; they are only loaded on the change page"""
+    user_input = forms.CharField(widget=forms.Textarea, required=False)
+    openai_response = forms.CharField(widget=forms.Textarea, required=False)
+    class Meta:
+        model = WritingInteraction
+        fields = ('user_id','page_id','grade')
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in WritingInteraction.BODY_FIELDS:
+            self.fields[name].initial = getattr(self.instance, name)
+    def save(self, commit=True):
+        for name in WritingInteraction.BODY_FIELDS:
+            setattr(self.instance, name, self.cleaned_data[name])
+        return super().save(commit)
 
 @admin.register(WritingInteraction)
-class WritingInteractionAdmin(admin.ModelAdmin):
+class WritingInteractionAdmin(LargeTableAdmin):
+    form = WritingInteractionForm
     list_display = ('id','user_id','page_id','grade','timestamp')
     search_fields = ('user_id','page_id')
+    search_help_text = 'Searches user/page ids and the full text of answers and responses'
+    def get_search_results(self, request, queryset, search_term):
+        from .search import search_writing
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            # Text matches come from the full-text index instead of LIKE scans
+            matched_ids = search_writing(search_term, limit=1000)
+            if matched_ids:
+                results = results | queryset.filter(id__in=matched_ids)
+        return results, may_have_duplicates
 
 @admin.register(UserSlideRead)
-class UserSlideReadAdmin(admin.ModelAdmin):
+class UserSlideReadAdmin(LargeTableAdmin):
     list_display = ('id','user','slide','slide_status')
-    list_filter = ('slide_status',)
+    list_filter = (UserInputFilter, id_filter('slide'), 'slide_status')
+    list_select_related = ('user','slide')
+    raw_id_fields = ('user','slide')
 
 @admin.register(UserSlideReadSession)
-class UserSlideReadSessionAdmin(admin.ModelAdmin):
+class UserSlideReadSessionAdmin(LargeTableAdmin):
     list_display = ('id','slide_read','expanded','collapsed','read')
-    list_filter = ('expanded','collapsed','read')
+    list_filter = (UserInputFilter, id_filter('slide_read'), 'expanded','collapsed','read')
+    list_select_related = ('slide_read__user','slide_read__slide')
+    raw_id_fields = ('slide_read','user')
+
+@admin.register(DailyEngagementSummary)
+class DailyEngagementSummaryAdmin(LargeTableAdmin):
+    list_display = ('id','user','day','read_seconds','sessions','answers','correct_answers')
+    list_filter = (UserInputFilter, 'day')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
+@admin.register(ImportRun)
+class ImportRunAdmin(admin.ModelAdmin):
+    list_display = ('id','source','status','started_at','wall_seconds','download_seconds','download_bytes',
+                    'total_rows','get_rows_per_sec')
+    list_filter = ('source','status')
+    date_hierarchy = 'started_at'
+    list_select_related = ('triggered_by',)
+    readonly_fields = ('source','triggered_by','status','started_at','finished_at','wall_seconds',
+                       'download_seconds','download_bytes','get_entity_table','error')
+    exclude = ('entity_stats',)
+    def has_add_permission(self, request):
+        return False
+    def get_rows_per_sec(self, obj):
+        rate = obj.rows_per_sec
+        return f"{rate:.0f}" if rate is not None else "-"
+    get_rows_per_sec.short_description = "Rows/sec"
+    def get_entity_table(self, obj):
+        from django.utils.html import format_html, format_html_join
+        rows = format_html_join(
+            '', '<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>',
+            (
+                (name, s.get('inserted'), s.get('updated'), s.get('skipped'), s.get('seconds'), s.get('rows_per_sec'))
+                for name, s in obj.entity_stats.items()
+            )
+        )
+        return format_html(
+            '<table><thead><tr><th>Entity</th><th>Inserted</th><th>Updated</th><th>Skipped</th>'
+            '<th>Seconds</th><th>Rows/sec</th></tr></thead><tbody>{}</tbody></table>', rows
+        )
+    get_entity_table.short_description = "Per-entity rows"
@@ -0,0 +1,118 @@
+"""
+Admin helpers for large engagement tables
+Changelists on multi-million-row tables must not COUNT(*) the whole table
+or render every user/question as a sidebar filter.
+"""
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+
+
+def estimate_table_rows(model, using='default'):
+    """Row count from the planner statistics, or None if there are none"""
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                # Filled by ANALYZE (also run by PRAGMA optimize); first number is the row count
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+                row = cursor.fetchone()
+                return int(row[0].split()[0]) if row else None
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+                row = cursor.fetchone()
+                return int(row[0]) if row and row[0] >= 0 else None
+    except DatabaseError:
+        return None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Avoids exact COUNT(*) on large tables
+
+    Unfiltered changelists use the planner's row estimate; filtered ones
+    count at most `count_limit` rows, so the count stays cheap however many
+    rows match.
+    """
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return super().count
+        if not queryset.query.where:
+            estimate = estimate_table_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.count_limit:
+                return estimate
+        return queryset.order_by().values('pk')[:self.count_limit].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables too big to count or list in full"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class InputFilter(admin.SimpleListFilter):
+    """Sidebar filter with a text box instead of one link per related row"""
+    template = 'admin/engagement/input_filter.html'
+    field_path = None
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def filter_value(self):
+        value = self.value()
+        return value.strip() if value else ''
+
+    def choices(self, changelist):
+        # Only used to carry the other active filters and search through the form
+        from django.contrib.admin.views.main import PAGE_VAR
+        yield {
+            'query_parts': [
+                (key, value)
+                for key, values in changelist.params.items() if key not in (self.parameter_name, PAGE_VAR)
+                for value in (values if isinstance(values, list) else [values])
+            ],
+        }
+
+
+class IdInputFilter(InputFilter):
+    def queryset(self, request, queryset):
+        value = self.filter_value()
+        if not value:
+            return queryset
+        if not value.isdigit():
+            return queryset.none()
+        return queryset.filter(**{f'{self.field_path}_id': int(value)})
+
+
+class UserInputFilter(InputFilter):
+    """Filter by user id or exact username"""
+    title = 'user (id or username)'
+    parameter_name = 'user'
+    field_path = 'user'
+
+    def queryset(self, request, queryset):
+        value = self.filter_value()
+        if not value:
+            return queryset
+        if value.isdigit():
+            return queryset.filter(**{f'{self.field_path}_id': int(value)})
+        return queryset.filter(**{f'{self.field_path}__username': value})
+
+
+def id_filter(field_path, title=None):
+    """IdInputFilter subclass for a foreign key path, e.g. id_filter('question')"""
+    return type(f'{field_path.title().replace("_", "")}IdFilter', (IdInputFilter,), {
+        'title': title or f'{field_path.replace("__", " ").replace("_", " ")} id',
+        'parameter_name': field_path,
+        'field_path': field_path,
+    })
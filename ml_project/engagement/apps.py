@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class EngagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'engagement'
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_migrate
+        from .db import apply_sqlite_pragmas
+        from .models import WritingInteractionBody
+        from .routers import discard_stale_snapshot
+        from .search import remove_deleted_body
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='engagement_sqlite_pragmas')
+        post_migrate.connect(discard_stale_snapshot, sender=self, dispatch_uid='engagement_discard_snapshot')
+        post_delete.connect(remove_deleted_body, sender=WritingInteractionBody, dispatch_uid='engagement_unindex_writing')
+        if getattr(settings, 'ENGAGEMENT_WARMUP', False):
+            from .warmup import warm_up
+            warm_up()
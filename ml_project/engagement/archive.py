@@ -0,0 +1,162 @@
+"""
+Archival of old engagement events
+Week 9: Keeping the hot tables small
+
+Slide sessions and attempt details older than a cutoff are folded into
+per-student, per-day DailyEngagementSummary rows and deleted. Each batch is
+summarised and deleted in one transaction, so totals never count a row
+twice or lose it, and the importer only waits for one batch at a time.
+Optionally the raw rows are first appended to a gzipped NDJSON file.
+
+Every pass is recorded as an ArchiveRun before anything is deleted, and the
+latest cutoff is the archive watermark: both importers drop sessions and
+attempt details from before it, since re-importing an archived row would
+count it a second time next to its summary.
+"""
+import gzip
+import json
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import (
+    UserSlideReadSession, RevisionQuestionAttemptDetail, DailyEngagementSummary, ArchiveRun
+)
+from .sessionize import active_seconds, session_arrays
+
+
+def archive_cutoff(days):
+    """Start of the day `days` days ago, so whole days are archived"""
+    start_of_today = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    return start_of_today - timedelta(days=days)
+
+
+def archive_watermark():
+    """Latest archive cutoff, or None if nothing was ever archived"""
+    return ArchiveRun.objects.aggregate(watermark=Max('cutoff'))['watermark']
+
+
+def is_archived(value, watermark):
+    """Whether an event time (datetime or ISO 8601 string) falls before the watermark"""
+    if watermark is None or value is None:
+        return False
+    if isinstance(value, str):
+        value = parse_datetime(value)
+        if value is None:
+            return False
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value < watermark
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _merge_summaries(totals):
+    """Add {(user_id, day): counters} onto the stored summaries"""
+    user_ids = {user_id for user_id, _ in totals}
+    days = {day for _, day in totals}
+    existing = {
+        (s.user_id, s.day): s
+        for s in DailyEngagementSummary.objects.filter(user_id__in=user_ids, day__in=days)
+    }
+    to_create, to_update = [], []
+    for key, counters in totals.items():
+        summary = existing.get(key)
+        if summary is None:
+            summary = DailyEngagementSummary(user_id=key[0], day=key[1])
+            to_create.append(summary)
+        else:
+            to_update.append(summary)
+        summary.read_seconds += counters['read_seconds']
+        summary.sessions += counters['sessions']
+        summary.slide_ids = sorted(set(summary.slide_ids) | counters['slide_ids'])
+        summary.answers += counters['answers']
+        summary.correct_answers += counters['correct_answers']
+    DailyEngagementSummary.objects.bulk_create(to_create)
+    DailyEngagementSummary.objects.bulk_update(
+        to_update, ['read_seconds', 'sessions', 'slide_ids', 'answers', 'correct_answers']
+    )
+
+
+def _new_counters():
+    return {'read_seconds': 0, 'sessions': 0, 'slide_ids': set(), 'answers': 0, 'correct_answers': 0}
+
+
+def _archive_sessions(cutoff, batch_size, cold):
+    columns = ('id', 'user_id', 'slide_read_id', 'slide_read__slide_id', 'expanded', 'collapsed', 'read')
+    old = UserSlideReadSession.objects.filter(expanded__lt=cutoff, user__isnull=False).order_by('id')
+    archived = 0
+    while True:
+        rows = list(old.values_list(*columns)[:batch_size])
+        if not rows:
+            return archived
+        totals = defaultdict(_new_counters)
+        days = []
+        for _, user_id, _, slide_id, expanded, collapsed, read in rows:
+            days.append((user_id, timezone.localdate(expanded)))
+            counters = totals[days[-1]]
+            counters['sessions'] += 1
+            counters['slide_ids'].add(slide_id)
+        # Active time as the live features count it: overlaps on a slide merged within the day
+        keys, starts, ends = session_arrays((slide_id, e, c, r) for _, _, _, slide_id, e, c, r in rows)
+        for day, seconds in active_seconds(keys, starts, ends, groups=days).items():
+            totals[day]['read_seconds'] += seconds
+        if cold:
+            for row in rows:
+                record = dict(zip(columns, row))
+                record['slide_id'] = record.pop('slide_read__slide_id')
+                for field in ('expanded', 'collapsed', 'read'):
+                    record[field] = _isoformat(record[field])
+                cold.write(json.dumps({'type': 'slide_session', **record}) + '\n')
+            cold.flush()
+        with transaction.atomic():
+            _merge_summaries(totals)
+            UserSlideReadSession.objects.filter(id__in=[row[0] for row in rows]).delete()
+        archived += len(rows)
+
+
+def _archive_attempt_details(cutoff, batch_size, cold):
+    columns = ('id', 'user_id', 'attempt_id', 'is_correct', 'timestamp')
+    old = RevisionQuestionAttemptDetail.objects.filter(timestamp__lt=cutoff, user__isnull=False).order_by('id')
+    archived = 0
+    while True:
+        rows = list(old.values_list(*columns)[:batch_size])
+        if not rows:
+            return archived
+        totals = defaultdict(_new_counters)
+        for _, user_id, _, is_correct, timestamp in rows:
+            counters = totals[(user_id, timezone.localdate(timestamp))]
+            counters['answers'] += 1
+            counters['correct_answers'] += int(is_correct)
+        if cold:
+            for row in rows:
+                record = dict(zip(columns, row))
+                record['timestamp'] = _isoformat(record['timestamp'])
+                cold.write(json.dumps({'type': 'attempt_detail', **record}) + '\n')
+            cold.flush()
+        with transaction.atomic():
+            _merge_summaries(totals)
+            RevisionQuestionAttemptDetail.objects.filter(id__in=[row[0] for row in rows]).delete()
+        archived += len(rows)
+
+
+def archive_engagement(cutoff, batch_size=5000, cold_storage_path=None):
+    """Summarise and delete events before `cutoff`; returns (sessions, details) archived"""
+    # Raise the watermark first, so imports running meanwhile cannot re-add archived rows
+    run = ArchiveRun.objects.create(cutoff=cutoff)
+    cold = gzip.open(cold_storage_path, 'at', encoding='utf-8') if cold_storage_path else None
+    try:
+        run.sessions = _archive_sessions(cutoff, batch_size, cold)
+        run.details = _archive_attempt_details(cutoff, batch_size, cold)
+    finally:
+        if cold:
+            cold.close()
+        run.finished_at = timezone.now()
+        run.save()
+    return run.sessions, run.details
@@ -0,0 +1,21 @@
+"""
+Database connection setup
+Applies settings.SQLITE_PRAGMAS to every new SQLite connection; the analytics
+snapshot is opened read-only.
+"""
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """connection_created receiver: tune SQLite connections, leave other vendors alone"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = dict(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    if connection.alias == getattr(settings, 'ANALYTICS_DB_ALIAS', None):
+        # Snapshots are swapped in with os.replace: never give them WAL side files,
+        # and refuse writes that would diverge from the primary
+        pragmas.pop('journal_mode', None)
+        pragmas['query_only'] = 1
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
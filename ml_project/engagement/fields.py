@@ -0,0 +1,47 @@
+"""
+Custom model fields
+CompressedTextField stores text zlib-compressed in a binary column and
+decompresses it when the row is loaded.
+"""
+import zlib
+
+from django.db import models
+
+
+class CompressedTextField(models.BinaryField):
+    description = 'Text stored zlib-compressed'
+
+    def __init__(self, *args, level=6, **kwargs):
+        self.level = level
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.level != 6:
+            kwargs['level'] = self.level
+        return name, path, args, kwargs
+
+    def get_default(self):
+        # BinaryField falls back to b'', which is not valid compressed data
+        default = super().get_default()
+        return '' if default == b'' else default
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return zlib.decompress(bytes(value)).decode('utf-8')
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return zlib.decompress(bytes(value)).decode('utf-8')
+        return value
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = zlib.compress(value.encode('utf-8'), self.level)
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
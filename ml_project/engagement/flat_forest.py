@@ -0,0 +1,107 @@
+"""
+Flat, memory-mappable layout for tree ensembles
+Week 8: Serving the model from shared memory
+
+Unpickling a scikit-learn forest copies every tree into private memory, so
+each web worker holds its own copy. Here the trees of a RandomForest /
+ExtraTrees regressor are concatenated into a handful of flat .npy arrays
+which are opened with np.load(mmap_mode='r'): every process on the host maps
+the same page-cache pages, and prediction walks the arrays directly.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+FOREST_DIR = 'forest'
+ARRAYS = ('left', 'right', 'feature', 'threshold', 'value', 'roots', 'feature_importances')
+
+
+def can_flatten(model):
+    """Averaging tree-ensemble regressors with a single output"""
+    from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor
+
+    return (
+        isinstance(model, (RandomForestRegressor, ExtraTreesRegressor))
+        and hasattr(model, 'estimators_')
+        and getattr(model, 'n_outputs_', 1) == 1
+    )
+
+
+def export_flat_forest(model, out_dir):
+    """Write the forest as flat arrays under out_dir/forest; returns False if unsupported"""
+    if not can_flatten(model):
+        return False
+
+    trees = [est.tree_ for est in model.estimators_]
+    offsets = np.cumsum([0] + [t.node_count for t in trees[:-1]])
+
+    def _children(child, offset):
+        return np.where(child == -1, -1, child + offset)
+
+    arrays = {
+        'left': np.concatenate([_children(t.children_left, o) for t, o in zip(trees, offsets)]),
+        'right': np.concatenate([_children(t.children_right, o) for t, o in zip(trees, offsets)]),
+        'feature': np.concatenate([t.feature for t in trees]),
+        'threshold': np.concatenate([t.threshold for t in trees]),
+        'value': np.concatenate([t.value[:, 0, 0] for t in trees]),
+        'roots': offsets.astype(np.int64),
+        'feature_importances': np.asarray(model.feature_importances_, dtype=np.float64),
+    }
+
+    forest_dir = Path(out_dir) / FOREST_DIR
+    forest_dir.mkdir(parents=True, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(forest_dir / f'{name}.npy', np.ascontiguousarray(array))
+    meta = {
+        'n_trees': len(trees),
+        'max_depth': int(max(t.max_depth for t in trees)),
+        'n_features': int(model.n_features_in_),
+        'feature_names': [str(f) for f in getattr(model, 'feature_names_in_', [])],
+    }
+    (forest_dir / 'forest.json').write_text(json.dumps(meta, indent=2))
+    return True
+
+
+def has_flat_forest(path):
+    return (Path(path) / FOREST_DIR / 'forest.json').exists()
+
+
+class FlatForest:
+    """Read-only forest regressor backed by memory-mapped arrays"""
+
+    def __init__(self, path, mmap_mode='r'):
+        forest_dir = Path(path) / FOREST_DIR
+        meta = json.loads((forest_dir / 'forest.json').read_text())
+        for name in ARRAYS:
+            setattr(self, name if name != 'feature_importances' else 'feature_importances_',
+                    np.load(forest_dir / f'{name}.npy', mmap_mode=mmap_mode))
+        self.n_trees = meta['n_trees']
+        self.max_depth = meta['max_depth']
+        self.n_features_in_ = meta['n_features']
+        if meta['feature_names']:
+            self.feature_names_in_ = np.asarray(meta['feature_names'], dtype=object)
+
+    def _as_matrix(self, X):
+        if hasattr(X, 'columns') and hasattr(self, 'feature_names_in_'):
+            X = X[list(self.feature_names_in_)]
+        # Trees compare float32 features against float64 thresholds, as scikit-learn does
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f'Expected {self.n_features_in_} features, got shape {X.shape}')
+        return X
+
+    def predict(self, X):
+        X = self._as_matrix(X)
+        rows = np.arange(X.shape[0])[:, None]
+        # One cursor per (row, tree), all trees advanced a level at a time
+        nodes = np.repeat(np.asarray(self.roots)[None, :], X.shape[0], axis=0)
+        for _ in range(self.max_depth):
+            left = self.left[nodes]
+            internal = left != -1
+            if not internal.any():
+                break
+            feature = np.where(internal, self.feature[nodes], 0)
+            go_left = X[rows, feature] <= self.threshold[nodes]
+            nodes = np.where(internal, np.where(go_left, left, self.right[nodes]), nodes)
+        return self.value[nodes].mean(axis=1)
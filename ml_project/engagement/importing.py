@@ -0,0 +1,45 @@
+"""
+Import telemetry
+Week 10: Seeing where the time goes
+
+ImportStats collects, per entity type, how many rows an import inserted,
+updated or skipped and how long that stage took; ImportRun.finish() stores
+it with the run.
+"""
+import time
+from contextlib import contextmanager
+
+
+class ImportStats:
+    def __init__(self):
+        self.entities = {}
+
+    def _entity(self, name):
+        return self.entities.setdefault(name, {'inserted': 0, 'updated': 0, 'skipped': 0, 'seconds': 0.0})
+
+    @contextmanager
+    def stage(self, name):
+        """Time the import of one entity type"""
+        entity = self._entity(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entity['seconds'] += time.perf_counter() - start
+
+    def saved(self, name, created):
+        self._entity(name)['inserted' if created else 'updated'] += 1
+
+    def skipped(self, name, count=1):
+        self._entity(name)['skipped'] += count
+
+    def as_dict(self):
+        result = {}
+        for name, entity in self.entities.items():
+            rows = entity['inserted'] + entity['updated']
+            result[name] = {
+                **entity,
+                'seconds': round(entity['seconds'], 4),
+                'rows_per_sec': round(rows / entity['seconds'], 1) if entity['seconds'] > 0 else None,
+            }
+        return result
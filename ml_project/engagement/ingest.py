@@ -0,0 +1,429 @@
+"""
+Push ingestion of engagement events
+Week 10: Seeing where the time goes
+
+The textbook service POSTs batches of events to /engagement/ingest/ as
+NDJSON, one event per line:
+
+    {"type": "user_slide_session", "key": "sess-123-v1", "data": {"id": 123, "slide_read": 7, ...}}
+
+`data` uses the same fields as the matching list in the user-engagement API
+payload. `key` is the idempotency key (the hash of the line if omitted):
+events whose key was already ingested are skipped, so a batch can be resent
+after a timeout. A batch is validated, then written stage by stage in
+dependency order with one bulk upsert per entity type, and recorded as an
+ImportRun with source 'push'. Events that fail validation or reference a
+parent that does not exist yet are rejected and not recorded, so the sender
+can retry them later. Sessions and attempt details from before the archive
+watermark are rejected as well (see engagement.archive).
+"""
+import hashlib
+import json
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .archive import archive_watermark, is_archived
+from .importing import ImportStats
+from .versions import DATA, bump
+from .models import (
+    User, TextbookSection, TextbookPage, TextbookSlide, RevisionQuestion,
+    RevisionQuestionAttempt, RevisionQuestionAttemptDetail, WritingInteraction,
+    UserSlideRead, UserSlideReadSession, IngestedEvent, ImportRun
+)
+
+SLIDE_STATUSES = {'read', 'unread', 'revise'}
+
+
+class EventError(ValueError):
+    pass
+
+
+class IngestConflict(Exception):
+    """Another batch with some of the same keys was committed concurrently"""
+
+
+def _int(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise EventError(f'expected an integer, got {value!r}')
+    return value
+
+
+def _str(value):
+    if not isinstance(value, str):
+        raise EventError(f'expected a string, got {value!r}')
+    return value
+
+
+def _bool(value):
+    if not isinstance(value, bool):
+        raise EventError(f'expected true/false, got {value!r}')
+    return value
+
+
+def _datetime(value):
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise EventError(f'expected an ISO 8601 datetime, got {value!r}')
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+def _int_list(value):
+    if not isinstance(value, list):
+        raise EventError(f'expected a list of ids, got {value!r}')
+    return [_int(v) for v in value]
+
+
+def _grade(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        raise EventError(f'expected a numeric grade, got {value!r}')
+
+
+def _status(value):
+    if value not in SLIDE_STATUSES:
+        raise EventError(f"slide_status must be one of {sorted(SLIDE_STATUSES)}, got {value!r}")
+    return value
+
+
+REQUIRED = object()
+# type: {field: (parser, default)}; fields not listed are ignored
+SCHEMAS = {
+    'section': {'id': (_int, REQUIRED), 'section_title': (_str, REQUIRED)},
+    'page': {'id': (_int, REQUIRED), 'page_title': (_str, REQUIRED), 'sections': (_int_list, [])},
+    'slide': {'id': (_int, REQUIRED), 'slide_title': (_str, ''), 'pages': (_int_list, [])},
+    'question': {'id': (_int, REQUIRED), 'textbook_page': (_int, REQUIRED)},
+    'user_slide_read': {
+        'id': (_int, REQUIRED), 'user': (_int, REQUIRED), 'slide': (_int, REQUIRED),
+        'slide_status': (_status, 'unread'),
+    },
+    'user_slide_session': {
+        'id': (_int, REQUIRED), 'slide_read': (_int, REQUIRED), 'expanded': (_datetime, REQUIRED),
+        'collapsed': (_datetime, None), 'read': (_datetime, None),
+    },
+    'attempt': {
+        'id': (_int, REQUIRED), 'user': (_int, REQUIRED), 'question': (_int, REQUIRED),
+        'viewed': (_datetime, None), 'correct': (_datetime, None),
+    },
+    'attempt_detail': {
+        'id': (_int, REQUIRED), 'attempt': (_int, REQUIRED), 'is_correct': (_bool, False),
+        'timestamp': (_datetime, None),
+    },
+    'writing_interaction': {
+        'id': (_int, REQUIRED), 'user_id': (_int, None), 'page_id': (_int, REQUIRED),
+        'user_input': (_str, ''), 'openai_response': (_str, ''), 'grade': (_grade, None),
+        'timestamp': (_datetime, None),
+    },
+}
+# Dependency order; also the ImportRun entity names, as in import_engagement_data
+STAGES = (
+    ('section', 'sections'), ('page', 'pages'), ('slide', 'slides'), ('question', 'questions'),
+    ('user_slide_read', 'user_slide_reads'), ('user_slide_session', 'user_slide_sessions'),
+    ('attempt', 'attempts'), ('attempt_detail', 'attempt_details'),
+    ('writing_interaction', 'writing_interactions'),
+)
+
+
+def parse_event(line):
+    """(type, key, cleaned data) from one NDJSON line; raises EventError"""
+    try:
+        event = json.loads(line)
+    except ValueError as e:
+        raise EventError(f'invalid JSON: {e}')
+    if not isinstance(event, dict) or not isinstance(event.get('data'), dict):
+        raise EventError('expected an object with "type" and "data"')
+    event_type = event.get('type')
+    schema = SCHEMAS.get(event_type)
+    if schema is None:
+        raise EventError(f'unknown event type {event_type!r}')
+    key = event.get('key') or hashlib.sha256(line.encode()).hexdigest()
+    if not isinstance(key, str) or len(key) > IngestedEvent._meta.get_field('key').max_length:
+        raise EventError('key must be a string of at most 200 characters')
+    data = {}
+    for field, (parser, default) in schema.items():
+        value = event['data'].get(field)
+        if value is None:
+            if default is REQUIRED:
+                raise EventError(f'{event_type}.{field} is required')
+            data[field] = default
+        else:
+            try:
+                data[field] = parser(value)
+            except EventError as e:
+                raise EventError(f'{event_type}.{field}: {e}')
+    return event_type, key, data
+
+
+def _existing_ids(model, ids):
+    ids = list(ids)
+    found = set()
+    for i in range(0, len(ids), 500):
+        found.update(model.objects.filter(id__in=ids[i:i + 500]).values_list('id', flat=True))
+    return found
+
+
+def _parent_lookup(model, ids, known, fields=('id',)):
+    """{id: row} for parents written earlier in this batch or already stored"""
+    missing = [i for i in set(ids) if i not in known]
+    for i in range(0, len(missing), 500):
+        for row in model.objects.filter(id__in=missing[i:i + 500]).values(*fields):
+            known[row['id']] = row
+    return known
+
+
+def _slide_read_owners(rows):
+    """{(user, slide): id} of the stored slide_reads for the (user, slide) pairs in `rows`"""
+    pairs = {(d['user'], d['slide']) for _, d in rows}
+    users = sorted({user for user, _ in pairs})
+    slides = {slide for _, slide in pairs}
+    owners = {}
+    for i in range(0, len(users), 500):
+        stored = UserSlideRead.objects.filter(user_id__in=users[i:i + 500], slide_id__in=slides)
+        for row_id, user, slide in stored.values_list('id', 'user_id', 'slide_id'):
+            if (user, slide) in pairs:
+                owners[(user, slide)] = row_id
+    return owners
+
+
+def _upsert(model, objects, stats, entity, update_fields):
+    if not objects:
+        return
+    # Last event wins when a batch carries the same row twice
+    objects = list({obj.id: obj for obj in objects}.values())
+    existing = _existing_ids(model, [obj.id for obj in objects])
+    model.objects.bulk_create(
+        objects, batch_size=500, update_conflicts=True, unique_fields=['id'], update_fields=update_fields
+    )
+    for obj in objects:
+        stats.saved(entity, obj.id not in existing)
+
+
+def _archived(value, watermark):
+    if is_archived(value, watermark):
+        return f'{value.isoformat()} is before the archive watermark {watermark.isoformat()}'
+    return None
+
+
+def _write(events, stats, reject):
+    """Upsert accepted events stage by stage; `reject(index, message)` drops one
+
+    Returns the ids of the students whose events were written.
+    """
+    written = {event_type: {} for event_type in SCHEMAS}
+    students = set()
+    # Events before the archive watermark already live on in the daily summaries
+    watermark = archive_watermark()
+
+    def keep(event_type, check):
+        kept = []
+        for index, data in events[event_type]:
+            message = check(data)
+            if message:
+                reject(index, message)
+                stats.skipped(dict(STAGES)[event_type])
+            else:
+                kept.append((index, data))
+        return kept
+
+    with stats.stage('sections'):
+        rows = events['section']
+        _upsert(TextbookSection, [TextbookSection(id=d['id'], section_title=d['section_title']) for _, d in rows],
+                stats, 'sections', ['section_title'])
+        written['section'] = {d['id']: d for _, d in rows}
+
+    with stats.stage('pages'):
+        rows = events['page']
+        _upsert(TextbookPage, [TextbookPage(id=d['id'], page_title=d['page_title']) for _, d in rows],
+                stats, 'pages', ['page_title'])
+        sections = _parent_lookup(TextbookSection, [s for _, d in rows for s in d['sections']], dict(written['section']))
+        TextbookPage.sections.through.objects.bulk_create([
+            TextbookPage.sections.through(textbookpage_id=d['id'], textbooksection_id=s)
+            for _, d in rows for s in d['sections'] if s in sections
+        ], ignore_conflicts=True)
+        written['page'] = {d['id']: d for _, d in rows}
+
+    with stats.stage('slides'):
+        rows = events['slide']
+        _upsert(TextbookSlide, [TextbookSlide(id=d['id'], slide_title=d['slide_title']) for _, d in rows],
+                stats, 'slides', ['slide_title'])
+        pages = _parent_lookup(TextbookPage, [p for _, d in rows for p in d['pages']], dict(written['page']))
+        TextbookSlide.pages.through.objects.bulk_create([
+            TextbookSlide.pages.through(textbookslide_id=d['id'], textbookpage_id=p)
+            for _, d in rows for p in d['pages'] if p in pages
+        ], ignore_conflicts=True)
+        written['slide'] = {d['id']: d for _, d in rows}
+
+    with stats.stage('questions'):
+        pages = _parent_lookup(TextbookPage, [d['textbook_page'] for _, d in events['question']], dict(written['page']))
+        rows = keep('question', lambda d: None if d['textbook_page'] in pages else f"unknown page {d['textbook_page']}")
+        _upsert(RevisionQuestion, [RevisionQuestion(id=d['id'], textbook_page_id=d['textbook_page']) for _, d in rows],
+                stats, 'questions', ['textbook_page'])
+        written['question'] = {d['id']: d for _, d in rows}
+
+    # Reads and attempts are validated first, so users are only created for accepted events
+    with stats.stage('user_slide_reads'):
+        slides = _parent_lookup(TextbookSlide, [d['slide'] for _, d in events['user_slide_read']], dict(written['slide']))
+        owners = _slide_read_owners(events['user_slide_read'])
+
+        def check_read(d):
+            if d['slide'] not in slides:
+                return f"unknown slide {d['slide']}"
+            # One slide_read per (user, slide): the first line to claim a pair keeps it
+            owner = owners.setdefault((d['user'], d['slide']), d['id'])
+            if owner != d['id']:
+                return f"user {d['user']} already has slide_read {owner} for slide {d['slide']}"
+            return None
+
+        read_rows = keep('user_slide_read', check_read)
+
+    with stats.stage('attempts'):
+        questions = _parent_lookup(RevisionQuestion, [d['question'] for _, d in events['attempt']],
+                                   dict(written['question']))
+        attempt_rows = keep('attempt',
+                            lambda d: None if d['question'] in questions else f"unknown question {d['question']}")
+
+    # Users are created on first sight, as the pull import does
+    with stats.stage('users'):
+        user_ids = {d['user'] for _, d in read_rows + attempt_rows}
+        new_users = user_ids - _existing_ids(User, user_ids)
+        User.objects.bulk_create([User(id=uid, username=f'user_{uid}') for uid in sorted(new_users)],
+                                 ignore_conflicts=True)
+        for _ in new_users:
+            stats.saved('users', True)
+
+    with stats.stage('user_slide_reads'):
+        _upsert(UserSlideRead, [
+            UserSlideRead(id=d['id'], user_id=d['user'], slide_id=d['slide'], slide_status=d['slide_status'])
+            for _, d in read_rows
+        ], stats, 'user_slide_reads', ['user', 'slide', 'slide_status'])
+        students.update(d['user'] for _, d in read_rows)
+        written['user_slide_read'] = {d['id']: {'id': d['id'], 'user_id': d['user']} for _, d in read_rows}
+
+    with stats.stage('user_slide_sessions'):
+        reads = _parent_lookup(UserSlideRead, [d['slide_read'] for _, d in events['user_slide_session']],
+                               dict(written['user_slide_read']), fields=('id', 'user_id'))
+        rows = keep('user_slide_session', lambda d: (
+            f"unknown slide_read {d['slide_read']}" if d['slide_read'] not in reads
+            else _archived(d['expanded'], watermark)
+        ))
+        _upsert(UserSlideReadSession, [
+            UserSlideReadSession(id=d['id'], slide_read_id=d['slide_read'], user_id=reads[d['slide_read']]['user_id'],
+                                 expanded=d['expanded'], collapsed=d['collapsed'], read=d['read'])
+            for _, d in rows
+        ], stats, 'user_slide_sessions', ['slide_read', 'user', 'expanded', 'collapsed', 'read'])
+        students.update(reads[d['slide_read']]['user_id'] for _, d in rows)
+
+    with stats.stage('attempts'):
+        _upsert(RevisionQuestionAttempt, [
+            RevisionQuestionAttempt(id=d['id'], user_id=d['user'], question_id=d['question'],
+                                    viewed=d['viewed'], correct=d['correct'])
+            for _, d in attempt_rows
+        ], stats, 'attempts', ['user', 'question', 'viewed', 'correct'])
+        students.update(d['user'] for _, d in attempt_rows)
+        written['attempt'] = {d['id']: {'id': d['id'], 'user_id': d['user']} for _, d in attempt_rows}
+
+    with stats.stage('attempt_details'):
+        attempts = _parent_lookup(RevisionQuestionAttempt, [d['attempt'] for _, d in events['attempt_detail']],
+                                  dict(written['attempt']), fields=('id', 'user_id'))
+        now = timezone.now()
+        rows = keep('attempt_detail', lambda d: (
+            f"unknown attempt {d['attempt']}" if d['attempt'] not in attempts
+            else _archived(d['timestamp'] or now, watermark)
+        ))
+        _upsert(RevisionQuestionAttemptDetail, [
+            RevisionQuestionAttemptDetail(id=d['id'], attempt_id=d['attempt'], user_id=attempts[d['attempt']]['user_id'],
+                                          is_correct=d['is_correct'], timestamp=d['timestamp'] or now)
+            for _, d in rows
+        ], stats, 'attempt_details', ['attempt', 'user', 'is_correct', 'timestamp'])
+        students.update(attempts[d['attempt']]['user_id'] for _, d in rows)
+
+    # Writing goes through save(), which stores the compressed body and updates the search index
+    with stats.stage('writing_interactions'):
+        for _, d in events['writing_interaction']:
+            defaults = {key: value for key, value in d.items() if key != 'id'}
+            if defaults['timestamp'] is None:
+                del defaults['timestamp']
+            _, created = WritingInteraction.objects.update_or_create(id=d['id'], defaults=defaults)
+            stats.saved('writing_interactions', created)
+            if d['user_id'] is not None:
+                students.add(d['user_id'])
+    return students
+
+
+def prune_ingested_events(before, batch_size=5000):
+    """Forget idempotency keys received before `before`; returns how many were deleted"""
+    old = IngestedEvent.objects.filter(received_at__lt=before).order_by('received_at')
+    deleted = 0
+    while True:
+        ids = list(old.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += IngestedEvent.objects.filter(id__in=ids).delete()[0]
+
+
+def ingest_ndjson(body, max_events=5000):
+    """Validate and store one NDJSON batch; returns (ImportRun, accepted, duplicates, rejected)
+
+    `rejected` lists {'line', 'error'} for events that were not stored.
+    Raises IngestConflict if a concurrent batch committed some of the same keys.
+    """
+    run = ImportRun.objects.create(source='push', download_bytes=len(body))
+    stats = ImportStats()
+    rejected = []
+    parsed = []
+    lines = body.decode('utf-8', errors='replace').splitlines()
+    if sum(1 for line in lines if line.strip()) > max_events:
+        run.finish(stats, error=f'Batch has more than {max_events} events')
+        raise EventError(f'Batch has more than {max_events} events; split it')
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            parsed.append((number, *parse_event(line)))
+        except EventError as e:
+            rejected.append({'line': number, 'error': str(e)})
+            stats.skipped('invalid')
+
+    seen = set()
+    already = set()
+    keys = [key for _, _, key, _ in parsed]
+    for i in range(0, len(keys), 500):
+        already.update(IngestedEvent.objects.filter(key__in=keys[i:i + 500]).values_list('key', flat=True))
+    events = {event_type: [] for event_type in SCHEMAS}
+    duplicates = 0
+    by_line = {}
+    for number, event_type, key, data in parsed:
+        if key in already or key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        events[event_type].append((number, data))
+        by_line[number] = (event_type, key)
+
+    def reject(number, message):
+        rejected.append({'line': number, 'error': message})
+        by_line.pop(number, None)
+
+    try:
+        with transaction.atomic():
+            students = _write(events, stats, reject)
+            if by_line:
+                bump(DATA, student_ids=students)
+            try:
+                IngestedEvent.objects.bulk_create([
+                    IngestedEvent(key=key, event_type=event_type, run=run) for event_type, key in by_line.values()
+                ], batch_size=500)
+            except IntegrityError as e:
+                # Only a key stored since the duplicate check is a concurrent batch
+                raise IngestConflict(str(e))
+    except IngestConflict as e:
+        run.finish(stats, error=f'Conflicting concurrent batch: {e}')
+        raise
+    except Exception as e:
+        run.finish(stats, error=f'Ingest failed: {e!r}')
+        raise
+    rejected.sort(key=lambda r: r['line'])
+    run.finish(stats)
+    return run, len(by_line), duplicates, rejected
@@ -0,0 +1,73 @@
+"""
+Django management command to archive old engagement events
+Week 9: Keeping the hot tables small
+
+Slide sessions and attempt details older than --days are folded into
+DailyEngagementSummary rows and deleted in batches. Dashboards and feature
+building add the summaries back for windows that reach past the horizon,
+so long-range totals are unchanged. With --cold-storage the raw rows are
+also appended to a gzipped NDJSON file first.
+"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from engagement.archive import archive_cutoff, archive_engagement
+from engagement.models import UserSlideReadSession, RevisionQuestionAttemptDetail
+
+
+class Command(BaseCommand):
+    help = 'Fold slide sessions and attempt details older than the horizon into daily summaries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.ENGAGEMENT_ARCHIVE_DAYS,
+            help=f'Archive events older than this many days (default: {settings.ENGAGEMENT_ARCHIVE_DAYS})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows summarised and deleted per transaction (default: 5000)'
+        )
+        parser.add_argument(
+            '--cold-storage',
+            type=str,
+            default=None,
+            help='Directory for a gzipped NDJSON copy of the archived rows'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many rows would be archived'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        cutoff = archive_cutoff(options['days'])
+
+        if options['dry_run']:
+            sessions = UserSlideReadSession.objects.filter(expanded__lt=cutoff).count()
+            details = RevisionQuestionAttemptDetail.objects.filter(timestamp__lt=cutoff).count()
+            self.stdout.write(f'{sessions} slide sessions and {details} attempt details before {cutoff:%Y-%m-%d}')
+            return
+
+        cold_storage_path = None
+        if options['cold_storage']:
+            os.makedirs(options['cold_storage'], exist_ok=True)
+            cold_storage_path = os.path.join(
+                options['cold_storage'],
+                f"engagement-before-{cutoff:%Y%m%d}-{timezone.now():%Y%m%dT%H%M%S}.ndjson.gz"
+            )
+
+        self.stdout.write(f'Archiving engagement events before {cutoff:%Y-%m-%d}...')
+        sessions, details = archive_engagement(cutoff, options['batch_size'], cold_storage_path)
+        message = f'Archived {sessions} slide sessions and {details} attempt details into daily summaries'
+        if cold_storage_path and (sessions or details):
+            message += f'\nRaw rows written to {cold_storage_path}'
+        self.stdout.write(self.style.SUCCESS(message))
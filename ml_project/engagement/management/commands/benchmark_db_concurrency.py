@@ -0,0 +1,147 @@
+"""
+Django management command to benchmark dashboard reads during an import
+Week 9: Database tuning
+
+Runs the same workload against two scratch SQLite files: one with SQLite's
+defaults (rollback journal) and one with settings.SQLITE_PRAGMAS. A writer
+thread commits large import-sized transactions while reader threads run the
+dashboard's session window aggregate; reader latency and lock errors show
+whether reads are blocked by the import.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+SCHEMA = """
+CREATE TABLE session (
+    id INTEGER PRIMARY KEY,
+    slide_read_id INTEGER NOT NULL,
+    expanded TEXT NOT NULL,
+    collapsed TEXT,
+    read TEXT
+);
+CREATE INDEX session_expanded ON session (expanded, collapsed, read);
+"""
+
+READ_QUERY = "SELECT COUNT(*), MIN(expanded), MAX(collapsed) FROM session WHERE expanded >= ?"
+
+
+def _connect(path, pragmas, timeout):
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+def _rows(start_id, count, now):
+    for i in range(start_id, start_id + count):
+        expanded = now - timedelta(minutes=i % 40000)
+        yield (i, i % 5000, expanded.isoformat(), (expanded + timedelta(seconds=90)).isoformat(), None)
+
+
+def run_workload(path, pragmas, duration, readers, batch_size, seed_rows, timeout):
+    now = timezone.now()
+    setup = _connect(path, pragmas, timeout)
+    setup.executescript(SCHEMA)
+    setup.execute('BEGIN')
+    setup.executemany('INSERT INTO session VALUES (?, ?, ?, ?, ?)', _rows(1, seed_rows, now))
+    setup.execute('COMMIT')
+    setup.close()
+
+    stop = threading.Event()
+    latencies, errors, batches = [], [], [0]
+    lock = threading.Lock()
+    since = (now - timedelta(days=1)).isoformat()
+
+    def writer():
+        conn = _connect(path, pragmas, timeout)
+        next_id = seed_rows + 1
+        while not stop.is_set():
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.executemany('INSERT INTO session VALUES (?, ?, ?, ?, ?)', _rows(next_id, batch_size, now))
+                conn.execute('COMMIT')
+                next_id += batch_size
+                batches[0] += 1
+            except sqlite3.OperationalError:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+        conn.close()
+
+    def reader():
+        conn = _connect(path, pragmas, timeout)
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                conn.execute(READ_QUERY, (since,)).fetchall()
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed * 1000)
+            except sqlite3.OperationalError as e:
+                with lock:
+                    errors.append(str(e))
+        conn.close()
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] if latencies else float('nan')
+
+    return {
+        'reads': len(latencies),
+        'read_errors': len(errors),
+        'p50_ms': pct(50),
+        'p99_ms': pct(99),
+        'max_ms': latencies[-1] if latencies else float('nan'),
+        'rows_written': batches[0] * batch_size,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Show dashboard read latency during an import with default vs tuned SQLite settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=10.0,
+                            help='Seconds to run each configuration (default: 10)')
+        parser.add_argument('--readers', type=int, default=4,
+                            help='Concurrent reader threads (default: 4)')
+        parser.add_argument('--batch-size', type=int, default=20000,
+                            help='Rows per import transaction (default: 20000)')
+        parser.add_argument('--seed-rows', type=int, default=200000,
+                            help='Rows in the table before the run (default: 200000)')
+        parser.add_argument('--timeout', type=float, default=5.0,
+                            help='Lock wait in seconds before a read counts as an error (default: 5)')
+
+    def handle(self, *args, **options):
+        configs = {
+            'default': {'journal_mode': 'delete', 'synchronous': 'full'},
+            'tuned': getattr(settings, 'SQLITE_PRAGMAS', {}),
+        }
+        self.stdout.write(
+            f"{'config':<10}{'reads':>8}{'errors':>8}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'rows written':>14}"
+        )
+        for name, pragmas in configs.items():
+            with tempfile.TemporaryDirectory() as scratch:
+                result = run_workload(
+                    os.path.join(scratch, 'bench.sqlite3'), pragmas, options['duration'],
+                    options['readers'], options['batch_size'], options['seed_rows'], options['timeout']
+                )
+            self.stdout.write(
+                f"{name:<10}{result['reads']:>8}{result['read_errors']:>8}{result['p50_ms']:>9.1f}"
+                f"{result['p99_ms']:>9.1f}{result['max_ms']:>9.1f}{result['rows_written']:>14}"
+            )
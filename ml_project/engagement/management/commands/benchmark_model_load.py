@@ -0,0 +1,131 @@
+"""
+Django management command to benchmark model loading across worker processes
+Week 8: Serving memory footprint
+
+Starts N fresh processes per loading mode (plain unpickling vs the
+memory-mapped flat layout), lets each load the model and run one
+prediction, and reports load time plus per-process RSS and PSS. PSS splits
+shared pages between the processes mapping them, so it shows the saving
+that RSS alone hides.
+"""
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+MODES = ('pickle', 'mmap')
+
+
+def _memory_kb():
+    """(rss_kb, pss_kb) of the current process; PSS is None off Linux"""
+    rss = pss = None
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    rss = int(line.split()[1])
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    pss = int(line.split()[1])
+    except OSError:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss, pss
+
+
+def _load_worker(mode, model_dir, n_features, barrier, results):
+    """Runs in a fresh process: load, predict once, measure once every worker is loaded"""
+    import numpy as np
+    import joblib
+    import sklearn.ensemble  # noqa: F401 -- keep library import cost out of the measurement
+    from engagement.flat_forest import FlatForest
+
+    rss_before, pss_before = _memory_kb()
+    start = time.perf_counter()
+    if mode == 'mmap':
+        model = FlatForest(model_dir)
+    else:
+        model = joblib.load(Path(model_dir) / 'model.pkl')
+    load_seconds = time.perf_counter() - start
+    # Touch every tree so mapped pages are actually resident
+    model.predict(np.zeros((1, n_features)))
+    barrier.wait()
+    rss_after, pss_after = _memory_kb()
+    results.put({
+        'mode': mode,
+        'load_ms': load_seconds * 1000,
+        'rss_kb': rss_after - rss_before,
+        'pss_kb': (pss_after - pss_before) if pss_after is not None else None,
+    })
+    barrier.wait()
+
+
+class Command(BaseCommand):
+    help = 'Compare load time and per-worker memory of pickled vs memory-mapped models'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of worker processes per mode (default: 4)'
+        )
+        parser.add_argument(
+            '--model-version',
+            type=str,
+            default=None,
+            help='Published model version to benchmark (default: current)'
+        )
+
+    def handle(self, *args, **options):
+        import joblib
+        from engagement.flat_forest import export_flat_forest, has_flat_forest
+        from engagement.model_store import ModelStore, ModelStoreError
+
+        workers = options['workers']
+        try:
+            model_dir = ModelStore().version_dir(options['model_version'])
+        except ModelStoreError as e:
+            raise CommandError(f'{e}. Run retrain_model first.')
+
+        model = joblib.load(model_dir / 'model.pkl')
+        n_features = model.n_features_in_
+
+        with tempfile.TemporaryDirectory() as scratch:
+            if not has_flat_forest(model_dir):
+                # Older versions were published without the flat layout
+                if not export_flat_forest(model, scratch):
+                    raise CommandError(f'{type(model).__name__} cannot be memory-mapped')
+                (Path(scratch) / 'model.pkl').symlink_to(model_dir / 'model.pkl')
+                model_dir = Path(scratch)
+            del model
+
+            self.stdout.write(f'Benchmarking {model_dir} with {workers} workers per mode...')
+            ctx = multiprocessing.get_context('spawn')
+            rows = []
+            for mode in MODES:
+                barrier = ctx.Barrier(workers)
+                results = ctx.Queue()
+                procs = [
+                    ctx.Process(target=_load_worker, args=(mode, str(model_dir), n_features, barrier, results))
+                    for _ in range(workers)
+                ]
+                for proc in procs:
+                    proc.start()
+                mode_rows = [results.get(timeout=300) for _ in procs]
+                for proc in procs:
+                    proc.join()
+                rows.extend(mode_rows)
+
+        self.stdout.write(f"{'mode':<8}{'load ms (avg)':>15}{'RSS MB/worker':>16}{'PSS MB/worker':>16}{'PSS MB total':>15}")
+        for mode in MODES:
+            mode_rows = [r for r in rows if r['mode'] == mode]
+            load_ms = sum(r['load_ms'] for r in mode_rows) / len(mode_rows)
+            rss = sum(r['rss_kb'] for r in mode_rows) / len(mode_rows) / 1024
+            pss_values = [r['pss_kb'] for r in mode_rows if r['pss_kb'] is not None]
+            pss = f"{sum(pss_values) / len(pss_values) / 1024:.1f}" if pss_values else 'n/a'
+            pss_total = f"{sum(pss_values) / 1024:.1f}" if pss_values else 'n/a'
+            self.stdout.write(f'{mode:<8}{load_ms:>15.1f}{rss:>16.1f}{pss:>16}{pss_total:>15}')
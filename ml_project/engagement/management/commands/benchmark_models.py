@@ -0,0 +1,235 @@
+"""
+Django management command to benchmark candidate models
+Week 8: Choosing a production model on accuracy and serving cost
+
+Every candidate is trained on the same train/test split and measured the
+way it would be served: fit time, single-row predict latency (p50/p99),
+batch throughput, artifact size, load time and R²/MSE. Forests are also
+measured in the memory-mapped flat layout used for serving. Results are
+written to JSON so runs can be compared, together with a recommendation:
+the most accurate candidate whose p99 latency fits the budget.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+DEFAULT_CANDIDATES = [
+    {'name': 'rf_default', 'family': 'random_forest',
+     'params': {'n_estimators': 100, 'max_depth': 10, 'min_samples_split': 5, 'min_samples_leaf': 2}},
+    {'name': 'rf_small', 'family': 'random_forest',
+     'params': {'n_estimators': 30, 'max_depth': 8, 'min_samples_leaf': 2}},
+    {'name': 'extra_trees', 'family': 'extra_trees',
+     'params': {'n_estimators': 100, 'max_depth': 10, 'min_samples_leaf': 2}},
+    {'name': 'gradient_boosting', 'family': 'gradient_boosting',
+     'params': {'n_estimators': 100, 'max_depth': 3, 'learning_rate': 0.1}},
+    {'name': 'ridge', 'family': 'ridge', 'params': {'alpha': 1.0}},
+]
+
+
+def _dir_size(path):
+    path = Path(path)
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob('*') if p.is_file())
+
+
+def measure_serving(model, X_test, latency_samples=200, batch_size=1000):
+    """Single-row latency percentiles (ms) and batch throughput (rows/s)"""
+    import numpy as np
+
+    rows = [X_test.iloc[[i % len(X_test)]] for i in range(latency_samples)]
+    model.predict(rows[0])  # warm-up
+    latencies = []
+    for row in rows:
+        start = time.perf_counter()
+        model.predict(row)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    batch = X_test.sample(n=batch_size, replace=True, random_state=0)
+    start = time.perf_counter()
+    model.predict(batch)
+    batch_seconds = time.perf_counter() - start
+    return {
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'batch_rows_per_sec': batch_size / batch_seconds if batch_seconds else None,
+    }
+
+
+def choose_production_model(results, max_p99_ms=None):
+    """Most accurate candidate within the latency budget, else the fastest"""
+    within_budget = [
+        r for r in results
+        if max_p99_ms is None or r['serving']['p99_ms'] <= max_p99_ms
+    ]
+    if within_budget:
+        return max(within_budget, key=lambda r: r['r2'])
+    return min(results, key=lambda r: r['serving']['p99_ms'])
+
+
+class Command(BaseCommand):
+    help = 'Train candidate models on one dataset and compare accuracy, fit time and serving cost'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dataset',
+            type=str,
+            default=None,
+            help='Dataset CSV to use (default: build one from engagement data)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Number of days to look back when building the dataset (default: 30)'
+        )
+        parser.add_argument(
+            '--candidates',
+            type=str,
+            default=None,
+            help='JSON file with a list of {"name", "family", "params"} candidates'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default='model_benchmark.json',
+            help='Where to write the results JSON (default: model_benchmark.json)'
+        )
+        parser.add_argument(
+            '--compare',
+            type=str,
+            default=None,
+            help='Previous results JSON to compare against'
+        )
+        parser.add_argument(
+            '--max-p99-ms',
+            type=float,
+            default=None,
+            help='Latency budget used to recommend a production model'
+        )
+        parser.add_argument(
+            '--latency-samples',
+            type=int,
+            default=200,
+            help='Single-row predictions timed per candidate (default: 200)'
+        )
+
+    def handle(self, *args, **options):
+        import joblib
+
+        ml_model_dir = Path(settings.BASE_DIR).parent / 'ml_model'
+        sys.path.append(str(ml_model_dir))
+        from train import load_dataset, split_dataset, build_model
+        from sklearn.metrics import mean_squared_error, r2_score
+        from engagement.flat_forest import FlatForest, export_flat_forest
+
+        candidates = DEFAULT_CANDIDATES
+        if options['candidates']:
+            with open(options['candidates']) as f:
+                candidates = json.load(f)
+
+        with tempfile.TemporaryDirectory() as scratch:
+            dataset_path = options['dataset']
+            if dataset_path is None:
+                from engagement.utils import build_dataset_csv
+                dataset_path = os.path.join(scratch, 'dataset.csv')
+                if build_dataset_csv(options['days'], dataset_path) is None:
+                    raise CommandError('No dataset could be built. Check if engagement data exists.')
+
+            loaded = load_dataset(dataset_path)
+            if loaded is None:
+                raise CommandError(f'Could not load dataset {dataset_path}')
+            X, y, feature_columns = loaded
+            X_train, X_test, y_train, y_test = split_dataset(X, y)
+
+            results = []
+            for candidate in candidates:
+                name = candidate['name']
+                self.stdout.write(f'Benchmarking {name}...')
+                model = build_model(candidate['family'], candidate.get('params'))
+
+                start = time.perf_counter()
+                model.fit(X_train, y_train)
+                fit_seconds = time.perf_counter() - start
+                y_pred = model.predict(X_test)
+
+                artifact_dir = Path(scratch) / name
+                artifact_dir.mkdir()
+                joblib.dump(model, artifact_dir / 'model.pkl')
+                start = time.perf_counter()
+                joblib.load(artifact_dir / 'model.pkl')
+                load_seconds = time.perf_counter() - start
+
+                result = {
+                    'name': name,
+                    'family': candidate['family'],
+                    'params': candidate.get('params', {}),
+                    'fit_seconds': fit_seconds,
+                    'r2': float(r2_score(y_test, y_pred)),
+                    'mse': float(mean_squared_error(y_test, y_pred)),
+                    'artifact_bytes': _dir_size(artifact_dir / 'model.pkl'),
+                    'load_ms': load_seconds * 1000,
+                    'layout': 'pickle',
+                }
+                serving_model = model
+                # Measure forests the way they are served: memory-mapped flat arrays
+                if export_flat_forest(model, artifact_dir):
+                    start = time.perf_counter()
+                    serving_model = FlatForest(artifact_dir)
+                    result['load_ms'] = (time.perf_counter() - start) * 1000
+                    result['artifact_bytes'] = _dir_size(artifact_dir / 'forest')
+                    result['layout'] = 'flat_forest'
+                result['serving'] = measure_serving(
+                    serving_model, X_test, latency_samples=options['latency_samples']
+                )
+                results.append(result)
+
+        recommended = choose_production_model(results, options['max_p99_ms'])
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'dataset': {'path': options['dataset'], 'rows': int(len(X)), 'features': feature_columns},
+            'max_p99_ms': options['max_p99_ms'],
+            'results': results,
+            'recommended': {
+                'name': recommended['name'],
+                'family': recommended['family'],
+                'params': recommended['params'],
+            },
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+
+        previous = {}
+        if options['compare']:
+            with open(options['compare']) as f:
+                previous = {r['name']: r for r in json.load(f).get('results', [])}
+
+        self._print_table(results, previous)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Recommended production model: {recommended['name']} "
+                f"(R² {recommended['r2']:.3f}, p99 {recommended['serving']['p99_ms']:.2f} ms)\n"
+                f"Results written to {options['output']}"
+            )
+        )
+
+    def _print_table(self, results, previous):
+        header = (f"{'model':<20}{'fit s':>8}{'p50 ms':>9}{'p99 ms':>9}{'rows/s':>11}"
+                  f"{'size KB':>10}{'load ms':>9}{'R²':>8}{'MSE':>10}")
+        self.stdout.write(header)
+        for r in results:
+            line = (f"{r['name']:<20}{r['fit_seconds']:>8.2f}{r['serving']['p50_ms']:>9.2f}"
+                    f"{r['serving']['p99_ms']:>9.2f}{r['serving']['batch_rows_per_sec'] or 0:>11.0f}"
+                    f"{r['artifact_bytes'] / 1024:>10.0f}{r['load_ms']:>9.1f}{r['r2']:>8.3f}{r['mse']:>10.2f}")
+            before = previous.get(r['name'])
+            if before:
+                line += (f"   (ΔR² {r['r2'] - before['r2']:+.3f}, "
+                         f"Δp99 {r['serving']['p99_ms'] - before['serving']['p99_ms']:+.2f} ms)")
+            self.stdout.write(line)
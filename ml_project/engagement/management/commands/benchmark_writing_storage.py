@@ -0,0 +1,145 @@
+"""
+Django management command to benchmark WritingInteraction text storage
+Week 9: Keeping the hot tables small
+
+Builds two scratch SQLite databases with the same synthetic writing rows:
+one with the essay and feedback text inline (the old layout) and one with
+the text zlib-compressed in a side table (the current layout). Reports the
+file size and the latency of the grade aggregates, which never need the
+text. The per-student aggregate is served by the covering index in both
+layouts; the per-page window aggregate has to read the table itself.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import zlib
+
+from django.core.management.base import BaseCommand
+
+INLINE_SCHEMA = """
+CREATE TABLE writing (
+    id INTEGER PRIMARY KEY, user_id INTEGER, page_id INTEGER NOT NULL,
+    user_input TEXT NOT NULL, openai_response TEXT NOT NULL,
+    grade INTEGER, timestamp TEXT NOT NULL
+);
+CREATE INDEX writing_user_grade ON writing (user_id, grade);
+"""
+
+SIDE_TABLE_SCHEMA = """
+CREATE TABLE writing (
+    id INTEGER PRIMARY KEY, user_id INTEGER, page_id INTEGER NOT NULL,
+    grade INTEGER, timestamp TEXT NOT NULL
+);
+CREATE INDEX writing_user_grade ON writing (user_id, grade);
+CREATE TABLE writing_body (
+    interaction_id INTEGER PRIMARY KEY REFERENCES writing (id),
+    user_input BLOB NOT NULL, openai_response BLOB NOT NULL
+);
+"""
+
+QUERIES = {
+    'per-student grade': 'SELECT user_id, AVG(grade), COUNT(*) FROM writing GROUP BY user_id',
+    'per-page window': (
+        "SELECT page_id, AVG(grade), COUNT(*) FROM writing "
+        "WHERE timestamp >= '2024-06-01' GROUP BY page_id"
+    ),
+}
+
+WORDS = (
+    'the student explains how the process works because energy is transferred between '
+    'systems and this shows that results depend on conditions so we can conclude evidence '
+    'suggests however feedback structure argument clear improve paragraph example accurate '
+    'reasoning further detail response question answer model marks point'
+).split()
+
+
+def _text(rng, chars):
+    words = []
+    length = 0
+    while length < chars:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)
+
+
+def _rows(count, avg_chars, seed):
+    rng = random.Random(seed)
+    for i in range(1, count + 1):
+        yield (
+            i, rng.randrange(500), rng.randrange(200),
+            _text(rng, rng.randint(avg_chars // 2, avg_chars * 3 // 2)),
+            _text(rng, rng.randint(avg_chars // 2, avg_chars * 3 // 2)),
+            rng.randrange(11), f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00',
+        )
+
+
+def build(path, layout, count, avg_chars, seed):
+    conn = sqlite3.connect(path)
+    if layout == 'inline':
+        conn.executescript(INLINE_SCHEMA)
+        conn.executemany('INSERT INTO writing VALUES (?, ?, ?, ?, ?, ?, ?)', _rows(count, avg_chars, seed))
+    else:
+        conn.executescript(SIDE_TABLE_SCHEMA)
+        for row in _rows(count, avg_chars, seed):
+            id_, user_id, page_id, user_input, openai_response, grade, timestamp = row
+            conn.execute('INSERT INTO writing VALUES (?, ?, ?, ?, ?)', (id_, user_id, page_id, grade, timestamp))
+            conn.execute('INSERT INTO writing_body VALUES (?, ?, ?)', (
+                id_, zlib.compress(user_input.encode()), zlib.compress(openai_response.encode())
+            ))
+    conn.commit()
+    conn.execute('VACUUM')
+    conn.close()
+    return os.path.getsize(path)
+
+
+def time_query(path, sql, repeats):
+    """Best-of-N latency in ms with a cold connection each time"""
+    best = float('inf')
+    for _ in range(repeats):
+        conn = sqlite3.connect(path)
+        start = time.perf_counter()
+        conn.execute(sql).fetchall()
+        best = min(best, (time.perf_counter() - start) * 1000)
+        conn.close()
+    return best
+
+
+class Command(BaseCommand):
+    help = 'Compare DB size and grade-aggregate latency of inline vs compressed side-table writing text'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000,
+                            help='Writing interactions to generate (default: 50000)')
+        parser.add_argument('--avg-chars', type=int, default=1500,
+                            help='Average length of each essay and feedback text (default: 1500)')
+        parser.add_argument('--repeats', type=int, default=5,
+                            help='Runs per query; the best is reported (default: 5)')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        results = {}
+        with tempfile.TemporaryDirectory() as scratch:
+            for layout in ('inline', 'side-table'):
+                path = os.path.join(scratch, f'{layout}.sqlite3')
+                self.stdout.write(f"Building {layout} database with {options['rows']} rows...")
+                size = build(path, layout, options['rows'], options['avg_chars'], options['seed'])
+                results[layout] = {
+                    'size_mb': size / 1024 / 1024,
+                    **{name: time_query(path, sql, options['repeats']) for name, sql in QUERIES.items()},
+                }
+
+        header = f"{'layout':<12}{'size MB':>10}" + ''.join(f'{name + " ms":>22}' for name in QUERIES)
+        self.stdout.write(header)
+        for layout, result in results.items():
+            self.stdout.write(
+                f"{layout:<12}{result['size_mb']:>10.1f}"
+                + ''.join(f'{result[name]:>22.2f}' for name in QUERIES)
+            )
+        inline, side = results['inline'], results['side-table']
+        self.stdout.write(self.style.SUCCESS(
+            f"Side table: {1 - side['size_mb'] / inline['size_mb']:.0%} smaller, per-page window "
+            f"aggregate {inline['per-page window'] / side['per-page window']:.1f}x faster"
+        ))
@@ -23,10 +23,17 @@ class Command(BaseCommand):
             default='dataset.csv',
             help='Output CSV file path (default: dataset.csv)'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes; students are sharded by id range (default: 1)'
+        )
 
     def handle(self, *args, **options):
         days_back = options['days']
         output_path = options['output']
+        workers = options['workers']
         
         self.stdout.write(
             self.style.SUCCESS(f'Building dataset for the last {days_back} days...')
@@ -34,7 +41,7 @@ class Command(BaseCommand):
         
         try:
             # Build dataset
-            dataset = build_dataset_csv(days_back, output_path)
+            dataset = build_dataset_csv(days_back, output_path, workers=workers)
             
             if dataset is not None:
                 self.stdout.write(
@@ -0,0 +1,46 @@
+"""
+Django management command to generate synthetic engagement data
+Week 10: Seeing where the time goes
+
+Either bulk-loads a seeded synthetic data set into the configured database
+(meant for an empty scratch database, e.g. DB_NAME=/tmp/synthetic.sqlite3)
+or writes it as a textbook API payload for exercising the import.
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from engagement.synthetic import SyntheticSpec, generate_payload, load_synthetic
+
+
+class Command(BaseCommand):
+    help = 'Generate a seeded synthetic engagement data set'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--slides', type=int, default=200)
+        parser.add_argument('--questions', type=int, default=100)
+        parser.add_argument('--sessions', type=int, default=10,
+                            help='Slide sessions per student (default: 10)')
+        parser.add_argument('--attempts', type=int, default=None,
+                            help='Question attempts per student (default: half the sessions)')
+        parser.add_argument('--writing', type=int, default=1,
+                            help='Writing interactions per student (default: 1)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--payload', type=str, default=None,
+                            help='Write the textbook API JSON payload to this file instead of loading the database')
+
+    def handle(self, *args, **options):
+        spec = SyntheticSpec(
+            options['students'], slides=options['slides'], questions=options['questions'],
+            sessions_per_student=options['sessions'], attempts_per_student=options['attempts'],
+            writing_per_student=options['writing'], seed=options['seed'],
+        )
+        if options['payload']:
+            with open(options['payload'], 'w') as f:
+                json.dump(generate_payload(spec), f)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {spec} payload to {options['payload']}"))
+            return
+        counts = load_synthetic(spec)
+        summary = ', '.join(f'{count} {name}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Loaded {spec}: {summary}'))
@@ -0,0 +1,262 @@
+"""
+Django management command to load-test the engagement endpoints over HTTP
+Week 10: Seeing where the time goes
+
+Prepares a synthetic database (and a model trained on it) in scratch files,
+starts the app on it in a separate server process -- Django's runserver,
+gunicorn (WSGI) or uvicorn (ASGI) with a chosen number of workers -- and
+drives concurrent keep-alive clients at a weighted mix of endpoints.
+Reports throughput, p50/p95/p99 latency and error rate per endpoint, and
+writes them to JSON so server modes and worker counts can be compared.
+"""
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+ENDPOINTS = {
+    'homepage': '/engagement/',
+    'student': '/engagement/student/{student_id}/',
+    'predict': '/engagement/predict/{student_id}/',
+    'export_csv': '/engagement/export/csv/',
+    'export_json': '/engagement/export/json/',
+}
+DEFAULT_MIX = 'homepage=2,student=4,predict=4,export_csv=0.05,export_json=0.05'
+SERVER_MODULES = {'wsgi': 'gunicorn', 'asgi': 'uvicorn'}
+
+
+def parse_mix(text):
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise CommandError(f"Unknown endpoint '{name}' (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def summarise(samples, seconds):
+    """Per-endpoint throughput, latency percentiles and error rate from (endpoint, ms, ok) samples"""
+    import numpy as np
+
+    by_endpoint = {}
+    for endpoint, ms, ok in samples:
+        by_endpoint.setdefault(endpoint, []).append((ms, ok))
+    by_endpoint['total'] = [(ms, ok) for _, ms, ok in samples]
+    summary = {}
+    for endpoint, rows in by_endpoint.items():
+        if not rows:
+            continue
+        latencies = np.array([ms for ms, _ in rows])
+        errors = sum(1 for _, ok in rows if not ok)
+        summary[endpoint] = {
+            'requests': len(rows),
+            'errors': errors,
+            'error_rate': errors / len(rows),
+            'rps': len(rows) / seconds,
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p95_ms': float(np.percentile(latencies, 95)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'max_ms': float(latencies.max()),
+        }
+    return summary
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = 'Start the app on a synthetic database and load-test its endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=('runserver', 'wsgi', 'asgi'), default='runserver',
+                            help='runserver (threaded dev server), wsgi (gunicorn) or asgi (uvicorn)')
+        parser.add_argument('--workers', type=int, default=1, help='Server worker processes (wsgi/asgi)')
+        parser.add_argument('--threads', type=int, default=1, help='Threads per gunicorn worker (wsgi)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients (default: 8)')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to measure (default: 30)')
+        parser.add_argument('--warmup', type=float, default=3, help='Seconds of unmeasured load first (default: 3)')
+        parser.add_argument('--mix', type=str, default=DEFAULT_MIX,
+                            help=f'Endpoint weights (default: {DEFAULT_MIX})')
+        parser.add_argument('--students', type=int, default=1000, help='Synthetic students (default: 1000)')
+        parser.add_argument('--db', type=str, default=None,
+                            help='Synthetic SQLite file; built if missing (default: a file in the temp directory)')
+        parser.add_argument('--rebuild', action='store_true', help='Rebuild the synthetic database')
+        parser.add_argument('--url', type=str, default=None,
+                            help='Load-test an already running server instead of starting one')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', type=str, default='loadtest.json', help='Results JSON (default: loadtest.json)')
+        parser.add_argument('--compare', type=str, default=None, help='Previous results JSON to compare against')
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        students = options['students']
+        server = None
+        if options['url']:
+            base_url = options['url'].rstrip('/')
+        else:
+            env = self.prepare_environment(options)
+            server, base_url, log = self.start_server(options, env)
+        try:
+            self.stdout.write(
+                f"Load-testing {base_url} with {options['concurrency']} clients for {options['duration']}s..."
+            )
+            samples, seconds = self.run_load(base_url, mix, students, options)
+        finally:
+            if server:
+                server.terminate()
+                try:
+                    server.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+                log.close()
+
+        summary = summarise(samples, seconds)
+        previous = {}
+        if options['compare']:
+            with open(options['compare']) as f:
+                previous = json.load(f).get('endpoints', {})
+        self._print_table(summary, previous)
+        config = {key: options[key] for key in ('server', 'workers', 'threads', 'concurrency', 'duration', 'students')}
+        with open(options['output'], 'w') as f:
+            json.dump({'config': {**config, 'mix': mix, 'url': base_url}, 'endpoints': summary}, f, indent=2)
+        total = summary.get('total', {'rps': 0, 'error_rate': 0})
+        self.stdout.write(self.style.SUCCESS(
+            f"{total['rps']:.1f} req/s, {total['error_rate']:.1%} errors; results written to {options['output']}"
+        ))
+
+    def prepare_environment(self, options):
+        """Build the synthetic database and a model trained on it; returns the server's environment"""
+        db = Path(options['db'] or Path(tempfile.gettempdir()) / f"engagement-loadtest-{options['students']}.sqlite3")
+        env = {
+            **os.environ,
+            'DB_ENGINE': 'sqlite',
+            'DB_NAME': str(db),
+            # No snapshot file: analytics reads fall back to the synthetic primary
+            'ANALYTICS_DB_NAME': str(db.with_suffix('.analytics.sqlite3')),
+            'MODEL_STORE_DIR': str(db.with_suffix('.models')),
+            'DJANGO_DEBUG': '0',
+            'PROFILING_ENABLED': '0',
+        }
+        if options['rebuild'] and db.exists():
+            db.unlink()
+        if not db.exists():
+            self.stdout.write(f"Building synthetic database {db} with {options['students']} students...")
+            manage = [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py')]
+            for command in (
+                ['migrate', '-v', '0'],
+                ['generate_synthetic_data', '--students', str(options['students']), '--seed', str(options['seed'])],
+                ['retrain_model', '--force'],
+            ):
+                result = subprocess.run(manage + command, env=env, cwd=settings.BASE_DIR,
+                                        capture_output=True, text=True)
+                if result.returncode != 0:
+                    raise CommandError(f"{' '.join(command)} failed:\n{result.stderr[-2000:]}")
+        return env
+
+    def start_server(self, options, env):
+        port = _free_port()
+        if options['server'] == 'runserver':
+            command = [sys.executable, 'manage.py', 'runserver', '--noreload', '--skip-checks', f'127.0.0.1:{port}']
+        else:
+            module = SERVER_MODULES[options['server']]
+            try:
+                __import__(module)
+            except ImportError:
+                raise CommandError(f"--server {options['server']} needs {module}: pip install {module}")
+            if module == 'gunicorn':
+                command = [sys.executable, '-m', 'gunicorn', 'ml_project.wsgi:application',
+                           '--bind', f'127.0.0.1:{port}', '--workers', str(options['workers']),
+                           '--threads', str(options['threads'])]
+            else:
+                command = [sys.executable, '-m', 'uvicorn', 'ml_project.asgi:application',
+                           '--host', '127.0.0.1', '--port', str(port), '--workers', str(options['workers'])]
+        log = tempfile.NamedTemporaryFile('w+', prefix='loadtest-server-', suffix='.log', delete=False)
+        server = subprocess.Popen(command, env=env, cwd=settings.BASE_DIR, stdout=log, stderr=subprocess.STDOUT)
+        base_url = f'http://127.0.0.1:{port}'
+        self._wait_until_ready(server, base_url, log)
+        self.stdout.write(f"Started {options['server']} on {base_url} (log: {log.name})")
+        return server, base_url, log
+
+    def _wait_until_ready(self, server, base_url, log, timeout=60):
+        import requests
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                log.seek(0)
+                raise CommandError(f'Server exited during startup:\n{log.read()[-2000:]}')
+            try:
+                requests.get(f'{base_url}/metrics', timeout=1)
+                return
+            except requests.RequestException:
+                time.sleep(0.2)
+        server.kill()
+        raise CommandError(f'Server did not answer within {timeout}s (log: {log.name})')
+
+    def run_load(self, base_url, mix, students, options):
+        import requests
+
+        names, weights = list(mix), list(mix.values())
+        samples = []
+        lock = threading.Lock()
+        start = time.monotonic()
+        measure_from = start + options['warmup']
+        stop_at = measure_from + options['duration']
+
+        def client(index):
+            rng = random.Random(f"{options['seed']}-{index}")
+            session = requests.Session()
+            local = []
+            while True:
+                now = time.monotonic()
+                if now >= stop_at:
+                    break
+                endpoint = rng.choices(names, weights)[0]
+                url = base_url + ENDPOINTS[endpoint].format(student_id=rng.randint(1, students))
+                sent = time.perf_counter()
+                try:
+                    ok = session.get(url, timeout=120).status_code < 400
+                except requests.RequestException:
+                    ok = False
+                ms = (time.perf_counter() - sent) * 1000
+                # Requests that started during warm-up are not measured
+                if now >= measure_from:
+                    local.append((endpoint, ms, ok))
+            with lock:
+                samples.extend(local)
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Requests in flight at the deadline finish late; measure up to the last one
+        seconds = max(time.monotonic(), stop_at) - measure_from
+        return samples, seconds
+
+    def _print_table(self, summary, previous):
+        header = (f"{'endpoint':<14}{'requests':>10}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}"
+                  f"{'p99 ms':>10}{'max ms':>10}{'errors':>9}")
+        self.stdout.write(header)
+        for endpoint, r in summary.items():
+            line = (f"{endpoint:<14}{r['requests']:>10}{r['rps']:>9.1f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+                    f"{r['p99_ms']:>10.1f}{r['max_ms']:>10.1f}{r['error_rate']:>9.1%}")
+            before = previous.get(endpoint)
+            if before:
+                line += (f"   (Δreq/s {r['rps'] - before['rps']:+.1f}, "
+                         f"Δp99 {r['p99_ms'] - before['p99_ms']:+.1f} ms)")
+            self.stdout.write(line)
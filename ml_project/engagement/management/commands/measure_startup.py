@@ -0,0 +1,100 @@
+"""
+Django management command to measure cold-start times
+Week 10: Seeing where the time goes
+
+Each run is a fresh Python process, as a newly booted worker or a manage.py
+invocation would be. It reports the median over several runs of:
+  boot             django.setup() plus loading the URLconf
+  first request    the first response to each --path through the WSGI handler
+  manage.py check  a whole management command invocation
+It also lists which heavy modules the boot imported. Use --warmup to compare
+with ENGAGEMENT_WARMUP enabled.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+HEAVY_MODULES = ('pandas', 'numpy', 'sklearn', 'scipy', 'joblib', 'requests')
+
+WORKER_SCRIPT = r"""
+import json, os, sys, time
+from io import BytesIO
+start = time.perf_counter()
+import django
+django.setup()
+from django.conf import settings
+from django.urls import get_resolver
+get_resolver().url_patterns
+boot = time.perf_counter() - start
+heavy = [m for m in json.loads(sys.argv[1]) if m in sys.modules]
+
+from django.core.handlers.wsgi import WSGIHandler
+from wsgiref.util import setup_testing_defaults
+handler = WSGIHandler()
+requests = {}
+for path in json.loads(sys.argv[2]):
+    environ = {'PATH_INFO': path, 'HTTP_HOST': 'localhost', 'wsgi.input': BytesIO()}
+    setup_testing_defaults(environ)
+    status = []
+    t = time.perf_counter()
+    body = b''.join(handler(environ, lambda s, h, *a: status.append(s)))
+    requests[path] = {'seconds': time.perf_counter() - t, 'status': status[0]}
+print(json.dumps({'boot': boot, 'heavy': heavy, 'requests': requests}))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Measure worker boot, first-request and manage.py cold-start times in fresh processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Processes per measurement (default: 5)')
+        parser.add_argument('--path', action='append', default=None,
+                            help='Path for the first-request timing (repeatable; default: auth reminder, student 1, predict 1)')
+        parser.add_argument('--warmup', action='store_true', help='Boot with ENGAGEMENT_WARMUP=1')
+
+    def _run(self, args, env):
+        result = subprocess.run(args, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise CommandError(f"{' '.join(args[:3])} failed:\n{result.stderr[-2000:]}")
+        return result.stdout
+
+    def handle(self, *args, **options):
+        import time
+
+        paths = options['path'] or ['/engagement/auth-reminder/', '/engagement/student/1/', '/engagement/predict/1/']
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'ml_project.settings')}
+        env['ENGAGEMENT_WARMUP'] = '1' if options['warmup'] else '0'
+
+        boots, heavy, first = [], set(), {path: [] for path in paths}
+        statuses = {}
+        for _ in range(options['runs']):
+            out = self._run([sys.executable, '-c', WORKER_SCRIPT, json.dumps(HEAVY_MODULES), json.dumps(paths)], env)
+            result = json.loads(out.strip().splitlines()[-1])
+            boots.append(result['boot'])
+            heavy.update(result['heavy'])
+            for path, timing in result['requests'].items():
+                first[path].append(timing['seconds'])
+                statuses[path] = timing['status']
+
+        checks = []
+        for _ in range(options['runs']):
+            start = time.perf_counter()
+            self._run([sys.executable, 'manage.py', 'check'], env)
+            checks.append(time.perf_counter() - start)
+
+        ms = lambda values: statistics.median(values) * 1000
+        self.stdout.write(f"{'measurement':<40}{'median ms':>12}")
+        self.stdout.write(f"{'boot (setup + URLconf)':<40}{ms(boots):>12.1f}")
+        for path, values in first.items():
+            label = f"first {path} ({statuses[path].split()[0]})"
+            self.stdout.write(f"{label:<40}{ms(values):>12.1f}")
+        self.stdout.write(f"{'manage.py check (whole process)':<40}{ms(checks):>12.1f}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Heavy modules imported at boot: {', '.join(sorted(heavy)) or 'none'}"
+            f" (warm-up {'on' if options['warmup'] else 'off'}, {options['runs']} runs)"
+        ))
@@ -0,0 +1,52 @@
+"""
+Django management command to prune push ingestion keys
+Week 10: Seeing where the time goes
+
+IngestedEvent keeps the idempotency key of every pushed event so a resent
+batch is not applied twice. Keys older than the retry horizon
+(INGEST_KEY_RETENTION_DAYS) are no longer needed and are deleted in batches.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from engagement.ingest import prune_ingested_events
+from engagement.models import IngestedEvent
+
+
+class Command(BaseCommand):
+    help = 'Delete push ingestion idempotency keys older than the retry horizon'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.INGEST_KEY_RETENTION_DAYS,
+            help=f'Keep keys received in the last this many days (default: {settings.INGEST_KEY_RETENTION_DAYS})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Keys deleted per query (default: 5000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many keys would be deleted'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        before = timezone.now() - timedelta(days=options['days'])
+
+        if options['dry_run']:
+            count = IngestedEvent.objects.filter(received_at__lt=before).count()
+            self.stdout.write(f'{count} ingestion keys received before {before:%Y-%m-%d %H:%M}')
+            return
+
+        deleted = prune_ingested_events(before, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} ingestion keys received before {before:%Y-%m-%d %H:%M}'))
@@ -4,9 +4,12 @@ Week 8: Automation and model maintenance
 """
 from django.core.management.base import BaseCommand
 from django.conf import settings
+import json
 import os
 import sys
+import tempfile
 from pathlib import Path
+from engagement.versions import MODEL, bump
 
 class Command(BaseCommand):
     help = 'Retrain ML model with latest engagement data'
@@ -23,19 +26,80 @@ class Command(BaseCommand):
             default=30,
             help='Number of days to look back for engagement data (default: 30)'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes for the dataset build (default: 1)'
+        )
+        parser.add_argument(
+            '--search',
+            action='store_true',
+            help='Pick the model family and hyperparameters with a parallel cross-validated search'
+        )
+        parser.add_argument(
+            '--time-budget',
+            type=float,
+            default=None,
+            help='Time budget in seconds for the hyperparameter search'
+        )
+        parser.add_argument(
+            '--benchmark-results',
+            type=str,
+            default=None,
+            help='benchmark_models JSON; train its recommended model instead of the default forest'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Warm-start the current model with new trees instead of fitting from scratch'
+        )
+        parser.add_argument(
+            '--add-trees',
+            type=int,
+            default=25,
+            help='Trees added per incremental retrain (default: 25)'
+        )
+        parser.add_argument(
+            '--max-trees',
+            type=int,
+            default=None,
+            help='Drop the oldest trees once the forest grows beyond this size'
+        )
+        parser.add_argument(
+            '--keep',
+            type=int,
+            default=10,
+            help='Number of published model versions to keep (default: 10)'
+        )
 
     def handle(self, *args, **options):
         force = options['force']
         days_back = options['days']
+        workers = options['workers']
+        search = options['search']
+        time_budget = options['time_budget']
+        incremental = options['incremental']
         
         self.stdout.write(
             self.style.SUCCESS(f'Starting weekly model retraining (last {days_back} days)...')
         )
         
         try:
+            project_root = Path(settings.BASE_DIR).parent
+            ml_model_dir = project_root / 'ml_model'
+            
+            if not ml_model_dir.exists():
+                self.stdout.write(
+                    self.style.ERROR('ML model directory not found. Please check project structure.')
+                )
+                return
+            
             # Build new dataset
             from engagement.utils import build_dataset_csv
-            dataset = build_dataset_csv(days_back, 'dataset_retrain.csv')
+            dataset_path = ml_model_dir / 'dataset_retrain.csv'
+            # The recomputed features also refresh the cohort sketches
+            dataset = build_dataset_csv(days_back, dataset_path, workers=workers, record=True)
             
             if dataset is None:
                 self.stdout.write(
@@ -43,54 +107,78 @@ class Command(BaseCommand):
                 )
                 if not force:
                     return
-                else:
-                    self.stdout.write('Force flag set, continuing with existing data...')
+                if not dataset_path.exists():
+                    self.stdout.write(
+                        self.style.ERROR(f'No dataset at {dataset_path} to train on, --force cannot retrain without data.')
+                    )
+                    return
+                self.stdout.write('Force flag set, continuing with existing data...')
             
-            # Train new model
-            project_root = Path(settings.BASE_DIR).parent
-            ml_model_dir = project_root / 'ml_model'
+            # Import training helpers
+            sys.path.append(str(ml_model_dir))
+            from train import train_model, train_incremental, dataset_fingerprint
+            from engagement.model_store import ModelStore
             
-            if not ml_model_dir.exists():
+            store = ModelStore()
+            previous_metrics = store.load_metrics()
+            
+            # Skip entirely when the input data has not changed since the live model
+            fingerprint = dataset_fingerprint(dataset_path)
+            if not force and store.load_manifest().get('data_fingerprint') == fingerprint:
+                os.remove(dataset_path)
+                saved = previous_metrics.get('fit_seconds')
                 self.stdout.write(
-                    self.style.ERROR('ML model directory not found. Please check project structure.')
+                    self.style.SUCCESS(
+                        f'Dataset unchanged (fingerprint {fingerprint[:12]}), skipping retrain.'
+                        + (f' Saved ~{saved:.1f}s of training.' if saved else '')
+                    )
                 )
                 return
             
-            # Change to ml_model directory and run training
-            os.chdir(ml_model_dir)
-            
-            # Import and run training
-            sys.path.append(str(ml_model_dir))
-            from train import train_model
+            # Train into a scratch directory; the live artifacts are never touched in place
+            with tempfile.TemporaryDirectory() as build_dir:
+                if incremental and store.current_version():
+                    self.stdout.write('Incrementally retraining current model...')
+                    result = train_incremental(
+                        dataset_path, store.model_path(), previous_metrics, build_dir,
+                        add_trees=options['add_trees'], max_trees=options['max_trees']
+                    )
+                else:
+                    self.stdout.write('Training new model...')
+                    model_family, model_params = self._recommended_model(options['benchmark_results'])
+                    result = train_model(
+                        dataset_path, build_dir, search=search, time_budget=time_budget,
+                        model_family=model_family, model_params=model_params
+                    )
+                
+                if result:
+                    model, metrics, feature_importance = result
+                    feature_columns = list(getattr(model, 'feature_names_in_', feature_importance))
+                    version = store.publish(build_dir, feature_columns, metrics.get('data_fingerprint'), model=model)
+                    bump(MODEL)
+                    store.prune(keep=options['keep'])
             
-            self.stdout.write('Training new model...')
-            result = train_model('dataset_retrain.csv', '.')
+            # Clean up temp files
+            os.remove(dataset_path)
             
             if result:
-                model, metrics, feature_importance = result
-                
-                # Copy new model to Django project root
-                import shutil
-                django_root = Path(settings.BASE_DIR)
-                new_model_path = django_root / 'model.pkl'
-                new_metrics_path = django_root / 'metrics.json'
-                
-                shutil.copy('model.pkl', new_model_path)
-                shutil.copy('metrics.json', new_metrics_path)
-                
-                # Clean up temp files
-                os.remove('dataset_retrain.csv')
-                
                 self.stdout.write(
                     self.style.SUCCESS(
                         f'Model retraining completed successfully!\n'
-                        f'New model saved to: {new_model_path}\n'
-                        f'R² Score: {metrics["r2"]:.3f}\n'
+                        f'Published model version: {version}\n'
+                        f'R² Score: {metrics["r2"]:.3f}'
+                        + (' (optimistic, see metrics.json)' if metrics.get('optimistic_evaluation') else '')
+                        + '\n'
                         f'RMSE: {metrics["rmse"]:.2f}'
                     )
                 )
                 
-
+                saved = metrics.get('incremental', {}).get('seconds_saved')
+                if saved is not None:
+                    self.stdout.write(
+                        f'Incremental fit took {metrics["fit_seconds"]:.2f}s, '
+                        f'~{saved:.2f}s less than a full retrain'
+                    )
                 
             else:
                 self.stdout.write(
@@ -102,3 +190,12 @@ class Command(BaseCommand):
                 self.style.ERROR(f'Error during retraining: {str(e)}')
             )
             raise
+
+    def _recommended_model(self, results_path):
+        """(family, params) recommended by a benchmark_models run, or the defaults"""
+        if not results_path:
+            return 'random_forest', None
+        with open(results_path) as f:
+            recommended = json.load(f)['recommended']
+        self.stdout.write(f"Using benchmark recommendation: {recommended['name']}")
+        return recommended['family'], recommended['params']
@@ -0,0 +1,45 @@
+"""
+Django management command to roll the served model back to an earlier version
+Week 8: Automation and model maintenance
+"""
+from django.core.management.base import BaseCommand, CommandError
+from engagement.model_store import ModelStore, ModelStoreError
+from engagement.versions import MODEL, bump
+
+class Command(BaseCommand):
+    help = 'Point the served model at an earlier published version'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--to',
+            type=str,
+            default=None,
+            help='Version to serve (default: the version published before the current one)'
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List published versions and exit'
+        )
+
+    def handle(self, *args, **options):
+        store = ModelStore()
+        current = store.current_version()
+        
+        if options['list']:
+            for version in store.versions():
+                metrics = store.load_metrics(version)
+                marker = '*' if version == current else ' '
+                r2 = metrics.get('r2')
+                self.stdout.write(f'{marker} {version}' + (f'  R²={r2:.3f}' if r2 is not None else ''))
+            return
+        
+        try:
+            version = store.rollback(options['to'])
+        except ModelStoreError as e:
+            raise CommandError(str(e))
+        bump(MODEL)
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Now serving model version {version} (was {current})')
+        )
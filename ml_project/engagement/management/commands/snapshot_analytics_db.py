@@ -0,0 +1,64 @@
+"""
+Django management command to refresh the analytics read replica
+Week 9: Database tuning
+
+With SQLite the analytics alias is a snapshot of the primary database.
+The snapshot is taken with SQLite's online backup API (a consistent copy
+that does not block the importer for long), switched to a rollback
+journal, and swapped into place with an atomic rename, so dashboards
+always open either the previous or the new snapshot. Run it from cron
+as often as the dashboards need fresh data.
+"""
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from engagement.versions import DATA, STUDENTS, bump
+
+
+def snapshot_sqlite(source, target, pages_per_step=4096):
+    """Copy the SQLite database at source to target atomically; returns the size in bytes"""
+    tmp_path = f'{target}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    src = sqlite3.connect(f'file:{source}?mode=ro', uri=True)
+    dst = sqlite3.connect(tmp_path)
+    try:
+        # Copy in steps so the importer can take its write lock in between
+        src.backup(dst, pages=pages_per_step)
+        dst.execute('PRAGMA journal_mode = DELETE')
+        dst.execute('ANALYZE')
+        dst.commit()
+    finally:
+        dst.close()
+        src.close()
+    os.replace(tmp_path, target)
+    return os.path.getsize(target)
+
+
+class Command(BaseCommand):
+    help = 'Snapshot the primary SQLite database into the analytics read replica'
+
+    def handle(self, *args, **options):
+        alias = settings.ANALYTICS_DB_ALIAS
+        primary = settings.DATABASES['default']
+        replica = settings.DATABASES.get(alias)
+        if replica is None:
+            raise CommandError(f'No "{alias}" database is configured')
+        if not (primary['ENGINE'].endswith('sqlite3') and replica['ENGINE'].endswith('sqlite3')):
+            raise CommandError('Snapshots are only used with SQLite; PostgreSQL replicas are kept in sync by replication')
+
+        start = time.perf_counter()
+        size = snapshot_sqlite(str(primary['NAME']), str(replica['NAME']))
+        # Dashboards read the snapshot, so this is when their data changes
+        bump(DATA, STUDENTS)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Analytics snapshot written to {replica['NAME']} "
+                f"({size / 1024 / 1024:.1f} MB in {time.perf_counter() - start:.2f}s)"
+            )
+        )
@@ -0,0 +1,174 @@
+"""
+Request metrics
+Week 10: Seeing where the time goes
+
+MetricsMiddleware records, per view: latency, number of SQL queries and
+time spent in them, and response size; predict calls record model
+inference time through timed_inference(). Everything is kept in
+per-process histograms and exposed in the Prometheus text format on
+/metrics. Views that run more queries than their budget in
+settings.METRICS_QUERY_BUDGETS log a warning.
+
+Each worker process keeps its own numbers, so scrape every worker (or run
+one process per scrape target).
+"""
+import hmac
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def snapshot(self, labels):
+        with self._lock:
+            series = self._series.get(labels)
+            return None if series is None else {**series, 'buckets': list(series['buckets'])}
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        def label_text(values, extra=()):
+            pairs = [*zip(self.label_names, values), *extra]
+            escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"') for _, v in pairs)
+            return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, data in series:
+            for bound, count in zip(self.buckets, data['buckets']):
+                lines.append(f'{self.name}_bucket{label_text(labels, [("le", bound)])} {count}')
+            lines.append(f'{self.name}_bucket{label_text(labels, [("le", "+Inf")])} {data["count"]}')
+            lines.append(f'{self.name}_sum{label_text(labels)} {data["sum"]}')
+            lines.append(f'{self.name}_count{label_text(labels)} {data["count"]}')
+        return '\n'.join(lines)
+
+
+REQUEST_SECONDS = Histogram(
+    'engagement_request_seconds', 'Request latency by view', ('view', 'method', 'status'), LATENCY_BUCKETS
+)
+REQUEST_QUERIES = Histogram(
+    'engagement_request_queries', 'SQL queries per request by view', ('view',), QUERY_COUNT_BUCKETS
+)
+REQUEST_QUERY_SECONDS = Histogram(
+    'engagement_request_query_seconds', 'Time in SQL per request by view', ('view',), LATENCY_BUCKETS
+)
+RESPONSE_BYTES = Histogram(
+    'engagement_response_bytes', 'Response body size by view (streaming responses excluded)', ('view',), SIZE_BUCKETS
+)
+INFERENCE_SECONDS = Histogram(
+    'engagement_inference_seconds', 'Model predict() latency', ('model',), LATENCY_BUCKETS
+)
+REGISTRY = (REQUEST_SECONDS, REQUEST_QUERIES, REQUEST_QUERY_SECONDS, RESPONSE_BYTES, INFERENCE_SECONDS)
+
+
+@contextmanager
+def timed_inference(model):
+    """Record the time of the predict call(s) in the block"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        INFERENCE_SECONDS.observe((type(model).__name__,), time.perf_counter() - start)
+
+
+class QueryCounter:
+    """connection.execute_wrapper that counts statements and their time"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match._func_path
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        view = view_label(request)
+        REQUEST_SECONDS.observe((view, request.method, str(response.status_code)), elapsed)
+        REQUEST_QUERIES.observe((view,), counter.count)
+        REQUEST_QUERY_SECONDS.observe((view,), counter.seconds)
+        if not response.streaming:
+            RESPONSE_BYTES.observe((view,), len(response.content))
+
+        budget = getattr(settings, 'METRICS_QUERY_BUDGETS', {}).get(view)
+        if budget is not None and counter.count > budget:
+            logger.warning(
+                '%s ran %d SQL queries (budget %d) in %.1f ms for %s',
+                view, counter.count, budget, elapsed * 1000, request.get_full_path()
+            )
+        return response
+
+
+def metrics_view(request):
+    """Prometheus text exposition of this process's metrics
+
+    Scrapers authenticate with METRICS_TOKEN; without one, only staff can read it.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode()):
+            return HttpResponseForbidden('Invalid metrics token')
+    elif not getattr(request, 'user', None) or not request.user.is_staff:
+        return HttpResponseForbidden('Set METRICS_TOKEN for scrapers, or sign in as staff')
+    body = '\n'.join(h.render() for h in REGISTRY) + '\n'
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='revisionquestionattempt',
+            index=models.Index(fields=['user', 'viewed', 'question'], name='rqa_user_viewed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='revisionquestionattempt',
+            index=models.Index(fields=['viewed'], name='rqa_viewed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='revisionquestionattemptdetail',
+            index=models.Index(fields=['attempt', 'timestamp', 'is_correct'], name='rqad_attempt_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='revisionquestionattemptdetail',
+            index=models.Index(fields=['timestamp', 'is_correct'], name='rqad_ts_correct_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userslideread',
+            index=models.Index(fields=['user', 'slide_status'], name='usr_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userslidereadsession',
+            index=models.Index(fields=['slide_read', 'expanded', 'collapsed', 'read'], name='usrs_slide_read_exp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userslidereadsession',
+            index=models.Index(fields=['expanded', 'collapsed', 'read'], name='usrs_expanded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='writinginteraction',
+            index=models.Index(fields=['user_id', 'grade'], name='wi_user_grade_idx'),
+        ),
+    ]
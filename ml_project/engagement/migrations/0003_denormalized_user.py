@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_user(apps, schema_editor):
+    """Copy the owning user onto existing sessions and attempt details"""
+    UserSlideRead = apps.get_model('engagement', 'UserSlideRead')
+    UserSlideReadSession = apps.get_model('engagement', 'UserSlideReadSession')
+    RevisionQuestionAttempt = apps.get_model('engagement', 'RevisionQuestionAttempt')
+    RevisionQuestionAttemptDetail = apps.get_model('engagement', 'RevisionQuestionAttemptDetail')
+    db = schema_editor.connection.alias
+
+    UserSlideReadSession.objects.using(db).filter(user__isnull=True).update(
+        user_id=Subquery(
+            UserSlideRead.objects.using(db).filter(id=OuterRef('slide_read_id')).values('user_id')[:1]
+        )
+    )
+    RevisionQuestionAttemptDetail.objects.using(db).filter(user__isnull=True).update(
+        user_id=Subquery(
+            RevisionQuestionAttempt.objects.using(db).filter(id=OuterRef('attempt_id')).values('user_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0002_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='revisionquestionattemptdetail',
+            name='rqad_attempt_ts_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='userslidereadsession',
+            name='usrs_slide_read_exp_idx',
+        ),
+        migrations.AddField(
+            model_name='revisionquestionattemptdetail',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='userslidereadsession',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        # Backfill before building the new indexes
+        migrations.RunPython(backfill_user, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='revisionquestionattemptdetail',
+            index=models.Index(fields=['user', 'timestamp', 'is_correct'], name='rqad_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userslidereadsession',
+            index=models.Index(fields=['user', 'expanded', 'collapsed', 'read'], name='usrs_user_exp_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:57
+
+import django.db.models.deletion
+import engagement.fields
+from django.db import migrations, models
+
+
+def move_bodies(apps, schema_editor):
+    """Copy inline text into the compressed side table in batches"""
+    WritingInteraction = apps.get_model('engagement', 'WritingInteraction')
+    WritingInteractionBody = apps.get_model('engagement', 'WritingInteractionBody')
+    db = schema_editor.connection.alias
+    rows = WritingInteraction.objects.using(db).order_by('id').values_list('id', 'user_input', 'openai_response')
+    batch = []
+    for interaction_id, user_input, openai_response in rows.iterator(chunk_size=1000):
+        batch.append(WritingInteractionBody(
+            interaction_id=interaction_id, user_input=user_input or '', openai_response=openai_response or ''
+        ))
+        if len(batch) >= 1000:
+            WritingInteractionBody.objects.using(db).bulk_create(batch)
+            batch = []
+    WritingInteractionBody.objects.using(db).bulk_create(batch)
+
+
+def restore_bodies(apps, schema_editor):
+    WritingInteraction = apps.get_model('engagement', 'WritingInteraction')
+    WritingInteractionBody = apps.get_model('engagement', 'WritingInteractionBody')
+    db = schema_editor.connection.alias
+    for body in WritingInteractionBody.objects.using(db).iterator(chunk_size=1000):
+        WritingInteraction.objects.using(db).filter(id=body.interaction_id).update(
+            user_input=body.user_input, openai_response=body.openai_response
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0004_daily_engagement_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WritingInteractionBody',
+            fields=[
+                ('interaction', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='body', serialize=False, to='engagement.writinginteraction')),
+                ('user_input', engagement.fields.CompressedTextField()),
+                ('openai_response', engagement.fields.CompressedTextField()),
+            ],
+        ),
+        migrations.RunPython(move_bodies, restore_bodies),
+        # Give the old columns a default so this migration can be reversed
+        migrations.AlterField(
+            model_name='writinginteraction',
+            name='openai_response',
+            field=models.TextField(default=''),
+        ),
+        migrations.AlterField(
+            model_name='writinginteraction',
+            name='user_input',
+            field=models.TextField(default=''),
+        ),
+        migrations.RemoveField(
+            model_name='writinginteraction',
+            name='openai_response',
+        ),
+        migrations.RemoveField(
+            model_name='writinginteraction',
+            name='user_input',
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from engagement.search import rebuild_index
+    rebuild_index(
+        using=schema_editor.connection.alias,
+        body_model=apps.get_model('engagement', 'WritingInteractionBody')
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    from engagement.search import drop_index
+    drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0005_writing_body'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0007_import_run'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestedEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200, unique=True)),
+                ('event_type', models.CharField(max_length=30)),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('run', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='engagement.importrun')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['received_at'], name='ingested_received_idx')],
+            },
+        ),
+    ]
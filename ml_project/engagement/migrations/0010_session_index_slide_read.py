@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0009_feature_sketches'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='userslidereadsession',
+            name='usrs_expanded_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='userslidereadsession',
+            name='usrs_user_exp_idx',
+        ),
+        migrations.AddIndex(
+            model_name='userslidereadsession',
+            index=models.Index(fields=['user', 'expanded', 'collapsed', 'read', 'slide_read'], name='usrs_user_exp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userslidereadsession',
+            index=models.Index(fields=['expanded', 'collapsed', 'read', 'slide_read'], name='usrs_expanded_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0011_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cutoff', models.DateTimeField()),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('details', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
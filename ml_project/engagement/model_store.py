@@ -0,0 +1,194 @@
+"""
+Versioned model artifact store
+Week 8: Safe publishing and rollback of trained models
+
+Layout under settings.MODEL_STORE_DIR:
+
+    versions/<version>/model.pkl       trained estimator
+    versions/<version>/metrics.json    training metrics
+    versions/<version>/manifest.json   feature list, data fingerprint, publish time
+    versions/<version>/forest/         memory-mappable tree arrays (forest models only)
+    CURRENT                            name of the version being served
+
+A version directory is fully written before it is renamed into place and
+CURRENT is swapped with os.replace, so readers only ever see a complete
+version. Rolling back is just pointing CURRENT at an older version.
+"""
+import json
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+
+ARTIFACT_FILES = ('model.pkl', 'metrics.json')
+
+
+class ModelStoreError(Exception):
+    pass
+
+
+def _fsync_write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class ModelStore:
+    def __init__(self, root=None):
+        self.root = Path(root or settings.MODEL_STORE_DIR)
+        self.versions_dir = self.root / 'versions'
+        self.pointer_path = self.root / 'CURRENT'
+
+    def versions(self):
+        """Published versions, oldest first"""
+        if not self.versions_dir.exists():
+            return []
+        return sorted(
+            p.name for p in self.versions_dir.iterdir()
+            if p.is_dir() and not p.name.startswith('.')
+        )
+
+    def current_version(self):
+        try:
+            version = self.pointer_path.read_text().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def version_dir(self, version=None):
+        version = version or self.current_version()
+        if version is None:
+            raise ModelStoreError('No model version has been published')
+        path = self.versions_dir / version
+        if not path.is_dir():
+            raise ModelStoreError(f'Unknown model version: {version}')
+        return path
+
+    def model_path(self, version=None):
+        return self.version_dir(version) / 'model.pkl'
+
+    def load_metrics(self, version=None):
+        try:
+            with open(self.version_dir(version) / 'metrics.json') as f:
+                return json.load(f)
+        except (ModelStoreError, OSError, ValueError):
+            return {}
+
+    def load_manifest(self, version=None):
+        try:
+            with open(self.version_dir(version) / 'manifest.json') as f:
+                return json.load(f)
+        except (ModelStoreError, OSError, ValueError):
+            return {}
+
+    def publish(self, source_dir, feature_columns=None, data_fingerprint=None, model=None):
+        """Copy model.pkl/metrics.json from source_dir into a new version and make it current.
+
+        When the trained `model` is a forest it is also exported in the flat
+        layout so serving processes can memory-map it.
+        """
+        source_dir = Path(source_dir)
+        missing = [name for name in ARTIFACT_FILES if not (source_dir / name).exists()]
+        if missing:
+            raise ModelStoreError(f'Missing artifacts in {source_dir}: {missing}')
+
+        version = f"{timezone.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:6]}"
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        staging = self.versions_dir / f'.staging-{version}'
+        staging.mkdir()
+        try:
+            for name in ARTIFACT_FILES:
+                shutil.copyfile(source_dir / name, staging / name)
+            from .flat_forest import export_flat_forest
+            mmap_layout = model is not None and export_flat_forest(model, staging)
+            manifest = {
+                'version': version,
+                'published_at': timezone.now().isoformat(),
+                'features': list(feature_columns or []),
+                'data_fingerprint': data_fingerprint,
+                'layout': 'flat_forest' if mmap_layout else 'pickle',
+            }
+            _fsync_write(staging / 'manifest.json', json.dumps(manifest, indent=2))
+            # Atomic within one filesystem: the version appears complete or not at all
+            os.rename(staging, self.versions_dir / version)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self.activate(version)
+        return version
+
+    def activate(self, version):
+        """Atomically point CURRENT at an existing version"""
+        self.version_dir(version)
+        tmp = self.root / f'.CURRENT.{uuid.uuid4().hex}'
+        _fsync_write(tmp, version)
+        os.replace(tmp, self.pointer_path)
+        return version
+
+    def rollback(self, to=None):
+        """Serve `to`, or the version published before the current one"""
+        if to is None:
+            versions = self.versions()
+            current = self.current_version()
+            older = [v for v in versions if current is None or v < current]
+            if not older:
+                raise ModelStoreError('No earlier version to roll back to')
+            to = older[-1]
+        return self.activate(to)
+
+    def prune(self, keep=10):
+        """Delete the oldest versions beyond `keep`, never the current one"""
+        current = self.current_version()
+        removable = [v for v in self.versions() if v != current]
+        excess = len(removable) - max(keep - 1, 0)
+        removed = removable[:excess] if excess > 0 else []
+        for version in removed:
+            shutil.rmtree(self.versions_dir / version, ignore_errors=True)
+        return removed
+
+
+_model_cache = {'version': None, 'model': None}
+_model_lock = threading.Lock()
+
+
+def load_model(version_dir, mmap=True):
+    """Load a published version, memory-mapped where the layout allows it"""
+    import joblib
+    from .flat_forest import FlatForest, has_flat_forest
+
+    version_dir = Path(version_dir)
+    if mmap and has_flat_forest(version_dir):
+        return FlatForest(version_dir)
+    return joblib.load(version_dir / 'model.pkl', mmap_mode='r' if mmap else None)
+
+
+def load_current_model():
+    """Serving model, cached per process and reloaded when CURRENT changes.
+
+    Falls back to the legacy model.pkl in the Django root while nothing has
+    been published to the store. Raises FileNotFoundError if neither exists.
+    """
+    import joblib
+
+    store = ModelStore()
+    version = store.current_version()
+    key = version or 'legacy'
+
+    if _model_cache['version'] == key:
+        return _model_cache['model']
+    with _model_lock:
+        if _model_cache['version'] != key:
+            if version is None:
+                model = joblib.load(Path(settings.BASE_DIR) / 'model.pkl')
+            else:
+                model = load_model(store.versions_dir / version, mmap=settings.MODEL_MMAP)
+            _model_cache['model'] = model
+            _model_cache['version'] = key
+    return _model_cache['model']
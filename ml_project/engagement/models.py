@@ -1,6 +1,16 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils.timezone import now
+from .fields import CompressedTextField
+
+def session_duration(expanded, collapsed, read):
+    """Seconds from expanding a slide until it was read (or collapsed)"""
+    if expanded:
+        end = read or collapsed
+        if end:
+            secs = int((end - expanded).total_seconds())
+            return max(secs, 0)
+    return 0
 
 class TextbookSection(models.Model):
     section_title = models.CharField(max_length=200)
@@ -28,27 +38,100 @@ class RevisionQuestionAttempt(models.Model):
     viewed = models.DateTimeField(null=True, blank=True)
     correct = models.DateTimeField(null=True, blank=True)
     processed = models.BooleanField(default=False)
+    class Meta:
+        indexes = [
+            # Per-student attempts in a window, covering the distinct-question count
+            models.Index(fields=['user', 'viewed', 'question'], name='rqa_user_viewed_idx'),
+            # Dashboard window count
+            models.Index(fields=['viewed'], name='rqa_viewed_idx'),
+        ]
     def __str__(self):
         return f"Attempt by {self.user.username} on Question {self.question_id}"
 
 class RevisionQuestionAttemptDetail(models.Model):
     attempt = models.ForeignKey(RevisionQuestionAttempt, on_delete=models.CASCADE, related_name='details')
+    # Denormalized attempt.user so per-student queries skip the join
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True,
+                             related_name='+', db_index=False)
     is_correct = models.BooleanField()
     timestamp = models.DateTimeField(default=now)
     processed = models.BooleanField(default=False)
+    class Meta:
+        indexes = [
+            # Per-student window with correctness, covering the accuracy counts
+            models.Index(fields=['user', 'timestamp', 'is_correct'], name='rqad_user_ts_idx'),
+            # Dashboard window accuracy, covering
+            models.Index(fields=['timestamp', 'is_correct'], name='rqad_ts_correct_idx'),
+        ]
+    def save(self, *args, **kwargs):
+        if self.user_id is None and self.attempt_id is not None:
+            self.user_id = self.attempt.user_id
+        super().save(*args, **kwargs)
     def __str__(self):
         return f"{'Correct' if self.is_correct else 'Incorrect'} at {self.timestamp}"
 
 class WritingInteraction(models.Model):
+    """Graded writing; the text bodies live compressed in WritingInteractionBody"""
+    BODY_FIELDS = ('user_input', 'openai_response')
     user_id = models.IntegerField(null=True, blank=True)
     page_id = models.IntegerField()
-    user_input = models.TextField()
-    openai_response = models.TextField()
     grade = models.IntegerField(null=True, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        indexes = [
+            # Per-student writing aggregates, covering grade
+            models.Index(fields=['user_id', 'grade'], name='wi_user_grade_idx'),
+        ]
+    def _get_body_text(self, name):
+        pending = self.__dict__.get('_pending_body', {})
+        if name in pending:
+            return pending[name]
+        if self.pk is None:
+            return ''
+        try:
+            return getattr(self.body, name)
+        except WritingInteractionBody.DoesNotExist:
+            return ''
+    def _set_body_text(self, name, value):
+        self.__dict__.setdefault('_pending_body', {})[name] = value or ''
+    # Loaded from the side table on first access; use select_related('body') for many rows
+    user_input = property(
+        lambda self: self._get_body_text('user_input'),
+        lambda self, value: self._set_body_text('user_input', value)
+    )
+    openai_response = property(
+        lambda self: self._get_body_text('openai_response'),
+        lambda self, value: self._set_body_text('openai_response', value)
+    )
+    def save(self, *args, **kwargs):
+        from .search import index_writing
+        pending = self.__dict__.pop('_pending_body', None)
+        adding = self._state.adding
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if pending:
+                db = self._state.db
+                body = None if adding else WritingInteractionBody.objects.using(db).filter(interaction=self).first()
+                previous = (body.user_input, body.openai_response) if body else None
+                if body is None:
+                    body = WritingInteractionBody(interaction=self)
+                for name, value in pending.items():
+                    setattr(body, name, value)
+                body.save(using=db, force_insert=previous is None)
+                # Keep the full-text index in step with the stored text
+                index_writing(self.pk, body.user_input, body.openai_response, previous, using=db)
+                self.body = body
     def __str__(self):
         return f"Interaction - Page {self.page_id}"
 
+class WritingInteractionBody(models.Model):
+    """Compressed text of a WritingInteraction, kept out of the aggregated table"""
+    interaction = models.OneToOneField(
+        WritingInteraction, on_delete=models.CASCADE, primary_key=True, related_name='body'
+    )
+    user_input = CompressedTextField()
+    openai_response = CompressedTextField()
+
 class UserSlideRead(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     slide = models.ForeignKey(TextbookSlide, on_delete=models.CASCADE)
@@ -59,18 +142,158 @@ class UserSlideRead(models.Model):
     )
     class Meta:
         unique_together = ('user','slide')
+        indexes = [
+            # Revisit counts per student
+            models.Index(fields=['user', 'slide_status'], name='usr_user_status_idx'),
+        ]
     def __str__(self):
         return f"{self.user.username} - {self.slide.slide_title} - {self.slide_status}"
 
 class UserSlideReadSession(models.Model):
     slide_read = models.ForeignKey('UserSlideRead', on_delete=models.CASCADE, related_name='review_sessions')
+    # Denormalized slide_read.user so per-student queries skip the join
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True,
+                             related_name='+', db_index=False)
     expanded = models.DateTimeField(default=now)
     collapsed = models.DateTimeField(null=True, blank=True)
     read = models.DateTimeField(null=True, blank=True)
+    class Meta:
+        indexes = [
+            # Per-student window, covering the duration columns and the sessionization key
+            models.Index(fields=['user', 'expanded', 'collapsed', 'read', 'slide_read'], name='usrs_user_exp_idx'),
+            # Dashboard window, covering the duration columns and the sessionization key
+            models.Index(fields=['expanded', 'collapsed', 'read', 'slide_read'], name='usrs_expanded_idx'),
+        ]
+    def save(self, *args, **kwargs):
+        if self.user_id is None and self.slide_read_id is not None:
+            self.user_id = self.slide_read.user_id
+        super().save(*args, **kwargs)
     def read_duration(self):
-        if self.expanded:
-            end = self.read or self.collapsed
-            if end:
-                secs = int((end - self.expanded).total_seconds())
-                return max(secs, 0)
-        return 0
+        return session_duration(self.expanded, self.collapsed, self.read)
+
+class DailyEngagementSummary(models.Model):
+    """Per-student, per-day totals of archived slide sessions and attempt details"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_summaries')
+    day = models.DateField()
+    read_seconds = models.PositiveIntegerField(default=0)
+    sessions = models.PositiveIntegerField(default=0)
+    # Distinct slides read that day, so unique-slide counts over a window stay exact
+    slide_ids = models.JSONField(default=list)
+    answers = models.PositiveIntegerField(default=0)
+    correct_answers = models.PositiveIntegerField(default=0)
+    class Meta:
+        unique_together = ('user', 'day')
+        indexes = [
+            # Dashboard window totals, covering
+            models.Index(fields=['day', 'read_seconds', 'answers', 'correct_answers'], name='des_day_idx'),
+        ]
+    def __str__(self):
+        return f"{self.user_id} - {self.day}"
+
+class ArchiveRun(models.Model):
+    """One archive_engagement() pass; the latest cutoff is the archive watermark"""
+    cutoff = models.DateTimeField()
+    started_at = models.DateTimeField(default=now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    sessions = models.PositiveIntegerField(default=0)
+    details = models.PositiveIntegerField(default=0)
+    def __str__(self):
+        return f"archive before {self.cutoff:%Y-%m-%d} ({self.sessions} sessions, {self.details} details)"
+
+class FeatureSketch(models.Model):
+    """Quantile sketch of one feature over the cohort, per feature window (see engagement.sketches)"""
+    feature = models.CharField(max_length=50)
+    days_back = models.PositiveIntegerField(default=30)
+    # QuantileSketch.to_dict(): {relative_accuracy, zero, bins: {index: count}}
+    sketch = models.JSONField(default=dict)
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    class Meta:
+        unique_together = ('feature', 'days_back')
+    def __str__(self):
+        return f"{self.feature} ({self.days_back}d, {self.count} students)"
+
+class StudentFeatureValues(models.Model):
+    """The feature values a student last contributed to the window's sketches"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    days_back = models.PositiveIntegerField(default=30)
+    values = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+    class Meta:
+        unique_together = ('user', 'days_back')
+    def __str__(self):
+        return f"{self.user_id} ({self.days_back}d)"
+
+class DataVersion(models.Model):
+    """Counter bumped whenever the data behind a set of responses changes (see engagement.versions)"""
+    key = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=now)
+    def __str__(self):
+        return f"{self.key} v{self.version}"
+
+class ImportRun(models.Model):
+    """One engagement import: timings, per-entity row counts and the failure, if any"""
+    STATUS_CHOICES = [('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')]
+    source = models.CharField(max_length=20, default='textbook')
+    triggered_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    started_at = models.DateTimeField(default=now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    wall_seconds = models.FloatField(null=True, blank=True)
+    download_seconds = models.FloatField(null=True, blank=True)
+    download_bytes = models.PositiveBigIntegerField(null=True, blank=True)
+    # {entity: {inserted, updated, skipped, seconds, rows_per_sec}}
+    entity_stats = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default='')
+    class Meta:
+        indexes = [
+            models.Index(fields=['-started_at'], name='importrun_started_idx'),
+        ]
+    @property
+    def total_rows(self):
+        return sum(s.get('inserted', 0) + s.get('updated', 0) for s in self.entity_stats.values())
+    @property
+    def rows_per_sec(self):
+        import_seconds = (self.wall_seconds or 0) - (self.download_seconds or 0)
+        return self.total_rows / import_seconds if import_seconds > 0 else None
+    def finish(self, stats=None, error=''):
+        """Record the outcome; `stats` is the ImportStats the import filled in"""
+        self.finished_at = now()
+        self.wall_seconds = (self.finished_at - self.started_at).total_seconds()
+        if stats is not None:
+            self.entity_stats = stats.as_dict()
+        self.error = error
+        self.status = 'failed' if error else 'succeeded'
+        self.save()
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'source': self.source,
+            'status': self.status,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'wall_seconds': self.wall_seconds,
+            'download_seconds': self.download_seconds,
+            'download_bytes': self.download_bytes,
+            'total_rows': self.total_rows,
+            'rows_per_sec': self.rows_per_sec,
+            'entities': self.entity_stats,
+            'error': self.error,
+        }
+    def __str__(self):
+        return f"{self.source} import {self.started_at:%Y-%m-%d %H:%M} ({self.status})"
+
+class IngestedEvent(models.Model):
+    """Idempotency key of a pushed event, so a resent batch is not applied twice"""
+    key = models.CharField(max_length=200, unique=True)
+    event_type = models.CharField(max_length=30)
+    run = models.ForeignKey(ImportRun, on_delete=models.SET_NULL, null=True, blank=True, related_name='events')
+    received_at = models.DateTimeField(default=now)
+    class Meta:
+        indexes = [
+            # Pruning keys past the retry horizon (manage.py prune_ingested_events)
+            models.Index(fields=['received_at'], name='ingested_received_idx'),
+        ]
+    def __str__(self):
+        return f"{self.event_type} {self.key}"
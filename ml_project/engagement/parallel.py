@@ -0,0 +1,18 @@
+"""
+Process pool helpers for batch jobs
+Kept free of model imports so spawned workers can import it before Django is set up.
+"""
+import os
+
+
+def init_django_worker():
+    """Process pool initializer: set up Django and make the worker open its own DB connection"""
+    import django
+    from django.apps import apps
+    from django.db import connections
+
+    if not apps.ready:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ml_project.settings')
+        django.setup()
+    # Never share a connection inherited from the parent process
+    connections.close_all()
@@ -0,0 +1,185 @@
+"""
+Per-request profiling
+Week 10: Seeing where the time goes
+
+A staff user can profile one request by adding `?_profile=1` or an
+`X-Profile: 1` header. ProfilingMiddleware then runs the request under
+cProfile, records its SQL statements (every PROFILING_SQL_SAMPLE_EVERY-th one,
+at most PROFILING_SQL_MAX) and writes both to PROFILING_DIR:
+
+    <capture>.prof       pstats dump, e.g. for `python -m pstats` or snakeviz
+    <capture>.json       request details, the SQL trace and the top functions
+
+Untriggered requests only pay for the trigger lookup, and with
+PROFILING_ENABLED = False the middleware removes itself at startup.
+"""
+import io
+import json
+import re
+import threading
+import time
+import traceback
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+from .metrics import view_label
+
+TRIGGER_PARAM = '_profile'
+TRIGGER_HEADER = 'HTTP_X_PROFILE'
+CAPTURE_NAME = re.compile(r'^[\w.-]+$')
+# cProfile allows one active profiler per process
+_profile_lock = threading.Lock()
+
+
+def profiling_dir():
+    return Path(getattr(settings, 'PROFILING_DIR', Path(settings.BASE_DIR) / 'profiles'))
+
+
+class SqlSampler:
+    """connection.execute_wrapper keeping a sample of statements with timings"""
+
+    def __init__(self, alias, every=1, limit=1000):
+        self.alias = alias
+        self.every = max(1, every)
+        self.limit = limit
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            if self.count % self.every == 0 and len(self.statements) < self.limit:
+                self.statements.append({
+                    'db': self.alias,
+                    'sql': sql,
+                    'params': repr(params)[:500],
+                    'many': many,
+                    'ms': round(elapsed * 1000, 3),
+                    # Innermost application frame that issued the query
+                    'caller': _app_caller(),
+                })
+
+
+def _app_caller():
+    for frame in reversed(traceback.extract_stack(limit=40)):
+        if '/engagement/' in frame.filename and not frame.filename.endswith('profiling.py'):
+            return f'{Path(frame.filename).name}:{frame.lineno} {frame.name}'
+    return None
+
+
+def _top_functions(profile, limit=40):
+    import pstats
+
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+def save_capture(request, response, profile, samplers, elapsed):
+    """Write the profile and SQL trace; returns the capture name"""
+    directory = profiling_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    view = view_label(request)
+    slug = re.sub(r'[^\w]+', '_', view)
+    name = f"{timezone.now():%Y%m%dT%H%M%S}-{slug}-{uuid.uuid4().hex[:6]}"
+    profile.dump_stats(directory / f'{name}.prof')
+    capture = {
+        'name': name,
+        'captured_at': timezone.now().isoformat(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'view': view,
+        'status': response.status_code,
+        'user': request.user.get_username(),
+        'elapsed_ms': round(elapsed * 1000, 1),
+        'queries': sum(s.count for s in samplers),
+        'query_ms': round(sum(s.seconds for s in samplers) * 1000, 1),
+        'statements': [statement for s in samplers for statement in s.statements],
+        'top_functions': _top_functions(profile),
+    }
+    (directory / f'{name}.json').write_text(json.dumps(capture, indent=1))
+    prune_captures(getattr(settings, 'PROFILING_KEEP', 50))
+    return name
+
+
+def list_captures(limit=None):
+    """Capture summaries, newest first"""
+    directory = profiling_dir()
+    if not directory.exists():
+        return []
+    captures = []
+    for path in sorted(directory.glob('*.json'), reverse=True)[:limit]:
+        try:
+            capture = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        capture.pop('statements', None)
+        capture.pop('top_functions', None)
+        captures.append(capture)
+    return captures
+
+
+def load_capture(name):
+    if not CAPTURE_NAME.match(name):
+        return None
+    try:
+        return json.loads((profiling_dir() / f'{name}.json').read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def prune_captures(keep):
+    for path in sorted(profiling_dir().glob('*.json'), reverse=True)[keep:]:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.prof').unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """Profiles requests from staff users that ask for it; must come after AuthenticationMiddleware"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.META.get(TRIGGER_HEADER) != '1' and request.GET.get(TRIGGER_PARAM) != '1':
+            return self.get_response(request)
+        if not request.user.is_staff or not _profile_lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self.profile(request)
+        finally:
+            _profile_lock.release()
+
+    def profile(self, request):
+        import cProfile
+
+        every = getattr(settings, 'PROFILING_SQL_SAMPLE_EVERY', 1)
+        limit = getattr(settings, 'PROFILING_SQL_MAX', 1000)
+        samplers = [SqlSampler(connection.alias, every, limit) for connection in connections.all()]
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection, sampler in zip(connections.all(), samplers):
+                stack.enter_context(connection.execute_wrapper(sampler))
+            profile.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profile.disable()
+        elapsed = time.perf_counter() - start
+        response['X-Profile-Capture'] = save_capture(request, response, profile, samplers, elapsed)
+        return response
@@ -0,0 +1,73 @@
+"""
+Engagement query helpers
+Hot filters shared by the feature engine and the dashboards; the indexes in
+models.py are designed for these, and tests/test_query_plans.py checks that
+each of them is served by an index. Events older than the archive horizon
+live on as DailyEngagementSummary rows; windows reaching back that far add
+the archived_* totals.
+"""
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from .models import (
+    UserSlideReadSession, RevisionQuestionAttempt, RevisionQuestionAttemptDetail,
+    DailyEngagementSummary
+)
+
+def slide_sessions_since(since, user_id=None):
+    """Slide read sessions expanded since `since`, optionally for one student"""
+    sessions = UserSlideReadSession.objects.filter(expanded__gte=since)
+    if user_id is not None:
+        sessions = sessions.filter(user_id=user_id)
+    return sessions
+
+def attempt_details_since(since, user_id=None):
+    """Question attempt details answered since `since`, optionally for one student"""
+    details = RevisionQuestionAttemptDetail.objects.filter(timestamp__gte=since)
+    if user_id is not None:
+        details = details.filter(user_id=user_id)
+    return details
+
+def question_attempts_since(since, user_id=None):
+    """Question attempts viewed since `since`, optionally for one student"""
+    attempts = RevisionQuestionAttempt.objects.filter(viewed__gte=since)
+    if user_id is not None:
+        attempts = attempts.filter(user_id=user_id)
+    return attempts
+
+def archived_summaries_since(since, user_id=None):
+    """Daily summaries of archived events on or after the day of `since`"""
+    summaries = DailyEngagementSummary.objects.filter(day__gte=timezone.localdate(since))
+    if user_id is not None:
+        summaries = summaries.filter(user_id=user_id)
+    return summaries
+
+def archived_totals(since, user_id=None):
+    """(read_seconds, answers, correct_answers) archived since `since`, in one query"""
+    totals = archived_summaries_since(since, user_id).aggregate(
+        read_seconds=Sum('read_seconds'),
+        answers=Sum('answers'),
+        correct_answers=Sum('correct_answers')
+    )
+    return totals['read_seconds'] or 0, totals['answers'] or 0, totals['correct_answers'] or 0
+
+def archived_slide_ids(since, user_id):
+    """Distinct slides a student read on archived days since `since`"""
+    slide_ids = set()
+    for day_slides in archived_summaries_since(since, user_id).values_list('slide_ids', flat=True):
+        slide_ids.update(day_slides)
+    return slide_ids
+
+def total_read_seconds(sessions):
+    """Active read seconds, with overlapping sessions on a slide merged and idle time capped"""
+    from .sessionize import active_seconds, session_arrays
+
+    # slide_read identifies the (student, slide) pair, so no join is needed
+    return active_seconds(*session_arrays(sessions.values_list('slide_read_id', 'expanded', 'collapsed', 'read')))
+
+def accuracy_counts(details):
+    """(total, correct) attempt detail counts in one query"""
+    counts = details.aggregate(
+        total=Count('id'),
+        correct=Count('id', filter=Q(is_correct=True))
+    )
+    return counts['total'] or 0, counts['correct'] or 0
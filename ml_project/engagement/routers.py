@@ -0,0 +1,74 @@
+"""
+Database routing for analytics reads
+Read-only analytics paths (dashboards, exports, feature building) run inside
+analytics_reads() and are sent to the read replica alias when one is
+available; everything else, and every write, stays on the primary.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_analytics_reads = ContextVar('engagement_analytics_reads', default=False)
+
+# How long a replica availability check is trusted, in seconds
+_REPLICA_CHECK_TTL = 5.0
+_replica_checked = {'at': 0.0, 'available': False}
+
+
+@contextmanager
+def analytics_reads():
+    """Route reads in this block (or decorated function) to the analytics replica"""
+    token = _analytics_reads.set(True)
+    try:
+        yield
+    finally:
+        _analytics_reads.reset(token)
+
+
+def replica_available():
+    """True when the analytics alias is configured and, for SQLite, its snapshot exists"""
+    now = time.monotonic()
+    if now - _replica_checked['at'] < _REPLICA_CHECK_TTL:
+        return _replica_checked['available']
+
+    db = settings.DATABASES.get(settings.ANALYTICS_DB_ALIAS)
+    if db is None:
+        available = False
+    elif db['ENGINE'].endswith('sqlite3'):
+        available = os.path.exists(str(db['NAME']))
+    else:
+        available = True
+    _replica_checked.update(at=now, available=available)
+    return available
+
+
+def discard_stale_snapshot(sender, using=DEFAULT_DB_ALIAS, plan=None, **kwargs):
+    """post_migrate receiver: a snapshot with the old schema would break reads, so drop it"""
+    db = settings.DATABASES.get(settings.ANALYTICS_DB_ALIAS)
+    if not plan or using != DEFAULT_DB_ALIAS or db is None or not db['ENGINE'].endswith('sqlite3'):
+        return
+    if os.path.exists(str(db['NAME'])):
+        os.remove(str(db['NAME']))
+        _replica_checked.update(at=0.0, available=False)
+
+
+class AnalyticsRouter:
+    def db_for_read(self, model, **hints):
+        if _analytics_reads.get() and replica_available():
+            return settings.ANALYTICS_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Snapshots/replicas get their schema from the primary
+        return db != settings.ANALYTICS_DB_ALIAS
@@ -0,0 +1,163 @@
+"""
+Full-text search over writing interactions
+The essay and feedback text is stored compressed, so it is indexed in a
+separate table kept in sync whenever a WritingInteractionBody is written or
+deleted: an FTS5 virtual table on SQLite (contentless, rowid = interaction
+id) or a tsvector column with a GIN index on PostgreSQL. Both sit behind
+search_writing().
+"""
+import re
+
+from django.db import connections, router
+
+FTS_TABLE = 'engagement_writing_fts'
+PG_TABLE = 'engagement_writing_search'
+# Queries matching fewer rows than this are ranked by relevance
+RANK_CANDIDATES = 1000
+
+SQLITE_SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "user_input, openai_response, content='', tokenize='porter unicode61')",
+]
+POSTGRES_SCHEMA = [
+    f"CREATE TABLE IF NOT EXISTS {PG_TABLE} ("
+    "interaction_id bigint PRIMARY KEY, document tsvector NOT NULL)",
+    f"CREATE INDEX IF NOT EXISTS {PG_TABLE}_document_idx ON {PG_TABLE} USING gin (document)",
+]
+DROP_SCHEMA = {
+    'sqlite': [f'DROP TABLE IF EXISTS {FTS_TABLE}'],
+    'postgresql': [f'DROP TABLE IF EXISTS {PG_TABLE}'],
+}
+
+
+def create_index(connection):
+    """Create the search table for this connection's vendor"""
+    schema = SQLITE_SCHEMA if connection.vendor == 'sqlite' else POSTGRES_SCHEMA
+    with connection.cursor() as cursor:
+        for sql in schema:
+            cursor.execute(sql)
+
+
+def drop_index(connection):
+    with connection.cursor() as cursor:
+        for sql in DROP_SCHEMA.get(connection.vendor, []):
+            cursor.execute(sql)
+
+
+def _remove(cursor, vendor, interaction_id, previous):
+    if vendor == 'sqlite':
+        # Contentless FTS5 deletes need the exact text that was indexed
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, user_input, openai_response) "
+            "VALUES ('delete', %s, %s, %s)",
+            [interaction_id, previous[0], previous[1]]
+        )
+    else:
+        cursor.execute(f'DELETE FROM {PG_TABLE} WHERE interaction_id = %s', [interaction_id])
+
+
+def _insert(cursor, vendor, interaction_id, user_input, openai_response):
+    if vendor == 'sqlite':
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, user_input, openai_response) VALUES (%s, %s, %s)',
+            [interaction_id, user_input, openai_response]
+        )
+    else:
+        cursor.execute(
+            f"INSERT INTO {PG_TABLE} (interaction_id, document) VALUES "
+            "(%s, setweight(to_tsvector('english', %s), 'A') || to_tsvector('english', %s))",
+            [interaction_id, user_input, openai_response]
+        )
+
+
+def index_writing(interaction_id, user_input, openai_response, previous=None, using=None):
+    """(Re)index one interaction; `previous` is the (user_input, openai_response) indexed before"""
+    from .models import WritingInteractionBody
+
+    connection = connections[using or router.db_for_write(WritingInteractionBody)]
+    with connection.cursor() as cursor:
+        if previous is not None:
+            _remove(cursor, connection.vendor, interaction_id, previous)
+        _insert(cursor, connection.vendor, interaction_id, user_input, openai_response)
+
+
+def unindex_writing(interaction_id, previous, using=None):
+    from .models import WritingInteractionBody
+
+    connection = connections[using or router.db_for_write(WritingInteractionBody)]
+    with connection.cursor() as cursor:
+        _remove(cursor, connection.vendor, interaction_id, previous)
+
+
+def remove_deleted_body(sender, instance, using, **kwargs):
+    """post_delete receiver for WritingInteractionBody"""
+    unindex_writing(instance.pk, (instance.user_input, instance.openai_response), using=using)
+
+
+def rebuild_index(using='default', batch_size=1000, body_model=None):
+    """Drop and repopulate the index from the stored bodies; returns rows indexed"""
+    from .models import WritingInteractionBody
+
+    # Migrations pass their historical model
+    WritingInteractionBody = body_model or WritingInteractionBody
+    connection = connections[using]
+    drop_index(connection)
+    create_index(connection)
+    indexed = 0
+    bodies = WritingInteractionBody.objects.using(using).order_by('pk').values_list(
+        'pk', 'user_input', 'openai_response'
+    )
+    with connection.cursor() as cursor:
+        for interaction_id, user_input, openai_response in bodies.iterator(chunk_size=batch_size):
+            _insert(cursor, connection.vendor, interaction_id, user_input, openai_response)
+            indexed += 1
+    return indexed
+
+
+def _fts5_query(query):
+    """Quote every term so user input cannot inject FTS5 syntax; 'term*' stays a prefix query"""
+    terms = re.findall(r'\w+\*?', query)
+    return ' '.join(f'"{term.rstrip("*")}"' + ('*' if term.endswith('*') else '') for term in terms)
+
+
+def search_writing(query, limit=50):
+    """Ids of writing interactions matching every term of `query`
+
+    Ranked best match first; when RANK_CANDIDATES or more rows match, the
+    newest matches are returned instead, since ranking needs every match
+    scored and would no longer be interactive on millions of rows.
+    """
+    from .models import WritingInteractionBody
+
+    connection = connections[router.db_for_read(WritingInteractionBody) or 'default']
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            match = _fts5_query(query)
+            if not match:
+                return []
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s',
+                [match, RANK_CANDIDATES]
+            )
+            newest = [row[0] for row in cursor.fetchall()]
+            if len(newest) >= RANK_CANDIDATES:
+                return newest[:limit]
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s',
+                [match, limit]
+            )
+        else:
+            cursor.execute(
+                f"SELECT interaction_id FROM {PG_TABLE} WHERE document @@ plainto_tsquery('english', %s) "
+                "ORDER BY interaction_id DESC LIMIT %s",
+                [query, RANK_CANDIDATES]
+            )
+            newest = [row[0] for row in cursor.fetchall()]
+            if len(newest) >= RANK_CANDIDATES or not newest:
+                return newest[:limit]
+            cursor.execute(
+                f"SELECT interaction_id FROM {PG_TABLE}, plainto_tsquery('english', %s) q "
+                "WHERE interaction_id = ANY(%s) ORDER BY ts_rank(document, q) DESC LIMIT %s",
+                [query, newest, limit]
+            )
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,309 @@
+"""
+Cohort quantile sketches
+Week 10: Seeing where the time goes
+
+Where a student stands in the cohort ("time per slide is in the 20th
+percentile") is answered from one QuantileSketch per feature and window
+instead of from every student's features. The sketch is DDSketch-style:
+values are counted in logarithmic buckets, so every quantile it returns is
+within RELATIVE_ACCURACY of the true value, its size depends on the range of
+the values rather than on how many there are, and two sketches merge by
+adding bucket counts.
+
+Counts can also be taken away, which is what keeps the sketches incremental:
+StudentFeatureValues remembers the values each student last contributed, and
+record_features() swaps a student's old values for the new ones whenever
+their features are recomputed (a prediction, or a retrain).
+`python manage.py rebuild_feature_sketches` recounts a window from scratch.
+"""
+import logging
+import math
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, transaction
+from django.utils import timezone
+
+from .models import FeatureSketch, StudentFeatureValues
+from .versions import COHORT, bump
+
+FEATURES = ('time_spent_per_slide', 'average_accuracy_per_page', 'attempt_count_per_question', 'revisits')
+FEATURE_LABELS = {
+    'time_spent_per_slide': 'Time per slide (s)',
+    'average_accuracy_per_page': 'Question accuracy',
+    'attempt_count_per_question': 'Attempts per question',
+    'revisits': 'Slides marked for revision',
+}
+RELATIVE_ACCURACY = 0.01
+# Beyond this many buckets the lowest ones are folded together (only reached by extreme value ranges)
+MAX_BUCKETS = 2048
+# Values at or below this count as zero
+MIN_VALUE = 1e-9
+SUMMARY_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+logger = logging.getLogger(__name__)
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch for non-negative values with relative-error guarantees"""
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY, bins=None, zero=0):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins = dict(bins or {})
+        self.zero = zero
+
+    @property
+    def count(self):
+        return self.zero + sum(self.bins.values())
+
+    def _index(self, value):
+        index = math.ceil(math.log(value) / self.log_gamma)
+        # Values below the lowest kept bucket were folded into it
+        if len(self.bins) >= MAX_BUCKETS:
+            index = max(index, min(self.bins))
+        return index
+
+    def _value(self, index):
+        # Midpoint of (gamma^(i-1), gamma^i] in relative terms
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value, count=1):
+        value = max(float(value), 0.0)
+        if value <= MIN_VALUE:
+            self.zero += count
+            return
+        index = self._index(value)
+        self.bins[index] = self.bins.get(index, 0) + count
+        if len(self.bins) > MAX_BUCKETS:
+            self._collapse()
+
+    def remove(self, value, count=1):
+        value = max(float(value), 0.0)
+        if value <= MIN_VALUE:
+            self.zero = max(self.zero - count, 0)
+            return
+        index = self._index(value)
+        if self.bins and index < min(self.bins):
+            index = min(self.bins)
+        remaining = self.bins.get(index, 0) - count
+        if remaining > 0:
+            self.bins[index] = remaining
+        else:
+            self.bins.pop(index, None)
+
+    def _collapse(self):
+        keep = sorted(self.bins)[len(self.bins) - MAX_BUCKETS]
+        folded = sum(count for index, count in self.bins.items() if index < keep)
+        self.bins = {index: count for index, count in self.bins.items() if index >= keep}
+        self.bins[keep] += folded
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Only sketches with the same relative accuracy can be merged')
+        self.zero += other.zero
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        while len(self.bins) > MAX_BUCKETS:
+            self._collapse()
+        return self
+
+    def quantile(self, q):
+        """Value at quantile q (0-1), or None for an empty sketch"""
+        count = self.count
+        if not count:
+            return None
+        rank = q * (count - 1)
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                return self._value(index)
+        return self._value(max(self.bins))
+
+    def percentile_of(self, value):
+        """Percentage of the cohort below `value` (ties count half), or None for an empty sketch"""
+        count = self.count
+        if not count:
+            return None
+        value = max(float(value), 0.0)
+        if value <= MIN_VALUE:
+            return 100 * self.zero / 2 / count
+        index = self._index(value)
+        below = self.zero + sum(c for i, c in self.bins.items() if i < index)
+        return 100 * (below + self.bins.get(index, 0) / 2) / count
+
+    def histogram(self, bins=20):
+        """[{low, high, count}] over at most `bins` ranges of adjacent buckets"""
+        rows = []
+        if self.zero:
+            rows.append({'low': 0.0, 'high': 0.0, 'count': self.zero})
+        if not self.bins:
+            return rows
+        low, high = min(self.bins), max(self.bins)
+        width = max(1, math.ceil((high - low + 1) / bins))
+        grouped = {}
+        for index, count in self.bins.items():
+            start = low + (index - low) // width * width
+            grouped[start] = grouped.get(start, 0) + count
+        for start in sorted(grouped):
+            rows.append({
+                'low': self.gamma ** (start - 1),
+                'high': self.gamma ** (start + width - 1),
+                'count': grouped[start],
+            })
+        return rows
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'zero': self.zero,
+            'bins': {str(index): count for index, count in self.bins.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return cls()
+        return cls(
+            data.get('relative_accuracy', RELATIVE_ACCURACY),
+            {int(index): count for index, count in data.get('bins', {}).items()},
+            data.get('zero', 0),
+        )
+
+
+def feature_values(features):
+    """{feature: float} for the sketched features of an aggregate_student_features() row"""
+    return {name: float(features.get(name) or 0) for name in FEATURES}
+
+
+def load_sketches(days_back):
+    """{feature: QuantileSketch} for a window, empty sketches for features not recorded yet"""
+    stored = {
+        row.feature: QuantileSketch.from_dict(row.sketch)
+        for row in FeatureSketch.objects.using(DEFAULT_DB_ALIAS).filter(days_back=days_back)
+    }
+    return {name: stored.get(name) or QuantileSketch() for name in FEATURES}
+
+
+def _stored_values(values, new, days_back):
+    """{user_id: StudentFeatureValues} for the students in `new`"""
+    old = {}
+    ids = list(new)
+    for i in range(0, len(ids), 500):
+        for row in values.filter(days_back=days_back, user_id__in=ids[i:i + 500]):
+            old[row.user_id] = row
+    return old
+
+
+def _changed(old, new):
+    return [sid for sid in new if sid not in old or old[sid].values != new[sid]]
+
+
+def record_features(rows, days_back=30):
+    """Fold recomputed aggregate_student_features() rows into the window's sketches
+
+    Each student's previous values are taken out of the sketches and the new
+    ones added. Students whose values did not change cost one lookup.
+    Returns the number of students whose values changed.
+    """
+    new = {row['student_id']: feature_values(row) for row in rows}
+    if not new:
+        return 0
+    values = StudentFeatureValues.objects.using(DEFAULT_DB_ALIAS)
+    # Unlocked first pass: most recomputations change nothing and need no lock
+    if not _changed(_stored_values(values, new, days_back), new):
+        return 0
+
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        stored = {
+            row.feature: row
+            for row in FeatureSketch.objects.using(DEFAULT_DB_ALIAS).select_for_update().filter(days_back=days_back)
+        }
+        # Read again under the lock, so a concurrent update's values are the ones taken out
+        old = _stored_values(values.select_for_update(), new, days_back)
+        changed = _changed(old, new)
+        if not changed:
+            return 0
+        sketches = {
+            name: QuantileSketch.from_dict(stored[name].sketch) if name in stored else QuantileSketch()
+            for name in FEATURES
+        }
+        for sid in changed:
+            for name, sketch in sketches.items():
+                if sid in old and name in old[sid].values:
+                    sketch.remove(old[sid].values[name])
+                sketch.add(new[sid][name])
+        for name, sketch in sketches.items():
+            row = stored.get(name) or FeatureSketch(feature=name, days_back=days_back)
+            row.sketch = sketch.to_dict()
+            row.count = sketch.count
+            row.save(using=DEFAULT_DB_ALIAS)
+
+        updates = [old[sid] for sid in changed if sid in old]
+        now = timezone.now()
+        for row in updates:
+            row.values = new[row.user_id]
+            row.updated_at = now
+        values.bulk_update(updates, ['values', 'updated_at'], batch_size=500)
+        values.bulk_create([
+            StudentFeatureValues(user_id=sid, days_back=days_back, values=new[sid])
+            for sid in changed if sid not in old
+        ], batch_size=500)
+        bump(COHORT)
+    return len(changed)
+
+
+def record_student(features, days_back=30):
+    """record_features() for one student on a request path; a failed update is logged, not raised"""
+    try:
+        record_features([features], days_back)
+    except DatabaseError:
+        logger.warning('Could not update the cohort sketches for student %s', features.get('student_id'),
+                       exc_info=True)
+
+
+def reset_window(days_back):
+    """Forget a window's sketches and stored values, before recounting it"""
+    FeatureSketch.objects.using(DEFAULT_DB_ALIAS).filter(days_back=days_back).delete()
+    StudentFeatureValues.objects.using(DEFAULT_DB_ALIAS).filter(days_back=days_back).delete()
+
+
+def cohort_summary(days_back=30, student_id=None, bins=20):
+    """Quantiles and distribution per feature, plus one student's percentiles if given
+
+    Reads only the sketches (and the student's stored values), so the cost
+    does not depend on the size of the cohort.
+    """
+    sketches = load_sketches(days_back)
+    summary = {
+        'days_back': days_back,
+        'relative_accuracy': RELATIVE_ACCURACY,
+        'features': {
+            name: {
+                'count': sketch.count,
+                'quantiles': {f'p{round(q * 100)}': sketch.quantile(q) for q in SUMMARY_QUANTILES},
+                'histogram': sketch.histogram(bins),
+            }
+            for name, sketch in sketches.items()
+        },
+    }
+    if student_id is not None:
+        summary['student'] = student_percentiles(student_id, days_back, sketches)
+    return summary
+
+
+def student_percentiles(student_id, days_back=30, sketches=None):
+    """{feature: {value, percentile}} from the student's last recorded values, or None"""
+    row = StudentFeatureValues.objects.using(DEFAULT_DB_ALIAS).filter(
+        user_id=student_id, days_back=days_back
+    ).first()
+    if row is None:
+        return None
+    if sketches is None:
+        sketches = load_sketches(days_back)
+    return {
+        name: {'value': row.values.get(name), 'percentile': sketches[name].percentile_of(row.values.get(name, 0))}
+        for name in FEATURES
+    }
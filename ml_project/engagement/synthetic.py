@@ -0,0 +1,259 @@
+"""
+Synthetic engagement data
+Week 10: Seeing where the time goes
+
+A seeded generator of textbook content and per-student engagement, sized by
+students, slides, questions and sessions per student. It produces records in
+the textbook API's user-engagement format, so the same data can be fed
+through the real import (import_engagement_data) or bulk-loaded straight into
+the tables (load_synthetic) to build large databases quickly.
+
+Every student's records come from their own seeded random stream with
+ids derived from the student id, so the output does not depend on how
+students are batched.
+"""
+import random
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    User, TextbookSection, TextbookPage, TextbookSlide, RevisionQuestion,
+    RevisionQuestionAttempt, RevisionQuestionAttemptDetail, WritingInteraction,
+    WritingInteractionBody, UserSlideRead, UserSlideReadSession
+)
+from .versions import DATA, STUDENTS, bump
+
+# Upper bound of details per attempt, used to give every detail a stable id
+MAX_DETAILS_PER_ATTEMPT = 3
+WORDS = (
+    'energy force cell reaction graph evidence because therefore however the process shows '
+    'that results depend on conditions explain describe compare structure function'
+).split()
+ENTITY_KEYS = (
+    'sections', 'pages', 'slides', 'questions', 'user_slide_reads', 'user_slide_sessions',
+    'attempts', 'attempt_details', 'writing_interactions'
+)
+
+
+class SyntheticSpec:
+    """Size and shape of a synthetic data set"""
+
+    def __init__(self, students, slides=200, questions=100, sessions_per_student=10,
+                 attempts_per_student=None, writing_per_student=1, days=45, seed=0, now=None):
+        self.students = students
+        self.slides = max(1, slides)
+        self.questions = max(1, questions)
+        self.sessions_per_student = sessions_per_student
+        self.attempts_per_student = (
+            sessions_per_student // 2 if attempts_per_student is None else attempts_per_student
+        )
+        self.writing_per_student = writing_per_student
+        # Spread activity past the default 30-day feature window so window filters do work
+        self.days = days
+        self.seed = seed
+        self.now = now or timezone.now()
+        self.pages = max(1, self.slides // 5)
+        self.sections = max(1, self.pages // 5)
+
+    def __repr__(self):
+        return (
+            f'SyntheticSpec(students={self.students}, slides={self.slides}, questions={self.questions}, '
+            f'sessions_per_student={self.sessions_per_student}, seed={self.seed})'
+        )
+
+
+def content_records(spec):
+    """Sections, pages, slides and questions"""
+    rng = random.Random(f'{spec.seed}-content')
+    return {
+        'sections': [
+            {'id': i, 'section_title': f'Section {i}'} for i in range(1, spec.sections + 1)
+        ],
+        'pages': [
+            {'id': i, 'page_title': f'Page {i}', 'sections': [(i - 1) % spec.sections + 1]}
+            for i in range(1, spec.pages + 1)
+        ],
+        'slides': [
+            {'id': i, 'slide_title': f'Slide {i}', 'pages': [(i - 1) % spec.pages + 1]}
+            for i in range(1, spec.slides + 1)
+        ],
+        'questions': [
+            {'id': i, 'textbook_page': rng.randint(1, spec.pages)} for i in range(1, spec.questions + 1)
+        ],
+    }
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def student_records(spec, student_id):
+    """Engagement records of one student, with datetimes (not yet serialised)"""
+    rng = random.Random(f'{spec.seed}-{student_id}')
+    base = student_id - 1
+    records = {key: [] for key in ENTITY_KEYS[4:]}
+
+    def moment():
+        return spec.now - timedelta(seconds=rng.randrange(spec.days * 86400))
+
+    sessions = spec.sessions_per_student
+    # Some sessions revisit a slide, so reads < sessions
+    slides = rng.sample(range(1, spec.slides + 1), min(spec.slides, max(1, sessions * 2 // 3))) if sessions else []
+    for k, slide_id in enumerate(slides):
+        records['user_slide_reads'].append({
+            'id': base * sessions + k + 1, 'user': student_id, 'slide': slide_id,
+            'slide_status': rng.choices(('read', 'unread', 'revise'), (6, 2, 2))[0],
+        })
+    for k in range(sessions):
+        read = records['user_slide_reads'][k % len(slides)]
+        expanded = moment()
+        duration = timedelta(seconds=int(rng.lognormvariate(4, 1)))
+        finished = rng.random() < 0.8
+        records['user_slide_sessions'].append({
+            'id': base * sessions + k + 1, 'slide_read': read['id'], 'expanded': expanded,
+            'collapsed': expanded + duration, 'read': expanded + duration if finished else None,
+        })
+
+    attempts = spec.attempts_per_student
+    for k in range(attempts):
+        attempt_id = base * attempts + k + 1
+        viewed = moment()
+        details = rng.randint(1, MAX_DETAILS_PER_ATTEMPT)
+        correct_at = None
+        for j in range(details):
+            is_correct = j == details - 1 and rng.random() < 0.7
+            timestamp = viewed + timedelta(seconds=30 * (j + 1))
+            if is_correct:
+                correct_at = timestamp
+            records['attempt_details'].append({
+                'id': (attempt_id - 1) * MAX_DETAILS_PER_ATTEMPT + j + 1, 'attempt': attempt_id,
+                'is_correct': is_correct, 'timestamp': timestamp,
+            })
+        records['attempts'].append({
+            'id': attempt_id, 'user': student_id, 'question': rng.randint(1, spec.questions),
+            'viewed': viewed, 'correct': correct_at,
+        })
+
+    writing = spec.writing_per_student
+    for k in range(writing):
+        records['writing_interactions'].append({
+            'id': base * writing + k + 1, 'user_id': student_id, 'page_id': rng.randint(1, spec.pages),
+            'user_input': _text(rng, rng.randint(40, 120)), 'openai_response': _text(rng, rng.randint(20, 60)),
+            'grade': rng.randint(0, 10), 'timestamp': moment(),
+        })
+    return records
+
+
+def _serialise(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def generate_payload(spec):
+    """The whole data set in the textbook API's user-engagement JSON format"""
+    payload = {key: [] for key in ENTITY_KEYS}
+    payload.update(content_records(spec))
+    for student_id in range(1, spec.students + 1):
+        for key, rows in student_records(spec, student_id).items():
+            payload[key].extend({k: _serialise(v) for k, v in row.items()} for row in rows)
+    return payload
+
+
+def _bulk_load_students(student_ids, records, batch_size):
+    User.objects.bulk_create(
+        [User(id=uid, username=f'user_{uid}') for uid in student_ids],
+        batch_size=batch_size, ignore_conflicts=True
+    )
+    reads = {row['id']: row['user'] for row in records['user_slide_reads']}
+    UserSlideRead.objects.bulk_create([
+        UserSlideRead(id=row['id'], user_id=row['user'], slide_id=row['slide'], slide_status=row['slide_status'])
+        for row in records['user_slide_reads']
+    ], batch_size=batch_size)
+    UserSlideReadSession.objects.bulk_create([
+        UserSlideReadSession(
+            id=row['id'], slide_read_id=row['slide_read'], user_id=reads[row['slide_read']],
+            expanded=row['expanded'], collapsed=row['collapsed'], read=row['read']
+        )
+        for row in records['user_slide_sessions']
+    ], batch_size=batch_size)
+    attempt_users = {row['id']: row['user'] for row in records['attempts']}
+    RevisionQuestionAttempt.objects.bulk_create([
+        RevisionQuestionAttempt(
+            id=row['id'], user_id=row['user'], question_id=row['question'],
+            viewed=row['viewed'], correct=row['correct']
+        )
+        for row in records['attempts']
+    ], batch_size=batch_size)
+    RevisionQuestionAttemptDetail.objects.bulk_create([
+        RevisionQuestionAttemptDetail(
+            id=row['id'], attempt_id=row['attempt'], user_id=attempt_users[row['attempt']],
+            is_correct=row['is_correct'], timestamp=row['timestamp']
+        )
+        for row in records['attempt_details']
+    ], batch_size=batch_size)
+    writing = records['writing_interactions']
+    interactions = WritingInteraction.objects.bulk_create([
+        WritingInteraction(id=row['id'], user_id=row['user_id'], page_id=row['page_id'], grade=row['grade'])
+        for row in writing
+    ], batch_size=batch_size)
+    # auto_now_add stamps the insert time; bulk_update writes the generated one as is
+    for interaction, row in zip(interactions, writing):
+        interaction.timestamp = row['timestamp']
+    WritingInteraction.objects.bulk_update(interactions, ['timestamp'], batch_size=batch_size)
+    WritingInteractionBody.objects.bulk_create([
+        WritingInteractionBody(
+            interaction_id=row['id'], user_input=row['user_input'], openai_response=row['openai_response']
+        )
+        for row in writing
+    ], batch_size=batch_size)
+
+
+def load_synthetic(spec, batch_size=2000):
+    """Bulk-insert the data set into the default database; returns row counts per entity
+
+    Much faster than the row-by-row import, but it bypasses it: use
+    import_engagement_data(generate_payload(spec)) to exercise the import.
+    Meant for an empty database; users that already exist are kept.
+    """
+    from .search import rebuild_index
+
+    counts = dict.fromkeys(('users',) + ENTITY_KEYS, 0)
+    content = content_records(spec)
+    with transaction.atomic():
+        TextbookSection.objects.bulk_create(
+            [TextbookSection(id=s['id'], section_title=s['section_title']) for s in content['sections']]
+        )
+        TextbookPage.objects.bulk_create([TextbookPage(id=p['id'], page_title=p['page_title']) for p in content['pages']])
+        TextbookPage.sections.through.objects.bulk_create([
+            TextbookPage.sections.through(textbookpage_id=p['id'], textbooksection_id=sid)
+            for p in content['pages'] for sid in p['sections']
+        ], batch_size=batch_size)
+        TextbookSlide.objects.bulk_create(
+            [TextbookSlide(id=s['id'], slide_title=s['slide_title']) for s in content['slides']], batch_size=batch_size
+        )
+        TextbookSlide.pages.through.objects.bulk_create([
+            TextbookSlide.pages.through(textbookslide_id=s['id'], textbookpage_id=pid)
+            for s in content['slides'] for pid in s['pages']
+        ], batch_size=batch_size)
+        RevisionQuestion.objects.bulk_create([
+            RevisionQuestion(id=q['id'], textbook_page_id=q['textbook_page']) for q in content['questions']
+        ], batch_size=batch_size)
+        for key in ('sections', 'pages', 'slides', 'questions'):
+            counts[key] = len(content[key])
+
+    for first in range(1, spec.students + 1, batch_size):
+        student_ids = range(first, min(first + batch_size, spec.students + 1))
+        chunk = {key: [] for key in ENTITY_KEYS[4:]}
+        for student_id in student_ids:
+            for key, rows in student_records(spec, student_id).items():
+                chunk[key].extend(rows)
+        with transaction.atomic():
+            _bulk_load_students(student_ids, chunk, batch_size)
+        for key, rows in chunk.items():
+            counts[key] += len(rows)
+    counts['users'] = spec.students
+    # Bulk inserts skip WritingInteraction.save(), which keeps the search index current
+    rebuild_index()
+    bump(DATA, STUDENTS)
+    return counts
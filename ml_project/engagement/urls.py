@@ -12,4 +12,11 @@ urlpatterns = [
     path('student/<int:student_id>/', views.student_dashboard, name='student_dashboard'),
     path('export/csv/', views.export_csv, name='export_csv'),
     path('export/json/', views.export_json, name='export_json'),
+    path('export/writing/', views.export_writing_ndjson, name='export_writing'),
+    path('writing/search/', views.search_writing_interactions, name='search_writing'),
+    path('imports/', views.import_runs, name='import_runs'),
+    path('ingest/', views.ingest_events, name='ingest'),
+    path('cohort/percentiles/', views.cohort_percentiles, name='cohort_percentiles'),
+    path('profiles/', views.profile_captures, name='profile_captures'),
+    path('profiles/<str:name>/', views.profile_capture_detail, name='profile_capture_detail'),
 ]
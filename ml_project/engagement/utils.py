@@ -2,8 +2,8 @@
 Engagement ML Feature Engineering Utilities
 Week 5: Data preparation and feature extraction
 """
-import pandas as pd
-import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from django.db import connections
 from django.db.models import Avg, Count, Sum, Q
 from django.utils import timezone
 from datetime import timedelta
@@ -12,9 +12,19 @@ from .models import (
     RevisionQuestionAttempt, RevisionQuestionAttemptDetail,
     WritingInteraction, TextbookPage, TextbookSlide
 )
+from .queries import (
+    slide_sessions_since, attempt_details_since, question_attempts_since, accuracy_counts,
+    archived_totals, archived_slide_ids
+)
+from .parallel import init_django_worker
+from .routers import analytics_reads
+from .sessionize import read_stats_by_student
+from .sketches import record_features
 
 def clean_nulls(df):
     """Clean null values in the dataset"""
+    import numpy as np
+
     # Fill numeric nulls with 0
     numeric_columns = df.select_dtypes(include=[np.number]).columns
     df[numeric_columns] = df[numeric_columns].fillna(0)
@@ -25,8 +35,13 @@ def clean_nulls(df):
     
     return df
 
-def aggregate_student_features(student_id, days_back=30):
-    """Aggregate engagement features for a specific student"""
+@analytics_reads()
+def aggregate_student_features(student_id, days_back=30, read_stats=None):
+    """Aggregate engagement features for a specific student
+
+    `read_stats` is the student's (active seconds, slide ids) entry from
+    read_stats_by_student(), when the caller loaded a whole batch at once.
+    """
     end_date = timezone.now()
     start_date = end_date - timedelta(days=days_back)
     
@@ -36,35 +51,27 @@ def aggregate_student_features(student_id, days_back=30):
     except User.DoesNotExist:
         return None
     
-    # 1. Time spent per slide
-    slide_sessions = UserSlideReadSession.objects.filter(
-        slide_read__user=student,
-        expanded__gte=start_date
-    )
+    # 1. Time spent per slide, overlapping sessions merged (see sessionize.py)
+    if read_stats is None:
+        read_stats = read_stats_by_student(slide_sessions_since(start_date, student.id)).get(student.id, (0, set()))
+    total_time_seconds, unique_slides = read_stats[0], set(read_stats[1])
     
-    total_time_seconds = 0
-    unique_slides = set()
-    for session in slide_sessions:
-        total_time_seconds += session.read_duration()
-        unique_slides.add(session.slide_read.slide_id)
+    # Events past the archive horizon only survive as daily summaries
+    archived_seconds, archived_questions, archived_correct = archived_totals(start_date, student.id)
+    if archived_seconds:
+        total_time_seconds += archived_seconds
+        unique_slides |= archived_slide_ids(start_date, student.id)
     
     time_spent_per_slide = total_time_seconds / len(unique_slides) if unique_slides else 0
     
     # 2. Average accuracy per page
-    question_attempts = RevisionQuestionAttemptDetail.objects.filter(
-        attempt__user=student,
-        timestamp__gte=start_date
-    )
-    
-    total_questions = question_attempts.count()
-    correct_questions = question_attempts.filter(is_correct=True).count()
+    total_questions, correct_questions = accuracy_counts(attempt_details_since(start_date, student.id))
+    total_questions += archived_questions
+    correct_questions += archived_correct
     average_accuracy_per_page = (correct_questions / total_questions) if total_questions > 0 else 0
     
     # 3. Attempt count per question
-    attempts = RevisionQuestionAttempt.objects.filter(
-        user=student,
-        viewed__gte=start_date
-    )
+    attempts = question_attempts_since(start_date, student.id)
     
     total_attempts = attempts.count()
     unique_questions = attempts.values('question').distinct().count()
@@ -84,25 +91,80 @@ def aggregate_student_features(student_id, days_back=30):
         'revisits': revisits
     }
 
-def build_dataset_csv(days_back=30, output_path='dataset.csv'):
-    """Build complete dataset CSV from engagement data"""
-    print(f"Building dataset for the last {days_back} days...")
-    
-    # Get all users with engagement data
-    users_with_data = User.objects.filter(
+def engaged_users():
+    """Users with any slide, question or writing engagement"""
+    return User.objects.filter(
         Q(revision_attempts__isnull=False) |
         Q(userslideread__isnull=False) |
         Q(id__in=WritingInteraction.objects.values_list('user_id', flat=True))
     ).distinct()
-    
-    print(f"Found {users_with_data.count()} users with engagement data")
-    
-    # Extract features for each user
+
+def shard_student_ranges(student_ids, workers):
+    """Split sorted student ids into at most `workers` contiguous (low, high) id ranges"""
+    import numpy as np
+
+    student_ids = sorted(student_ids)
+    if not student_ids:
+        return []
+    workers = max(1, min(workers, len(student_ids)))
+    return [
+        (int(chunk[0]), int(chunk[-1]))
+        for chunk in np.array_split(np.asarray(student_ids), workers)
+    ]
+
+@analytics_reads()
+def build_feature_shard(id_range, days_back=30):
+    """Extract features for engaged students whose id falls in the inclusive id range"""
+    low, high = id_range
     features_list = []
-    for user in users_with_data:
-        features = aggregate_student_features(user.id, days_back)
+    student_ids = engaged_users().filter(id__range=(low, high)).order_by('id').values_list('id', flat=True)
+    # One query and one vectorized pass for the whole shard's slide sessions
+    since = timezone.now() - timedelta(days=days_back)
+    read_stats = read_stats_by_student(slide_sessions_since(since).filter(user_id__gte=low, user_id__lte=high))
+    for student_id in student_ids:
+        features = aggregate_student_features(student_id, days_back, read_stats.get(student_id, (0, set())))
         if features:
             features_list.append(features)
+    return features_list
+
+@analytics_reads()
+def build_feature_rows(days_back=30, workers=1, record=False):
+    """Extract feature rows for every engaged student, optionally sharded across processes
+
+    With `record` the rows also update the cohort quantile sketches (retraining
+    does this; exports and benchmarks leave the sketches alone).
+    """
+    student_ids = list(engaged_users().order_by('id').values_list('id', flat=True))
+    print(f"Found {len(student_ids)} users with engagement data")
+
+    ranges = shard_student_ranges(student_ids, workers)
+    if len(ranges) <= 1:
+        features_list = [row for id_range in ranges for row in build_feature_shard(id_range, days_back)]
+        if record:
+            record_features(features_list, days_back)
+        return features_list
+
+    print(f"Sharding {len(student_ids)} students across {len(ranges)} worker processes...")
+    # Forked workers must not reuse the parent's connection handles
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=len(ranges), initializer=init_django_worker) as pool:
+        shards = pool.map(build_feature_shard, ranges, [days_back] * len(ranges))
+        # map() yields in submission order, so the merge is ordered by id range
+        features_list = [row for shard in shards for row in shard]
+    features_list.sort(key=lambda row: row['student_id'])
+    if record:
+        record_features(features_list, days_back)
+    return features_list
+
+@analytics_reads()
+def build_dataset_csv(days_back=30, output_path='dataset.csv', workers=1, record=False):
+    """Build complete dataset CSV from engagement data; `record` as in build_feature_rows()"""
+    import pandas as pd
+
+    print(f"Building dataset for the last {days_back} days...")
+    
+    # Extract features for each user
+    features_list = build_feature_rows(days_back, workers, record=record)
     
     if not features_list:
         print("No features extracted. Check if engagement data exists.")
@@ -136,7 +198,7 @@ def build_dataset_csv(days_back=30, output_path='dataset.csv'):
     y = df['score']
     
     # Add features and target to main dataframe
-    final_df = df[['student_id'] + feature_columns + ['score']]
+    final_df = df[['student_id'] + feature_columns + ['score']].reset_index(drop=True)
     
     # Save to CSV
     final_df.to_csv(output_path, index=False)
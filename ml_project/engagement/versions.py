@@ -0,0 +1,118 @@
+"""
+Data versions for HTTP conditional requests
+Week 10: Seeing where the time goes
+
+The data behind the read endpoints only changes when something writes it:
+an import, a push batch, an analytics snapshot, a model publish or a cohort
+sketch update. Each of those bumps a DataVersion counter, and versioned()
+wraps a view in Django's condition() with an ETag and Last-Modified taken
+from the counters it depends on, so a client that polls with If-None-Match
+or If-Modified-Since gets a 304 without the view running. Looking the
+versions up is a single query.
+
+    DATA        anything in the engagement tables (global dashboards, exports)
+    STUDENTS    every student at once (a full pull import, a snapshot refresh)
+    student:N   one student's events (push ingestion)
+    MODEL       the served model (retrain_model, rollback_model)
+    COHORT      the cohort feature sketches
+"""
+import hashlib
+from datetime import datetime, time
+from functools import wraps
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .models import DataVersion
+
+DATA = 'data'
+STUDENTS = 'students'
+MODEL = 'model'
+COHORT = 'cohort'
+
+
+def student_key(student_id):
+    return f'student:{student_id}'
+
+
+def bump(*keys, student_ids=()):
+    """Increment the given counters (creating missing ones)"""
+    keys = list(keys) + [student_key(sid) for sid in sorted(set(student_ids) - {None})]
+    now = timezone.now()
+    versions = DataVersion.objects.using(DEFAULT_DB_ALIAS)
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        versions.bulk_create([DataVersion(key=key, changed_at=now) for key in chunk], ignore_conflicts=True)
+        versions.filter(key__in=chunk).update(version=F('version') + 1, changed_at=now)
+
+
+def current_versions(keys):
+    """{key: (version, changed_at)} for the counters that exist, in one query"""
+    return {
+        key: (version, changed_at)
+        for key, version, changed_at in DataVersion.objects.using(DEFAULT_DB_ALIAS).filter(
+            key__in=keys
+        ).values_list('key', 'version', 'changed_at')
+    }
+
+
+def versioned(*keys, student_kwarg=None, daily=False, per_user=False):
+    """condition() with validators derived from data versions
+
+    `student_kwarg` names the URL kwarg whose student's versions also apply.
+    Views over a window that ends "now" pass `daily`, so their validators
+    also change at midnight as the window moves on. HTML views pass
+    `per_user`: the page carries the user's CSRF token and one-off messages,
+    so it is only revalidated for the same user with no messages pending.
+    Only successful responses carry the validators: an error must not be
+    revalidated into a 304 while the data stays the same.
+    """
+    def validators(request, **kwargs):
+        cached = getattr(request, '_data_version_validators', None)
+        if cached is not None:
+            return cached
+        scope = list(keys)
+        if student_kwarg:
+            scope += [STUDENTS, student_key(kwargs[student_kwarg])]
+        if per_user and _has_pending_messages(request):
+            request._data_version_validators = (None, None)
+            return request._data_version_validators
+        found = current_versions(scope)
+        parts = [request.get_full_path()] + [f'{key}={found.get(key, (0,))[0]}' for key in scope]
+        changes = [changed_at for _, changed_at in found.values()]
+        if daily:
+            today = timezone.localdate()
+            parts.append(today.isoformat())
+            changes.append(timezone.make_aware(datetime.combine(today, time.min)))
+        if per_user:
+            parts.append(f'user={request.user.pk or 0}')
+        etag = hashlib.sha1('|'.join(parts).encode()).hexdigest()[:24]
+        request._data_version_validators = (f'"{etag}"', max(changes, default=None))
+        return request._data_version_validators
+
+    conditional = condition(
+        etag_func=lambda request, *args, **kwargs: validators(request, **kwargs)[0],
+        last_modified_func=lambda request, *args, **kwargs: validators(request, **kwargs)[1],
+    )
+
+    def decorator(view):
+        view_with_validators = conditional(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            response = view_with_validators(request, *args, **kwargs)
+            # A 304 answers a validator that came from a 200, so it keeps them
+            if response.status_code not in (200, 304):
+                response.headers.pop('ETag', None)
+                response.headers.pop('Last-Modified', None)
+            return response
+        return inner
+    return decorator
+
+
+def _has_pending_messages(request):
+    storage = getattr(request, '_messages', None)
+    # len() loads the stored messages without marking them as shown
+    return storage is not None and len(storage) > 0
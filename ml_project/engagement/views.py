@@ -1,25 +1,38 @@
 import json
-import requests
-from requests.exceptions import RequestException, Timeout
+import time
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.contrib.auth import logout, authenticate, login
 from django.contrib.auth.models import User
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.csrf import csrf_exempt
 from .models import (
     TextbookSection, TextbookPage, TextbookSlide,
     RevisionQuestion, RevisionQuestionAttempt, RevisionQuestionAttemptDetail,
-    WritingInteraction, UserSlideRead, UserSlideReadSession
+    WritingInteraction, UserSlideRead, UserSlideReadSession, ImportRun
 )
+from .archive import archive_watermark, is_archived
+from .importing import ImportStats
+from .queries import (
+    slide_sessions_since, attempt_details_since, question_attempts_since,
+    total_read_seconds, accuracy_counts, archived_totals
+)
+from .routers import analytics_reads
+from .metrics import timed_inference
+from .sketches import FEATURE_LABELS, cohort_summary, record_student, student_percentiles
+from .versions import COHORT, DATA, MODEL, STUDENTS, bump, versioned
 
 DATA_API_URL = "https://se.eforge.online/textbook/api/user-engagement/"
 SESSION_INFO_URL = "https://se.eforge.online/textbook/get-session-info/"
 
+@versioned(DATA, MODEL, daily=True, per_user=True)
 def homepage(request):
     # Get dashboard metrics
     context = get_dashboard_metrics()
     return render(request, "engagement/homepage.html", context)
 
+@analytics_reads()
 def get_dashboard_metrics():
     """Get metrics for the dashboard display"""
     from django.db.models import Avg, Count, Sum, Q
@@ -29,44 +42,30 @@ def get_dashboard_metrics():
     # Get data from the last 30 days
     thirty_days_ago = timezone.now() - timedelta(days=30)
     
-    # Total time spent on slides - calculate in Python since read_duration is a method
-    slide_sessions = UserSlideReadSession.objects.filter(
-        expanded__gte=thirty_days_ago
-    )
-    
-    total_time = 0
-    for session in slide_sessions:
-        total_time += session.read_duration()
+    # Total active time on slides, overlapping sessions merged (see sessionize.py)
+    total_time = total_read_seconds(slide_sessions_since(thirty_days_ago))
+    archived_time, archived_attempts, archived_correct = archived_totals(thirty_days_ago)
+    total_time += archived_time
     
     # Convert to hours and minutes
     hours = total_time // 3600
     minutes = (total_time % 3600) // 60
     
     # Average accuracy per page (from question attempts)
-    accuracy_data = RevisionQuestionAttemptDetail.objects.filter(
-        timestamp__gte=thirty_days_ago
-    ).aggregate(
-        total_attempts=Count('id'),
-        correct_attempts=Count('id', filter=Q(is_correct=True))
-    )
-    
-    total_attempts = accuracy_data['total_attempts'] or 0
-    correct_attempts = accuracy_data['correct_attempts'] or 0
+    total_attempts, correct_attempts = accuracy_counts(attempt_details_since(thirty_days_ago))
+    total_attempts += archived_attempts
+    correct_attempts += archived_correct
     avg_accuracy = (correct_attempts / total_attempts * 100) if total_attempts > 0 else 0
     
     # Number of attempts per question
-    attempts_per_question = RevisionQuestionAttempt.objects.filter(
-        viewed__gte=thirty_days_ago
-    ).aggregate(
-        total_attempts=Count('id')
-    )['total_attempts'] or 0
+    attempts_per_question = question_attempts_since(thirty_days_ago).count()
     
     # Get recent predictions for chart using actual users
     recent_predictions = []
     try:
-        import joblib, pandas as pd
-        from pathlib import Path
-        model = joblib.load(Path("model.pkl"))
+        import pandas as pd
+        from .model_store import load_current_model
+        model = load_current_model()
         
         # Get actual users from database that have engagement data
         from .models import UserSlideRead
@@ -82,7 +81,8 @@ def get_dashboard_metrics():
                 "attempts": 5 + user.id,
                 "revisits": 2 + (user.id % 3)
             }])
-            prediction = float(model.predict(X)[0])
+            with timed_inference(model):
+                prediction = float(model.predict(X)[0])
             recent_predictions.append({
                 "student_id": user.id,
                 "predicted_score": round(prediction, 1),
@@ -142,7 +142,7 @@ def manual_import(request):
     if not sessionid:
         messages.error(request, "No session found. Please log in to the textbook first.")
         return redirect("engagement:auth_reminder")
-    ok = fetch_data_from_textbook(sessionid, csrftoken)
+    ok = fetch_data_from_textbook(sessionid, csrftoken, triggered_by=request.user)
     if ok:
         messages.success(request, "Data imported successfully.")
         resp = redirect("engagement:homepage")
@@ -151,139 +151,198 @@ def manual_import(request):
     messages.error(request, "Import failed. Try authenticating again.")
     return redirect("engagement:auth_reminder")
 
-def fetch_data_from_textbook(sessionid, csrftoken):
+def fetch_data_from_textbook(sessionid, csrftoken, triggered_by=None):
+    """Download and import the textbook's engagement data, recorded as an ImportRun"""
+    # Imported here so worker boot does not pay for requests/urllib3
+    import requests
+    from requests.exceptions import RequestException, Timeout
+
     headers = {
         "X-Requested-With": "XMLHttpRequest",
         "X-CSRFToken": csrftoken or "",
     }
     cookies = { "sessionid": sessionid, "csrftoken": csrftoken or "" }
+    run = ImportRun.objects.create(
+        source="textbook",
+        triggered_by=triggered_by if triggered_by is not None and triggered_by.is_authenticated else None,
+    )
+    stats = ImportStats()
     try:
+        started = time.perf_counter()
         r = requests.get(DATA_API_URL, headers=headers, cookies=cookies, timeout=8)
+        run.download_seconds = time.perf_counter() - started
+        run.download_bytes = len(r.content)
         if r.status_code == 403:
+            run.finish(stats, error="Textbook API refused the session (403)")
             return False
         r.raise_for_status()
         data = r.json()
-    except (RequestException, Timeout, ValueError):
+    except (RequestException, Timeout, ValueError) as e:
+        run.finish(stats, error=f"Download failed: {e}")
         return False
+    try:
+        import_engagement_data(data, stats)
+    except Exception as e:
+        run.finish(stats, error=f"Import failed: {e!r}")
+        raise
+    finally:
+        # The pull import rewrites every student's rows; a failed one may have written some
+        bump(DATA, STUDENTS)
+    run.finish(stats)
+    return True
+
+def import_engagement_data(data, stats=None):
+    """Upsert a user-engagement payload (the textbook API's JSON format); returns the ImportStats"""
+    stats = stats if stats is not None else ImportStats()
+    # Events before the archive watermark already live on in the daily summaries
+    watermark = archive_watermark()
 
     # Upsert users from engagement events (if IDs present)
     user_ids = set()
     user_ids |= {item.get("user") for item in data.get("user_slide_reads", []) if item.get("user")}
     user_ids |= {item.get("user") for item in data.get("attempts", []) if item.get("user")}
-    for uid in filter(None, user_ids):
-        User.objects.get_or_create(id=uid, defaults={"username": f"user_{uid}"})
+    with stats.stage("users"):
+        for uid in filter(None, user_ids):
+            _, created = User.objects.get_or_create(id=uid, defaults={"username": f"user_{uid}"})
+            stats.saved("users", created)
 
     sec_map = {}
-    for s in data.get("sections", []):
-        obj, _ = TextbookSection.objects.update_or_create(id=s["id"], defaults={"section_title": s["section_title"]})
-        sec_map[s["id"]] = obj
+    with stats.stage("sections"):
+        for s in data.get("sections", []):
+            obj, created = TextbookSection.objects.update_or_create(id=s["id"], defaults={"section_title": s["section_title"]})
+            sec_map[s["id"]] = obj
+            stats.saved("sections", created)
 
     page_map = {}
-    for p in data.get("pages", []):
-        obj, _ = TextbookPage.objects.update_or_create(id=p["id"], defaults={"page_title": p["page_title"]})
-        page_map[p["id"]] = obj
-        # link sections if provided
-        for sid in p.get("sections", []):
-            if sid in sec_map:
-                obj.sections.add(sec_map[sid])
+    with stats.stage("pages"):
+        for p in data.get("pages", []):
+            obj, created = TextbookPage.objects.update_or_create(id=p["id"], defaults={"page_title": p["page_title"]})
+            page_map[p["id"]] = obj
+            stats.saved("pages", created)
+            # link sections if provided
+            for sid in p.get("sections", []):
+                if sid in sec_map:
+                    obj.sections.add(sec_map[sid])
 
     slide_map = {}
-    for sl in data.get("slides", []):
-        obj, _ = TextbookSlide.objects.update_or_create(id=sl["id"], defaults={"slide_title": sl.get("slide_title","")})
-        slide_map[sl["id"]] = obj
-        for pid in sl.get("pages", []):
-            if pid in page_map:
-                obj.pages.add(page_map[pid])
+    with stats.stage("slides"):
+        for sl in data.get("slides", []):
+            obj, created = TextbookSlide.objects.update_or_create(id=sl["id"], defaults={"slide_title": sl.get("slide_title","")})
+            slide_map[sl["id"]] = obj
+            stats.saved("slides", created)
+            for pid in sl.get("pages", []):
+                if pid in page_map:
+                    obj.pages.add(page_map[pid])
 
     usr_slide_map = {}
-    for usr in data.get("user_slide_reads", []):
-        uid = usr.get("user"); sid = usr.get("slide")
-        u = User.objects.filter(id=uid).first()
-        sl = slide_map.get(sid)
-        if not (u and sl):
-            continue
-        obj, _ = UserSlideRead.objects.update_or_create(
-            id=usr["id"],
-            defaults={"user": u, "slide": sl, "slide_status": usr.get("slide_status","unread")}
-        )
-        usr_slide_map[usr["id"]] = obj
-
-    for sess in data.get("user_slide_sessions", []):
-        sr = usr_slide_map.get(sess.get("slide_read"))
-        if not sr: 
-            continue
-        UserSlideReadSession.objects.update_or_create(
-            id=sess["id"],
-            defaults={
-                "slide_read": sr,
-                "expanded": sess.get("expanded"),
-                "collapsed": sess.get("collapsed"),
-                "read": sess.get("read"),
-            }
-        )
+    with stats.stage("user_slide_reads"):
+        for usr in data.get("user_slide_reads", []):
+            uid = usr.get("user"); sid = usr.get("slide")
+            u = User.objects.filter(id=uid).first()
+            sl = slide_map.get(sid)
+            if not (u and sl):
+                stats.skipped("user_slide_reads")
+                continue
+            obj, created = UserSlideRead.objects.update_or_create(
+                id=usr["id"],
+                defaults={"user": u, "slide": sl, "slide_status": usr.get("slide_status","unread")}
+            )
+            usr_slide_map[usr["id"]] = obj
+            stats.saved("user_slide_reads", created)
+
+    with stats.stage("user_slide_sessions"):
+        for sess in data.get("user_slide_sessions", []):
+            sr = usr_slide_map.get(sess.get("slide_read"))
+            if not sr or is_archived(sess.get("expanded"), watermark):
+                stats.skipped("user_slide_sessions")
+                continue
+            _, created = UserSlideReadSession.objects.update_or_create(
+                id=sess["id"],
+                defaults={
+                    "slide_read": sr,
+                    "user_id": sr.user_id,
+                    "expanded": sess.get("expanded"),
+                    "collapsed": sess.get("collapsed"),
+                    "read": sess.get("read"),
+                }
+            )
+            stats.saved("user_slide_sessions", created)
 
     q_map = {}
-    for q in data.get("questions", []):
-        pid = q.get("textbook_page")
-        if pid in page_map:
-            obj, _ = RevisionQuestion.objects.update_or_create(
+    with stats.stage("questions"):
+        for q in data.get("questions", []):
+            pid = q.get("textbook_page")
+            if pid not in page_map:
+                stats.skipped("questions")
+                continue
+            obj, created = RevisionQuestion.objects.update_or_create(
                 id=q["id"], defaults={"textbook_page": page_map[pid]}
             )
             q_map[q["id"]] = obj
+            stats.saved("questions", created)
 
     at_map = {}
-    for a in data.get("attempts", []):
-        uid = a.get("user")
-        qid = a.get("question")
-        u = User.objects.filter(id=uid).first()
-        qobj = q_map.get(qid)
-        if not (u and qobj):
-            continue
-        obj, _ = RevisionQuestionAttempt.objects.update_or_create(
-            id=a["id"],
-            defaults={"user": u, "question": qobj, "viewed": a.get("viewed"), "correct": a.get("correct")}
-        )
-        at_map[a["id"]] = obj
-
-    for d in data.get("attempt_details", []):
-        att = at_map.get(d.get("attempt"))
-        if not att:
-            continue
-        RevisionQuestionAttemptDetail.objects.update_or_create(
-            id=d["id"],
-            defaults={"attempt": att, "is_correct": d.get("is_correct", False), "timestamp": d.get("timestamp")}
-        )
+    with stats.stage("attempts"):
+        for a in data.get("attempts", []):
+            uid = a.get("user")
+            qid = a.get("question")
+            u = User.objects.filter(id=uid).first()
+            qobj = q_map.get(qid)
+            if not (u and qobj):
+                stats.skipped("attempts")
+                continue
+            obj, created = RevisionQuestionAttempt.objects.update_or_create(
+                id=a["id"],
+                defaults={"user": u, "question": qobj, "viewed": a.get("viewed"), "correct": a.get("correct")}
+            )
+            at_map[a["id"]] = obj
+            stats.saved("attempts", created)
 
-    for w in data.get("writing_interactions", []):
-        try:
-            grade_raw = w.get("grade")
-            grade_clean = int(float(grade_raw)) if grade_raw is not None else None
-        except (TypeError, ValueError):
-            grade_clean = None
-        WritingInteraction.objects.update_or_create(
-            id=w["id"],
-            defaults={
-                "user_id": w.get("user_id"),
-                "page_id": w.get("page_id"),
-                "user_input": w.get("user_input",""),
-                "openai_response": w.get("openai_response",""),
-                "grade": grade_clean,
-                "timestamp": w.get("timestamp"),
-            }
-        )
-    return True
+    with stats.stage("attempt_details"):
+        for d in data.get("attempt_details", []):
+            att = at_map.get(d.get("attempt"))
+            if not att or is_archived(d.get("timestamp"), watermark):
+                stats.skipped("attempt_details")
+                continue
+            _, created = RevisionQuestionAttemptDetail.objects.update_or_create(
+                id=d["id"],
+                defaults={"attempt": att, "user_id": att.user_id, "is_correct": d.get("is_correct", False), "timestamp": d.get("timestamp")}
+            )
+            stats.saved("attempt_details", created)
 
+    with stats.stage("writing_interactions"):
+        for w in data.get("writing_interactions", []):
+            try:
+                grade_raw = w.get("grade")
+                grade_clean = int(float(grade_raw)) if grade_raw is not None else None
+            except (TypeError, ValueError):
+                grade_clean = None
+            _, created = WritingInteraction.objects.update_or_create(
+                id=w["id"],
+                defaults={
+                    "user_id": w.get("user_id"),
+                    "page_id": w.get("page_id"),
+                    "user_input": w.get("user_input",""),
+                    "openai_response": w.get("openai_response",""),
+                    "grade": grade_clean,
+                    "timestamp": w.get("timestamp"),
+                }
+            )
+            stats.saved("writing_interactions", created)
+    return stats
+
+@versioned(MODEL, student_kwarg="student_id", daily=True)
 def predict_for_student(request, student_id:int):
     """Predict score for a student using real engagement data"""
     try:
-        import joblib, pandas as pd
-        from pathlib import Path
+        import pandas as pd
         from django.db.models import Avg, Count, Sum, Q
         from django.utils import timezone
         from datetime import timedelta
+        from .model_store import load_current_model
         
-        # Load the trained model
-        model = joblib.load(Path("model.pkl"))
+        # Load the published model (cached per process)
+        model = load_current_model()
         
         # Basic features
         feature_columns = ['time_spent_per_slide', 'average_accuracy_per_page', 
@@ -298,6 +357,7 @@ def predict_for_student(request, student_id:int):
         
         if not features:
             return JsonResponse({"error": "Student not found or no engagement data"}, status=404)
+        record_student(features, days_back=30)
         
         # Create feature vector matching the training data
         feature_vector = {}
@@ -311,7 +371,8 @@ def predict_for_student(request, student_id:int):
         X = pd.DataFrame([feature_vector])
         
         # Make prediction
-        predicted_score = float(model.predict(X)[0])
+        with timed_inference(model):
+            predicted_score = float(model.predict(X)[0])
         
         # Get actual score if available
         actual_score = features.get('avg_writing_grade', None)
@@ -330,6 +391,8 @@ def predict_for_student(request, student_id:int):
 
 
 
+@versioned(COHORT, student_kwarg="student_id", daily=True, per_user=True)
+@analytics_reads()
 def student_dashboard(request, student_id):
     """Display detailed dashboard for a specific student"""
     from django.shortcuts import get_object_or_404
@@ -343,27 +406,18 @@ def student_dashboard(request, student_id):
     # Get data from the last 30 days
     thirty_days_ago = timezone.now() - timedelta(days=30)
     
-    # Student engagement metrics - calculate in Python since read_duration is a method
-    slide_sessions = UserSlideReadSession.objects.filter(
-        slide_read__user=user,
-        expanded__gte=thirty_days_ago
-    )
-    
-    total_time = 0
-    for session in slide_sessions:
-        total_time += session.read_duration()
+    # Student engagement metrics - active read time, overlapping sessions merged
+    total_time = total_read_seconds(slide_sessions_since(thirty_days_ago, user.id))
+    archived_time, archived_questions, archived_correct = archived_totals(thirty_days_ago, user.id)
+    total_time += archived_time
     
     hours = total_time // 3600
     minutes = (total_time % 3600) // 60
     
     # Question performance
-    question_attempts = RevisionQuestionAttemptDetail.objects.filter(
-        attempt__user=user,
-        timestamp__gte=thirty_days_ago
-    )
-    
-    total_questions = question_attempts.count()
-    correct_questions = question_attempts.filter(is_correct=True).count()
+    total_questions, correct_questions = accuracy_counts(attempt_details_since(thirty_days_ago, user.id))
+    total_questions += archived_questions
+    correct_questions += archived_correct
     accuracy = (correct_questions / total_questions * 100) if total_questions > 0 else 0
     
     # Writing performance
@@ -383,7 +437,7 @@ def student_dashboard(request, student_id):
     # Recent slide reads
     recent_slides = UserSlideRead.objects.filter(
         user=user
-    ).order_by('-id')[:5]
+    ).select_related('slide').order_by('-id')[:5]
     
     for slide_read in recent_slides:
         recent_activity.append({
@@ -396,7 +450,7 @@ def student_dashboard(request, student_id):
     # Recent question attempts
     recent_questions = RevisionQuestionAttempt.objects.filter(
         user=user
-    ).order_by('-id')[:5]
+    ).select_related('question__textbook_page').order_by('-id')[:5]
     
     for attempt in recent_questions:
         recent_activity.append({
@@ -420,11 +474,41 @@ def student_dashboard(request, student_id):
         'avg_writing_grade': round(avg_writing_grade, 1),
         'total_writing': total_writing,
         'recent_activity': recent_activity,
+        'cohort': cohort_widget(student_id, days_back=30),
         'has_data': total_time > 0 or total_questions > 0
     }
     
     return render(request, "engagement/student_dashboard.html", context)
 
+def cohort_widget(student_id, days_back=30):
+    """Rows for the dashboard's cohort comparison, from the sketches and the student's stored values"""
+    percentiles = student_percentiles(student_id, days_back)
+    if not percentiles:
+        return []
+    return [
+        {
+            "label": FEATURE_LABELS[name],
+            "value": round(row["value"] or 0, 2),
+            "percentile": round(row["percentile"]) if row["percentile"] is not None else None,
+        }
+        for name, row in percentiles.items()
+    ]
+
+@versioned(COHORT)
+def cohort_percentiles(request):
+    """Cohort quantiles and distribution per feature, and optionally one student's percentiles"""
+    try:
+        days_back = int(request.GET.get("days", 30))
+        student_id = int(request.GET["student"]) if request.GET.get("student") else None
+        bins = min(max(int(request.GET.get("bins", 20)), 1), 100)
+    except ValueError:
+        return HttpResponseBadRequest("days, student and bins must be integers")
+    summary = cohort_summary(days_back, student_id, bins)
+    if student_id is not None and summary["student"] is None:
+        return JsonResponse({"error": "No features recorded for this student in this window"}, status=404)
+    return JsonResponse(summary)
+
+@versioned(DATA, daily=True)
 def export_csv(request):
     """Export engagement data as CSV"""
     from django.http import HttpResponse
@@ -452,6 +536,7 @@ def export_csv(request):
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
+@versioned(DATA, daily=True)
 def export_json(request):
     """Export engagement data as JSON"""
     from django.http import JsonResponse
@@ -485,3 +570,134 @@ def export_json(request):
         
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
+
+@versioned(DATA)
+@analytics_reads()
+def export_writing_ndjson(request):
+    """Stream writing interactions with their text as NDJSON, one row at a time"""
+    from django.http import StreamingHttpResponse
+
+    rows = WritingInteraction.objects.select_related('body').order_by('id')
+    # Pin the replica now: the body is iterated after the view returns
+    rows = rows.using(rows.db)
+
+    def lines():
+        for w in rows.iterator(chunk_size=500):
+            yield json.dumps({
+                "id": w.id,
+                "user_id": w.user_id,
+                "page_id": w.page_id,
+                "grade": w.grade,
+                "timestamp": w.timestamp.isoformat() if w.timestamp else None,
+                "user_input": w.user_input,
+                "openai_response": w.openai_response,
+            }) + "\n"
+
+    response = StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+    response['Content-Disposition'] = 'attachment; filename="writing_interactions.ndjson"'
+    return response
+
+@staff_member_required
+def search_writing_interactions(request):
+    """Full-text search over student answers and model responses"""
+    from .search import search_writing
+
+    query = request.GET.get("q", "").strip()
+    if not query:
+        return HttpResponseBadRequest("Missing search query ?q=")
+    try:
+        limit = min(int(request.GET.get("limit", 50)), 500)
+    except ValueError:
+        return HttpResponseBadRequest("limit must be an integer")
+
+    ids = search_writing(query, limit=limit)
+    by_id = WritingInteraction.objects.select_related('body').in_bulk(ids)
+    results = [
+        {
+            "id": w.id,
+            "user_id": w.user_id,
+            "page_id": w.page_id,
+            "grade": w.grade,
+            "timestamp": w.timestamp.isoformat() if w.timestamp else None,
+            "user_input": w.user_input[:300],
+            "openai_response": w.openai_response[:300],
+        }
+        for w in (by_id.get(i) for i in ids) if w is not None
+    ]
+    return JsonResponse({"query": query, "count": len(results), "results": results})
+
+@staff_member_required
+def profile_captures(request):
+    """Recent per-request profiles (see engagement.profiling)"""
+    from django.contrib import admin
+    from .profiling import list_captures
+
+    context = {
+        **admin.site.each_context(request),
+        "title": "Request profiles",
+        "captures": list_captures(limit=100),
+    }
+    return render(request, "admin/engagement/profile_captures.html", context)
+
+@staff_member_required
+def profile_capture_detail(request, name):
+    """One capture's SQL trace and top functions; ?download=1 returns the pstats file"""
+    from django.contrib import admin
+    from django.http import FileResponse, Http404
+    from .profiling import load_capture, profiling_dir
+
+    capture = load_capture(name)
+    if capture is None:
+        raise Http404("No such capture")
+    if request.GET.get("download"):
+        return FileResponse(open(profiling_dir() / f"{name}.prof", "rb"), as_attachment=True,
+                            filename=f"{name}.prof")
+    context = {
+        **admin.site.each_context(request),
+        "title": f"Profile of {capture['method']} {capture['path']}",
+        "capture": capture,
+    }
+    return render(request, "admin/engagement/profile_capture_detail.html", context)
+
+@staff_member_required
+def import_runs(request):
+    """Recent imports with timings and per-entity throughput, newest first"""
+    try:
+        limit = max(1, min(int(request.GET.get("limit", 20)), 200))
+    except ValueError:
+        return HttpResponseBadRequest("limit must be an integer")
+    runs = ImportRun.objects.order_by("-started_at")
+    source = request.GET.get("source")
+    if source:
+        runs = runs.filter(source=source)
+    return JsonResponse({"runs": [run.as_dict() for run in runs[:limit]]})
+
+@csrf_exempt
+def ingest_events(request):
+    """Token-authenticated NDJSON push of engagement events (see engagement.ingest)"""
+    import hmac
+    from django.conf import settings
+    from .ingest import EventError, IngestConflict, ingest_ndjson
+
+    token = getattr(settings, "INGEST_TOKEN", None)
+    if not token:
+        return JsonResponse({"error": "Ingestion is disabled (INGEST_TOKEN is not set)"}, status=503)
+    supplied = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+        return JsonResponse({"error": "Invalid ingest token"}, status=403)
+    if request.method != "POST":
+        return HttpResponseBadRequest("POST required")
+    try:
+        run, accepted, duplicates, rejected = ingest_ndjson(
+            request.body, max_events=getattr(settings, "INGEST_MAX_EVENTS", 5000)
+        )
+    except IngestConflict:
+        return JsonResponse({"error": "A concurrent batch stored some of these keys; resend the batch"}, status=409)
+    except EventError as e:
+        return JsonResponse({"error": str(e)}, status=413)
+    return JsonResponse({
+        "run": run.id,
+        "accepted": accepted,
+        "duplicates": duplicates,
+        "rejected": rejected,
+    })
@@ -0,0 +1,69 @@
+"""
+Worker warm-up
+Week 10: Seeing where the time goes
+
+With settings.ENGAGEMENT_WARMUP on, EngagementConfig.ready() calls warm_up()
+so the first prediction or dashboard a worker serves does not pay for
+importing the scientific stack, loading the model or compiling templates.
+With gunicorn --preload this runs once in the master, before the fork, and
+the workers share the result.
+
+It does not touch the database: queries during app initialisation are
+discouraged by Django and would also run for every manage.py command.
+"""
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES = ('engagement/homepage.html', 'engagement/student_dashboard.html')
+
+
+def warm_up():
+    """Preload the model, the modules predictions need and the dashboard templates"""
+    start = time.perf_counter()
+    steps = {}
+
+    def step(name, fn):
+        t = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            # A failed warm-up only means a slower first request; never stop the worker
+            logger.warning('Warm-up step %s failed: %r', name, e)
+        steps[name] = (time.perf_counter() - t) * 1000
+
+    def load_model():
+        import pandas as pd
+        from .model_store import load_current_model
+
+        model = load_current_model()
+        columns = getattr(model, 'feature_names_in_', None)
+        if columns is not None:
+            # One prediction pulls in the estimator's lazily imported code paths
+            model.predict(pd.DataFrame([[0.0] * len(columns)], columns=list(columns)))
+
+    def compile_templates():
+        from django.template.loader import get_template
+
+        for name in TEMPLATES:
+            get_template(name)
+
+    def resolve_urls():
+        from django.urls import get_resolver
+
+        get_resolver().url_patterns
+
+    def import_stack():
+        # The modules predictions import lazily; warm even when no model is published yet
+        import pandas  # noqa: F401
+        import sklearn.ensemble  # noqa: F401
+        from . import flat_forest, utils  # noqa: F401
+
+    step('imports', import_stack)
+    step('model', load_model)
+    step('templates', compile_templates)
+    step('urls', resolve_urls)
+    logger.info('Warm-up done in %.0f ms (%s)', (time.perf_counter() - start) * 1000,
+                ', '.join(f'{name} {ms:.0f} ms' for name, ms in steps.items()))
+    return steps
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+import django
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -23,7 +26,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-4u0rsw_n+hyjz$@^*318_dp35si*xc)e(j+bv+u(fgmf!hzs9_'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
 
@@ -57,6 +60,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
+    'engagement.metrics.MetricsMiddleware',
+    'engagement.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'ml_project.urls'
@@ -83,11 +88,76 @@ WSGI_APPLICATION = 'ml_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# DB_ENGINE=postgres switches to PostgreSQL (DB_NAME/DB_USER/DB_PASSWORD/DB_HOST/DB_PORT);
+# the default is the local SQLite file, tuned by SQLITE_PRAGMAS below.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE in ('postgres', 'postgresql'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'engagement'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Seconds to wait on a locked database before raising
+                'timeout': 20,
+            },
+        }
+    }
+    if django.VERSION >= (5, 1):
+        # Take the write lock at BEGIN so busy_timeout applies instead of failing on upgrade
+        DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+
+# Persistent connections: reuse a connection for this many seconds instead of per request
+DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Read replica for dashboards, exports and feature building (engagement.routers).
+# With SQLite it is a snapshot file refreshed by `manage.py snapshot_analytics_db`;
+# with PostgreSQL set ANALYTICS_DB_HOST to a streaming replica.
+# Until the replica exists, analytics reads fall back to the primary.
+ANALYTICS_DB_ALIAS = 'analytics'
+
+if DB_ENGINE in ('postgres', 'postgresql'):
+    if os.environ.get('ANALYTICS_DB_HOST'):
+        DATABASES[ANALYTICS_DB_ALIAS] = {
+            **DATABASES['default'],
+            'HOST': os.environ['ANALYTICS_DB_HOST'],
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES[ANALYTICS_DB_ALIAS] = {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('ANALYTICS_DB_NAME', BASE_DIR / 'analytics.sqlite3'),
+        'OPTIONS': {'timeout': 20},
+        # Short-lived so readers pick up a fresh snapshot soon after it is swapped in
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['engagement.routers.AnalyticsRouter']
+
+# Applied to every new SQLite connection (engagement.db.apply_sqlite_pragmas).
+# WAL lets dashboard readers run while an import is writing.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'cache_size': -64000,       # KiB, i.e. 64 MB page cache
+    'mmap_size': 268435456,     # 256 MB
+    'busy_timeout': 20000,      # ms
+    'temp_store': 'memory',
 }
 
 
@@ -127,6 +197,45 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Versioned model artifacts published by retrain_model
+MODEL_STORE_DIR = Path(os.environ.get('MODEL_STORE_DIR', BASE_DIR / 'model_store'))
+# Memory-map published models so all worker processes share one copy of the trees
+MODEL_MMAP = True
+# Preload the model, prediction stack and templates when the app starts (set it for server
+# processes only; every manage.py command would pay for it too)
+ENGAGEMENT_WARMUP = os.environ.get('ENGAGEMENT_WARMUP', '0') == '1'
+
+# Slide sessions and attempt details older than this many days are folded into
+# DailyEngagementSummary rows by `manage.py archive_engagement`
+ENGAGEMENT_ARCHIVE_DAYS = int(os.environ.get('ENGAGEMENT_ARCHIVE_DAYS', 180))
+# A slide read session counts for at most this many seconds of active time; a slide
+# left expanded longer than that was not being read (see engagement/sessionize.py)
+SESSION_IDLE_CAP = 30 * 60
+
+# Per-view SQL query budgets (view name -> max queries); exceeding one logs a warning.
+# /metrics serves Prometheus text; set METRICS_TOKEN to require "Authorization: Bearer <token>".
+# Without a token only signed-in staff can read it.
+METRICS_QUERY_BUDGETS = {
+    'engagement:homepage': 10,
+    'engagement:student_dashboard': 12,
+    'engagement:predict': 12,
+}
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Push ingestion (/engagement/ingest/) is enabled by setting a token for the textbook service
+INGEST_TOKEN = os.environ.get('INGEST_TOKEN')
+INGEST_MAX_EVENTS = 5000
+# Idempotency keys older than this are removed by `manage.py prune_ingested_events`;
+# a batch resent after that is applied again
+INGEST_KEY_RETENTION_DAYS = int(os.environ.get('INGEST_KEY_RETENTION_DAYS', 30))
+
+# Staff-triggered per-request profiles (?_profile=1 or X-Profile: 1 header), listed at /engagement/profiles/
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '1') == '1'
+PROFILING_DIR = Path(os.environ.get('PROFILING_DIR', BASE_DIR / 'profiles'))
+PROFILING_SQL_SAMPLE_EVERY = 1
+PROFILING_SQL_MAX = 1000
+PROFILING_KEEP = 50
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -17,10 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.shortcuts import redirect
+from engagement.metrics import metrics_view
 
 urlpatterns = [
     path('', lambda request: redirect('engagement:homepage'), name='root'),
     path('admin/', admin.site.urls),
     path('accounts/', include('allauth.urls')),
     path('engagement/', include('engagement.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
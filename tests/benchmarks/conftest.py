@@ -0,0 +1,116 @@
+"""
+Benchmark fixtures: synthetic databases per scale and the baseline comparison
+
+Opt-in: set RUN_BENCHMARKS=1. BENCHMARK_SCALES picks the scales (default 1k),
+BENCHMARK_THRESHOLD the allowed slowdown against baseline.json (default 1.5),
+and BENCHMARK_UPDATE=1 rewrites baseline.json with this run's numbers.
+"""
+import json
+import os
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+import pytest
+from django.db import connections, transaction
+
+from engagement.metrics import QueryCounter
+from engagement.synthetic import SyntheticSpec, generate_payload, load_synthetic
+
+SCALES = {'1k': 1000, '10k': 10000, '100k': 100000}
+SEED = 42
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+# Absolute slack so millisecond timings do not fail on scheduler noise
+NOISE_FLOOR_SECONDS = 0.05
+RESULTS = {}
+
+if not os.environ.get('RUN_BENCHMARKS'):
+    collect_ignore_glob = ['test_*.py']
+
+
+def selected_scales():
+    names = os.environ.get('BENCHMARK_SCALES', '1k').split(',')
+    return [name.strip() for name in names if name.strip() in SCALES]
+
+
+def spec_for(scale):
+    return SyntheticSpec(SCALES[scale], seed=SEED)
+
+
+def _baseline():
+    if BASELINE_PATH.exists():
+        return json.loads(BASELINE_PATH.read_text())
+    return {}
+
+
+def pytest_generate_tests(metafunc):
+    if 'synthetic_db' in metafunc.fixturenames:
+        metafunc.parametrize('synthetic_db', selected_scales(), indirect=True, scope='module')
+    elif 'scale' in metafunc.fixturenames:
+        metafunc.parametrize('scale', selected_scales())
+
+
+@pytest.fixture(scope='module')
+def synthetic_db(request, django_db_setup, django_db_blocker):
+    """A loaded synthetic database for the module's scale, rolled back afterwards"""
+    scale = request.param
+    with django_db_blocker.unblock(), transaction.atomic():
+        counts = load_synthetic(spec_for(scale))
+        yield scale, counts
+        transaction.set_rollback(True)
+
+
+@pytest.fixture
+def synthetic_payload(scale):
+    """The scale's data set in the textbook API format, for the import benchmark"""
+    return generate_payload(spec_for(scale))
+
+
+@pytest.fixture
+def benchmark():
+    """benchmark(name, scale, fn, repeats=1): best-of-N seconds and the query count of one run
+
+    Fails when the time exceeds the baseline by more than the threshold, or
+    when the query count grows at all (it is deterministic for a seed).
+    """
+    def run(name, scale, fn, repeats=1):
+        best = float('inf')
+        for _ in range(repeats):
+            counter = QueryCounter()
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(counter))
+                start = time.perf_counter()
+                result = fn()
+                best = min(best, time.perf_counter() - start)
+        key = f'{name}[{scale}]'
+        RESULTS[key] = {'seconds': round(best, 4), 'queries': counter.count}
+
+        baseline = _baseline().get(key)
+        if baseline and not os.environ.get('BENCHMARK_UPDATE'):
+            threshold = float(os.environ.get('BENCHMARK_THRESHOLD', '1.5'))
+            assert counter.count <= baseline['queries'], (
+                f"{key}: {counter.count} queries, baseline {baseline['queries']}"
+            )
+            assert best <= max(baseline['seconds'] * threshold, baseline['seconds'] + NOISE_FLOOR_SECONDS), (
+                f"{key}: {best:.3f}s, baseline {baseline['seconds']:.3f}s (threshold {threshold}x)"
+            )
+        return result
+    return run
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not RESULTS:
+        return
+    baseline = _baseline()
+    terminalreporter.section('benchmarks')
+    terminalreporter.write_line(f"{'benchmark':<36}{'seconds':>10}{'baseline':>10}{'queries':>10}{'baseline':>10}")
+    for key, result in sorted(RESULTS.items()):
+        base = baseline.get(key, {})
+        terminalreporter.write_line(
+            f"{key:<36}{result['seconds']:>10.3f}{base.get('seconds', float('nan')):>10.3f}"
+            f"{result['queries']:>10}{base.get('queries', '-'):>10}"
+        )
+    if os.environ.get('BENCHMARK_UPDATE'):
+        BASELINE_PATH.write_text(json.dumps({**baseline, **RESULTS}, indent=2, sort_keys=True) + '\n')
+        terminalreporter.write_line(f'Baseline written to {BASELINE_PATH}')
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from engagement import model_store
+from engagement.model_store import ModelStore
+from engagement.utils import build_dataset_csv
+from engagement.views import import_engagement_data
+
+FEATURES = ['time_spent_per_slide', 'average_accuracy_per_page', 'attempt_count_per_question', 'revisits']
+
+
+@pytest.fixture
+def serving_model(settings, tmp_path):
+    """A small forest published to a scratch model store"""
+    import joblib
+    import numpy as np
+    from sklearn.ensemble import RandomForestRegressor
+
+    rng = np.random.default_rng(0)
+    model = RandomForestRegressor(n_estimators=50, random_state=0).fit(rng.random((500, 4)), rng.random(500))
+    artifacts = tmp_path / 'artifacts'
+    artifacts.mkdir()
+    joblib.dump(model, artifacts / 'model.pkl')
+    (artifacts / 'metrics.json').write_text(json.dumps({}))
+    settings.MODEL_STORE_DIR = tmp_path / 'store'
+    ModelStore().publish(artifacts, FEATURES, model=model)
+    model_store._model_cache.update(version=None, model=None)
+    yield model
+    model_store._model_cache.update(version=None, model=None)
+
+
+@pytest.mark.django_db
+def test_import(scale, synthetic_payload, benchmark):
+    benchmark('import_engagement_data', scale, lambda: import_engagement_data(synthetic_payload))
+
+
+@pytest.mark.django_db
+def test_build_dataset_csv(synthetic_db, benchmark, tmp_path):
+    scale, counts = synthetic_db
+    output = tmp_path / 'dataset.csv'
+    benchmark('build_dataset_csv', scale, lambda: build_dataset_csv(output_path=str(output)))
+    assert sum(1 for _ in output.open()) == counts['users'] + 1
+
+
+@pytest.mark.django_db
+def test_predict(synthetic_db, benchmark, client, serving_model):
+    scale, counts = synthetic_db
+    url = f"/engagement/predict/{counts['users'] // 2}/"
+    response = benchmark('predict_for_student', scale, lambda: client.get(url), repeats=5)
+    assert response.status_code == 200, response.content
+
+
+@pytest.mark.django_db
+def test_homepage_dashboard(synthetic_db, benchmark, client, serving_model):
+    scale, _ = synthetic_db
+    response = benchmark('homepage', scale, lambda: client.get('/engagement/'), repeats=3)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_student_dashboard(synthetic_db, benchmark, client):
+    scale, counts = synthetic_db
+    url = f"/engagement/student/{counts['users'] // 2}/"
+    response = benchmark('student_dashboard', scale, lambda: client.get(url), repeats=5)
+    assert response.status_code == 200
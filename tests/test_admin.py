@@ -0,0 +1,54 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from engagement.admin_utils import EstimatedCountPaginator
+from engagement.models import (
+    User, TextbookSection, TextbookPage, RevisionQuestion, RevisionQuestionAttempt
+)
+
+
+def _add_rows(n):
+    section = TextbookSection.objects.create(section_title="S")
+    for i in range(n):
+        page = TextbookPage.objects.create(page_title=f"P{i}")
+        page.sections.add(section)
+        user = User.objects.create(username=f"u{TextbookPage.objects.count()}")
+        RevisionQuestionAttempt.objects.create(user=user, question=RevisionQuestion.objects.create(textbook_page=page))
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", [
+    "/admin/engagement/textbookpage/",
+    "/admin/engagement/revisionquestionattempt/",
+    "/admin/engagement/revisionquestionattempt/?user=u1&question=1",
+])
+def test_changelist_queries_do_not_grow_with_rows(admin_client, url):
+    def queries():
+        with CaptureQueriesContext(connection) as ctx:
+            assert admin_client.get(url).status_code == 200
+        return len(ctx)
+    _add_rows(3)
+    before = queries()
+    _add_rows(20)
+    assert queries() == before
+
+@pytest.mark.django_db
+def test_input_filter(admin_client):
+    _add_rows(3)
+    response = admin_client.get("/admin/engagement/revisionquestionattempt/", {"user": "u2"})
+    assert [a.user.username for a in response.context["cl"].result_list] == ["u2"]
+    assert b'name="user" value="u2"' in response.content
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="estimates come from sqlite_stat1")
+def test_estimated_count_paginator(monkeypatch):
+    _add_rows(3)
+    monkeypatch.setattr(EstimatedCountPaginator, "count_limit", 2)
+    attempts = RevisionQuestionAttempt.objects.order_by("id")
+    assert EstimatedCountPaginator(attempts.filter(user__username__startswith="u"), 10).count == 2
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+        cursor.execute("UPDATE sqlite_stat1 SET stat = '5000000 1' WHERE tbl = 'engagement_revisionquestionattempt'")
+    with CaptureQueriesContext(connection) as ctx:
+        assert EstimatedCountPaginator(attempts, 10).count == 5000000
+    assert "COUNT" not in ctx.captured_queries[0]["sql"]
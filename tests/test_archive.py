@@ -0,0 +1,86 @@
+import gzip
+import json
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from engagement.archive import archive_cutoff, archive_engagement, archive_watermark
+from engagement.ingest import ingest_ndjson
+from engagement.models import (
+    User, TextbookPage, TextbookSlide, UserSlideRead, UserSlideReadSession,
+    RevisionQuestion, RevisionQuestionAttempt, RevisionQuestionAttemptDetail,
+    DailyEngagementSummary
+)
+from engagement.utils import aggregate_student_features
+from engagement.views import import_engagement_data
+
+
+@pytest.mark.django_db
+def test_archive_keeps_long_range_features(tmp_path):
+    user = User.objects.create(username="s")
+    page = TextbookPage.objects.create(page_title="P")
+    attempt = RevisionQuestionAttempt.objects.create(
+        user=user, question=RevisionQuestion.objects.create(textbook_page=page), viewed=timezone.now()
+    )
+    now = timezone.now()
+    for i, age in enumerate((400, 399, 399, 2)):
+        slide_read = UserSlideRead.objects.create(user=user, slide=TextbookSlide.objects.create(slide_title=str(i)))
+        expanded = now - timedelta(days=age)
+        UserSlideReadSession.objects.create(slide_read=slide_read, expanded=expanded, read=expanded + timedelta(seconds=60 * (i + 1)))
+        RevisionQuestionAttemptDetail.objects.create(attempt=attempt, is_correct=i % 2 == 0, timestamp=expanded)
+    before = aggregate_student_features(user.id, days_back=500)
+
+    cold = tmp_path / "cold.ndjson.gz"
+    assert archive_engagement(archive_cutoff(180), batch_size=2, cold_storage_path=cold) == (3, 3)
+
+    assert aggregate_student_features(user.id, days_back=500) == before
+    assert UserSlideReadSession.objects.count() == 1
+    assert DailyEngagementSummary.objects.count() == 2
+    with gzip.open(cold, "rt") as f:
+        assert len([json.loads(line) for line in f]) == 6
+
+
+@pytest.mark.django_db
+def test_reimported_events_before_the_watermark_are_dropped():
+    user = User.objects.create(id=7, username="s")
+    page = TextbookPage.objects.create(page_title="P")
+    slide = TextbookSlide.objects.create(slide_title="S")
+    question = RevisionQuestion.objects.create(textbook_page=page)
+    slide_read = UserSlideRead.objects.create(user=user, slide=slide)
+    attempt = RevisionQuestionAttempt.objects.create(user=user, question=question, viewed=timezone.now())
+    expanded = timezone.now() - timedelta(days=400)
+    session = UserSlideReadSession.objects.create(slide_read=slide_read, expanded=expanded,
+                                                  read=expanded + timedelta(minutes=5))
+    detail = RevisionQuestionAttemptDetail.objects.create(attempt=attempt, is_correct=True, timestamp=expanded)
+    before = aggregate_student_features(user.id, days_back=500)
+    assert archive_engagement(archive_cutoff(180)) == (1, 1)
+    assert archive_watermark() == archive_cutoff(180)
+
+    # The textbook API still returns the archived rows on the next pull
+    stats = import_engagement_data({
+        "pages": [{"id": page.id, "page_title": "P"}],
+        "slides": [{"id": slide.id, "slide_title": "S"}],
+        "questions": [{"id": question.id, "textbook_page": page.id}],
+        "user_slide_reads": [{"id": slide_read.id, "user": 7, "slide": slide.id, "slide_status": "read"}],
+        "user_slide_sessions": [{"id": session.id, "slide_read": slide_read.id, "expanded": expanded.isoformat(),
+                                 "read": (expanded + timedelta(minutes=5)).isoformat()}],
+        "attempts": [{"id": attempt.id, "user": 7, "question": question.id, "viewed": attempt.viewed.isoformat()}],
+        "attempt_details": [{"id": detail.id, "attempt": attempt.id, "is_correct": True,
+                             "timestamp": expanded.isoformat()}],
+    })
+    assert stats.as_dict()["user_slide_sessions"]["skipped"] == 1
+    assert stats.as_dict()["attempt_details"]["skipped"] == 1
+
+    run, accepted, _, rejected = ingest_ndjson("\n".join(json.dumps(event) for event in [
+        {"type": "user_slide_session", "data": {"id": session.id, "slide_read": slide_read.id,
+                                                "expanded": expanded.isoformat()}},
+        {"type": "attempt_detail", "data": {"id": detail.id, "attempt": attempt.id,
+                                            "timestamp": expanded.isoformat()}},
+    ]).encode())
+    assert accepted == 0
+    assert ["archive watermark" in r["error"] for r in rejected] == [True, True]
+
+    assert not UserSlideReadSession.objects.exists()
+    assert not RevisionQuestionAttemptDetail.objects.exists()
+    assert aggregate_student_features(user.id, days_back=500) == before
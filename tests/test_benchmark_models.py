@@ -0,0 +1,46 @@
+import json
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+from django.core.management import call_command
+from engagement.management.commands.benchmark_models import choose_production_model
+
+
+def _result(name, r2, p99):
+    return {"name": name, "r2": r2, "serving": {"p99_ms": p99}}
+
+
+def test_choose_production_model():
+    results = [_result("slow", 0.9, 5.0), _result("fast", 0.8, 1.0), _result("worst", 0.5, 2.0)]
+    assert choose_production_model(results)["name"] == "slow"
+    assert choose_production_model(results, max_p99_ms=2.0)["name"] == "fast"
+    # Nothing fits the budget: the fastest one is recommended
+    assert choose_production_model(results, max_p99_ms=0.5)["name"] == "fast"
+
+
+def test_benchmark_models(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"student_id": range(150), "a": rng.normal(size=150), "b": rng.normal(size=150)})
+    df["score"] = df["a"] * 3 + rng.normal(scale=0.1, size=150)
+    df.to_csv(tmp_path / "dataset.csv", index=False)
+    (tmp_path / "candidates.json").write_text(json.dumps([
+        {"name": "forest", "family": "random_forest", "params": {"n_estimators": 5}},
+        {"name": "ridge", "family": "ridge", "params": {"alpha": 1.0}},
+    ]))
+    output = tmp_path / "results.json"
+    options = dict(dataset=str(tmp_path / "dataset.csv"), candidates=str(tmp_path / "candidates.json"),
+                   output=str(output), latency_samples=5)
+    call_command("benchmark_models", **options, stdout=StringIO())
+    report = json.loads(output.read_text())
+    results = {r["name"]: r for r in report["results"]}
+    assert results["forest"]["layout"] == "flat_forest"
+    assert results["ridge"]["layout"] == "pickle"
+    assert results["ridge"]["r2"] > 0.9
+    assert report["recommended"]["name"] == max(results.values(), key=lambda r: r["r2"])["name"]
+    assert report["dataset"]["rows"] == 150
+
+    out = StringIO()
+    options["output"] = str(tmp_path / "rerun.json")
+    call_command("benchmark_models", **options, compare=str(output), stdout=out)
+    assert "ΔR²" in out.getvalue()
@@ -0,0 +1,30 @@
+import pytest
+from engagement.utils import shard_student_ranges, build_feature_rows, build_dataset_csv
+from engagement.models import User, TextbookSlide, UserSlideRead, StudentFeatureValues
+
+
+def test_shard_student_ranges_are_contiguous_and_ordered():
+    ranges = shard_student_ranges([9, 1, 5, 3, 7], 2)
+    assert ranges == [(1, 5), (7, 9)]
+    assert shard_student_ranges([4, 2], 8) == [(2, 2), (4, 4)]
+    assert shard_student_ranges([], 4) == []
+
+@pytest.mark.django_db
+def test_build_feature_rows_sorted_by_student():
+    slide = TextbookSlide.objects.create(slide_title="S1")
+    for name in ("b", "a", "c"):
+        user = User.objects.create(username=name)
+        UserSlideRead.objects.create(user=user, slide=slide, slide_status="revise")
+    rows = build_feature_rows(days_back=30, workers=1)
+    ids = [row["student_id"] for row in rows]
+    assert ids == sorted(ids) and len(ids) == 3
+
+@pytest.mark.django_db
+def test_only_recording_builds_update_the_sketches(tmp_path):
+    slide = TextbookSlide.objects.create(slide_title="S1")
+    user = User.objects.create(username="a")
+    UserSlideRead.objects.create(user=user, slide=slide, slide_status="revise")
+    build_dataset_csv(days_back=30, output_path=str(tmp_path / "dataset.csv"))
+    assert not StudentFeatureValues.objects.exists()
+    build_feature_rows(days_back=30, workers=1, record=True)
+    assert StudentFeatureValues.objects.get().user_id == user.id
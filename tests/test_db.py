@@ -0,0 +1,46 @@
+import sqlite3
+
+import pytest
+from django.db import OperationalError, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+
+
+def _connect(path, alias):
+    settings_dict = {**connections["default"].settings_dict, "NAME": str(path), "CONN_MAX_AGE": 0}
+    wrapper = DatabaseWrapper(settings_dict, alias=alias)
+    wrapper.ensure_connection()
+    return wrapper
+
+
+def _pragma(wrapper, name):
+    with wrapper.cursor() as cursor:
+        cursor.execute(f"PRAGMA {name}")
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+def test_sqlite_pragmas_applied(tmp_path):
+    wrapper = _connect(tmp_path / "primary.sqlite3", "pragma_test")
+    try:
+        assert _pragma(wrapper, "journal_mode") == "wal"
+        assert _pragma(wrapper, "synchronous") == 1  # NORMAL
+        assert _pragma(wrapper, "busy_timeout") == 20000
+        assert _pragma(wrapper, "cache_size") == -64000
+        assert _pragma(wrapper, "query_only") == 0
+    finally:
+        wrapper.close()
+
+
+@pytest.mark.django_db
+def test_analytics_snapshot_is_read_only(tmp_path, settings):
+    settings.ANALYTICS_DB_ALIAS = "pragma_snapshot"
+    sqlite3.connect(tmp_path / "snapshot.sqlite3").execute("CREATE TABLE t (x)").connection.close()
+    wrapper = _connect(tmp_path / "snapshot.sqlite3", "pragma_snapshot")
+    try:
+        assert _pragma(wrapper, "journal_mode") == "delete"
+        assert _pragma(wrapper, "query_only") == 1
+        with pytest.raises(OperationalError, match="readonly"):
+            with wrapper.cursor() as cursor:
+                cursor.execute("INSERT INTO t VALUES (1)")
+    finally:
+        wrapper.close()
@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from engagement.flat_forest import FlatForest, export_flat_forest
+
+
+def test_flat_forest_matches_sklearn(tmp_path):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(300, 3)), columns=["a", "b", "c"])
+    y = X["a"] * 2 + rng.normal(size=300)
+    model = RandomForestRegressor(n_estimators=10, random_state=0).fit(X, y)
+    assert export_flat_forest(model, tmp_path)
+    flat = FlatForest(tmp_path)
+    X_new = pd.DataFrame(rng.normal(size=(50, 3)), columns=["a", "b", "c"])
+    np.testing.assert_allclose(flat.predict(X_new), model.predict(X_new))
+    assert isinstance(flat.left, np.memmap)
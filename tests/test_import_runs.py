@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from engagement import views
+from engagement.models import ImportRun, User
+from engagement.synthetic import SyntheticSpec, generate_payload
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode()
+    def raise_for_status(self):
+        pass
+    def json(self):
+        return json.loads(self.content)
+
+@pytest.mark.django_db
+def test_fetch_records_import_run(monkeypatch):
+    payload = generate_payload(SyntheticSpec(3, slides=10, questions=5, sessions_per_student=3))
+    payload["attempt_details"].append({"id": 999, "attempt": 12345, "is_correct": True})
+    monkeypatch.setattr("requests.get", lambda *args, **kwargs: FakeResponse(payload))
+    assert views.fetch_data_from_textbook("session", "csrf")
+    monkeypatch.setattr("requests.get", lambda *args, **kwargs: FakeResponse(payload))
+    assert views.fetch_data_from_textbook("session", "csrf")
+
+    first, second = ImportRun.objects.order_by("started_at")
+    assert first.status == "succeeded" and first.download_bytes > 0
+    assert first.entity_stats["user_slide_sessions"]["inserted"] == 9
+    assert first.entity_stats["attempt_details"]["skipped"] == 1
+    assert second.entity_stats["user_slide_sessions"] == {
+        **second.entity_stats["user_slide_sessions"], "inserted": 0, "updated": 9
+    }
+    assert first.total_rows == second.total_rows > 0
+
+@pytest.mark.django_db
+def test_failed_download_is_recorded_and_listed(monkeypatch, client):
+    monkeypatch.setattr("requests.get", lambda *args, **kwargs: FakeResponse({}, status_code=403))
+    assert not views.fetch_data_from_textbook("session", "csrf")
+    client.force_login(User.objects.create(username="admin", is_staff=True))
+    runs = client.get("/engagement/imports/").json()["runs"]
+    assert len(runs) == 1 and runs[0]["status"] == "failed" and "403" in runs[0]["error"]
+    assert len(client.get("/engagement/imports/?limit=-5").json()["runs"]) == 1
+    assert client.get("/engagement/imports/?limit=x").status_code == 400
@@ -0,0 +1,129 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.utils import timezone
+
+from engagement import ingest
+from engagement.models import ImportRun, IngestedEvent, User, UserSlideRead, UserSlideReadSession
+
+TOKEN = "push-secret"
+
+
+def ndjson(*events):
+    return "\n".join(json.dumps(event) for event in events)
+
+
+def post(client, body, token=TOKEN):
+    return client.post("/engagement/ingest/", data=body, content_type="application/x-ndjson",
+                       HTTP_AUTHORIZATION=f"Bearer {token}")
+
+
+BATCH = ndjson(
+    {"type": "section", "key": "sec-1", "data": {"id": 1, "section_title": "Intro"}},
+    {"type": "page", "key": "page-1", "data": {"id": 1, "page_title": "Start", "sections": [1]}},
+    {"type": "slide", "key": "slide-1", "data": {"id": 1, "slide_title": "Hello", "pages": [1]}},
+    {"type": "user_slide_read", "key": "read-1", "data": {"id": 1, "user": 7, "slide": 1, "slide_status": "read"}},
+    {"type": "user_slide_session", "key": "sess-1",
+     "data": {"id": 1, "slide_read": 1, "expanded": "2025-01-01T10:00:00Z", "collapsed": "2025-01-01T10:05:00Z"}},
+    {"type": "user_slide_session", "key": "sess-2", "data": {"id": 2, "slide_read": 99, "expanded": "2025-01-01T10:00:00Z"}},
+    {"type": "attempt", "key": "bad", "data": {"id": "x", "user": 7, "question": 1}},
+)
+
+
+@pytest.mark.django_db
+def test_ingest_requires_token(client, settings):
+    settings.INGEST_TOKEN = None
+    assert post(client, BATCH).status_code == 503
+    settings.INGEST_TOKEN = TOKEN
+    assert post(client, BATCH, token="wrong").status_code == 403
+    assert not UserSlideReadSession.objects.exists()
+
+
+@pytest.mark.django_db
+def test_ingest_batch_is_idempotent(client, settings):
+    settings.INGEST_TOKEN = TOKEN
+    result = post(client, BATCH).json()
+    assert result["accepted"] == 5 and result["duplicates"] == 0
+    assert [r["line"] for r in result["rejected"]] == [6, 7]
+    session = UserSlideReadSession.objects.get()
+    assert session.user_id == 7 and session.collapsed is not None
+
+    run = ImportRun.objects.get(id=result["run"])
+    assert run.source == "push" and run.status == "succeeded"
+    assert run.entity_stats["user_slide_sessions"]["skipped"] == 1
+
+    # Resending the batch stores nothing twice
+    again = post(client, BATCH).json()
+    assert again["accepted"] == 0 and again["duplicates"] == 5
+    assert IngestedEvent.objects.count() == 5
+    assert UserSlideReadSession.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_ingest_rejects_oversized_batch(client, settings):
+    settings.INGEST_TOKEN = TOKEN
+    settings.INGEST_MAX_EVENTS = 3
+    assert post(client, BATCH).status_code == 413
+    assert ImportRun.objects.get().status == "failed"
+
+
+@pytest.mark.django_db
+def test_ingest_rejects_second_slide_read_for_a_user_and_slide(client, settings):
+    settings.INGEST_TOKEN = TOKEN
+    post(client, BATCH)
+    result = post(client, ndjson(
+        {"type": "user_slide_read", "data": {"id": 2, "user": 8, "slide": 1}},
+        {"type": "user_slide_read", "data": {"id": 3, "user": 8, "slide": 1}},
+        {"type": "user_slide_read", "data": {"id": 4, "user": 7, "slide": 1}},
+        {"type": "user_slide_read", "data": {"id": 1, "user": 7, "slide": 1, "slide_status": "revise"}},
+    )).json()
+    assert result["accepted"] == 2
+    assert [r["line"] for r in result["rejected"]] == [2, 3]
+    assert "already has slide_read 2" in result["rejected"][0]["error"]
+    assert sorted(UserSlideRead.objects.values_list("id", "user_id", "slide_status")) == [(1, 7, "revise"), (2, 8, "unread")]
+
+
+@pytest.mark.django_db
+def test_ingest_creates_users_only_for_accepted_events(client, settings):
+    settings.INGEST_TOKEN = TOKEN
+    result = post(client, ndjson(
+        {"type": "user_slide_read", "data": {"id": 1, "user": 41, "slide": 99}},
+        {"type": "attempt", "data": {"id": 1, "user": 42, "question": 99}},
+    )).json()
+    assert result["accepted"] == 0
+    assert not User.objects.filter(id__in=[41, 42]).exists()
+
+
+@pytest.mark.django_db
+def test_only_key_conflicts_are_reported_as_concurrent(client, settings, monkeypatch):
+    settings.INGEST_TOKEN = TOKEN
+    write = ingest._write
+
+    def racing_write(*args):
+        # Another batch stores one of the keys after the duplicate check
+        IngestedEvent.objects.create(key="sec-1", event_type="section")
+        return write(*args)
+
+    monkeypatch.setattr(ingest, "_write", racing_write)
+    assert post(client, BATCH).status_code == 409
+    assert not UserSlideReadSession.objects.exists()
+
+    def failing_write(*args):
+        raise IntegrityError("NOT NULL constraint failed")
+
+    monkeypatch.setattr(ingest, "_write", failing_write)
+    with pytest.raises(IntegrityError):
+        ingest.ingest_ndjson(BATCH.encode())
+    assert ImportRun.objects.latest("id").error.startswith("Ingest failed")
+
+
+@pytest.mark.django_db
+def test_prune_ingested_events():
+    IngestedEvent.objects.create(key="old", event_type="section", received_at=timezone.now() - timedelta(days=40))
+    IngestedEvent.objects.create(key="new", event_type="section")
+    call_command("prune_ingested_events", days=30, batch_size=1, stdout=StringIO())
+    assert list(IngestedEvent.objects.values_list("key", flat=True)) == ["new"]
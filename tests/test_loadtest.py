@@ -0,0 +1,15 @@
+import pytest
+from django.core.management.base import CommandError
+
+from engagement.management.commands.loadtest import parse_mix, summarise
+
+
+def test_parse_mix_and_summary():
+    assert parse_mix("student=3,predict") == {"student": 3.0, "predict": 1.0}
+    with pytest.raises(CommandError):
+        parse_mix("admin=1")
+    samples = [("student", float(ms), ms != 100) for ms in range(1, 101)] + [("predict", 5.0, True)]
+    summary = summarise(samples, seconds=10)
+    assert summary["student"]["requests"] == 100 and summary["student"]["errors"] == 1
+    assert summary["student"]["p50_ms"] == pytest.approx(50.5)
+    assert summary["total"]["rps"] == pytest.approx(10.1)
@@ -0,0 +1,36 @@
+import logging
+
+import pytest
+
+from engagement import metrics
+from engagement.models import User
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    for histogram in metrics.REGISTRY:
+        histogram.clear()
+
+@pytest.mark.django_db
+def test_middleware_records_queries_and_warns_over_budget(client, settings, caplog):
+    settings.METRICS_QUERY_BUDGETS = {"engagement:student_dashboard": 1}
+    user = User.objects.create(username="s")
+    with caplog.at_level(logging.WARNING, logger="engagement.metrics"):
+        assert client.get(f"/engagement/student/{user.id}/").status_code == 200
+    queries = metrics.REQUEST_QUERIES.snapshot(("engagement:student_dashboard",))
+    assert queries["count"] == 1 and queries["sum"] > 1
+    assert "budget 1" in caplog.text
+
+@pytest.mark.django_db
+def test_metrics_endpoint_renders_prometheus_text(client, settings):
+    client.get("/engagement/student/999999/")
+    assert client.get("/metrics").status_code == 403
+    client.force_login(User.objects.create(username="admin", is_staff=True))
+    body = client.get("/metrics").content.decode()
+    assert '# TYPE engagement_request_seconds histogram' in body
+    assert 'engagement_request_seconds_count{view="engagement:student_dashboard",method="GET",status="404"} 1' in body
+    settings.METRICS_TOKEN = "secret"
+    client.logout()
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code == 403
+    assert client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret").status_code == 200
@@ -0,0 +1,28 @@
+import json
+import pytest
+from engagement.model_store import ModelStore, ModelStoreError
+
+
+def _artifacts(path, r2):
+    path.mkdir()
+    (path / "model.pkl").write_bytes(b"model")
+    (path / "metrics.json").write_text(json.dumps({"r2": r2}))
+    return path
+
+def test_publish_and_rollback(tmp_path):
+    store = ModelStore(tmp_path / "store")
+    first = store.publish(_artifacts(tmp_path / "a", 0.1), ["x"], "fp-a")
+    second = store.publish(_artifacts(tmp_path / "b", 0.2), ["x"], "fp-b")
+    assert store.current_version() == second
+    assert store.load_manifest()["data_fingerprint"] == "fp-b"
+    assert store.rollback() == first
+    assert store.load_metrics() == {"r2": 0.1}
+    with pytest.raises(ModelStoreError):
+        store.rollback()
+
+def test_prune_keeps_current(tmp_path):
+    store = ModelStore(tmp_path / "store")
+    versions = [store.publish(_artifacts(tmp_path / str(i), i), [], None) for i in range(4)]
+    store.rollback(versions[0])
+    store.prune(keep=2)
+    assert store.versions() == [versions[0], versions[3]]
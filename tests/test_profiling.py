@@ -0,0 +1,42 @@
+import pytest
+
+from engagement.models import User
+from engagement.profiling import list_captures, load_capture
+
+
+@pytest.fixture
+def staff_client(client):
+    client.force_login(User.objects.create(username="admin", is_staff=True))
+    return client
+
+@pytest.mark.django_db
+def test_staff_request_is_profiled_with_sql_trace(staff_client, settings, tmp_path):
+    settings.PROFILING_DIR = tmp_path
+    student = User.objects.create(username="s")
+    response = staff_client.get(f"/engagement/student/{student.id}/?_profile=1")
+    name = response["X-Profile-Capture"]
+    capture = load_capture(name)
+    assert capture["view"] == "engagement:student_dashboard" and capture["status"] == 200
+    assert capture["queries"] == len(capture["statements"]) and "engagement_" in "".join(s["sql"] for s in capture["statements"])
+    assert (tmp_path / f"{name}.prof").exists()
+
+    listing = staff_client.get("/engagement/profiles/")
+    assert name in listing.content.decode()
+    assert staff_client.get(f"/engagement/profiles/{name}/?download=1").status_code == 200
+
+@pytest.mark.django_db
+def test_only_a_trigger_of_1_profiles(staff_client, settings, tmp_path):
+    settings.PROFILING_DIR = tmp_path
+    assert "X-Profile-Capture" not in staff_client.get("/engagement/student/999999/?_profile=0")
+    assert "X-Profile-Capture" not in staff_client.get("/engagement/student/999999/", HTTP_X_PROFILE="0")
+    assert "X-Profile-Capture" in staff_client.get("/engagement/student/999999/", HTTP_X_PROFILE="1")
+    assert len(list_captures()) == 1
+
+@pytest.mark.django_db
+def test_untriggered_and_non_staff_requests_are_not_profiled(client, settings, tmp_path):
+    settings.PROFILING_DIR = tmp_path
+    assert "X-Profile-Capture" not in client.get("/engagement/student/999999/")
+    client.force_login(User.objects.create(username="student"))
+    response = client.get("/engagement/student/999999/", HTTP_X_PROFILE="1")
+    assert "X-Profile-Capture" not in response
+    assert list_captures() == []
@@ -0,0 +1,95 @@
+"""
+EXPLAIN QUERY PLAN guard for the hot engagement queries in views.py/utils.py.
+The SQL is captured from the real call sites, and the test fails if any
+statement regresses to a full scan of an engagement table.
+"""
+import re
+from contextlib import ExitStack
+from datetime import timedelta
+
+import pytest
+from django.db import connection, connections
+from django.utils import timezone
+
+from engagement.models import (
+    User, TextbookPage, TextbookSlide, UserSlideRead, UserSlideReadSession, RevisionQuestion,
+    RevisionQuestionAttempt, RevisionQuestionAttemptDetail, WritingInteraction
+)
+from engagement.queries import slide_sessions_since, attempt_details_since
+from engagement.utils import aggregate_student_features, build_feature_shard, engaged_users
+from engagement.views import get_dashboard_metrics
+
+FULL_SCAN = re.compile(r"\bSCAN (engagement_\w+)(?! USING (?:COVERING )?INDEX)")
+
+
+def _export_writing(client):
+    response = client.get("/engagement/export/writing/")
+    assert response.status_code == 200
+    b"".join(response.streaming_content)
+
+
+# name: (call, tables it may read in full)
+CALL_SITES = {
+    "get_dashboard_metrics": (lambda client: get_dashboard_metrics(), set()),
+    "aggregate_student_features": (lambda client: aggregate_student_features(1), set()),
+    "build_feature_shard": (lambda client: build_feature_shard((1, 500)), set()),
+    "engaged_users": (lambda client: list(engaged_users().values_list("id", flat=True)), set()),
+    "student_dashboard": (lambda client: client.get("/engagement/student/1/"), set()),
+    # An export streams the whole table by design
+    "export_writing_ndjson": (_export_writing, {"engagement_writinginteraction"}),
+}
+
+
+def _engagement():
+    user = User.objects.create(id=1, username="user_1")
+    page = TextbookPage.objects.create(page_title="P")
+    slide_read = UserSlideRead.objects.create(user=user, slide=TextbookSlide.objects.create(slide_title="S"),
+                                              slide_status="revise")
+    now = timezone.now()
+    UserSlideReadSession.objects.create(slide_read=slide_read, expanded=now - timedelta(minutes=5), read=now)
+    attempt = RevisionQuestionAttempt.objects.create(
+        user=user, question=RevisionQuestion.objects.create(textbook_page=page), viewed=now
+    )
+    RevisionQuestionAttemptDetail.objects.create(attempt=attempt, is_correct=True, timestamp=now)
+    WritingInteraction.objects.create(user_id=1, page_id=page.id, user_input="answer", grade=80)
+
+
+def _captured_selects(call, client):
+    """[(alias, sql, params)] of the SELECTs `call` runs, on whichever connection they go to"""
+    captured = []
+
+    def capture(alias):
+        def wrapper(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith("SELECT"):
+                captured.append((alias, sql, params))
+            return execute(sql, params, many, context)
+        return wrapper
+
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(capture(alias)))
+        call(client)
+    return captured
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="plans are checked on SQLite")
+@pytest.mark.parametrize("name", sorted(CALL_SITES))
+def test_hot_query_uses_index(name, client):
+    _engagement()
+    call, full_reads = CALL_SITES[name]
+    statements = _captured_selects(call, client)
+    assert statements, f"{name} ran no queries"
+    for alias, sql, params in statements:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = "\n".join(row[-1] for row in cursor.fetchall())
+        scans = set(FULL_SCAN.findall(plan)) - full_reads
+        assert not scans, f"{name} full-scans {sorted(scans)}:\n{sql}\n{plan}"
+
+
+@pytest.mark.django_db
+def test_student_filters_skip_parent_join():
+    since = timezone.now() - timedelta(days=30)
+    for queryset in (slide_sessions_since(since, 1), attempt_details_since(since, 1)):
+        assert "JOIN" not in str(queryset.query)
@@ -0,0 +1,34 @@
+import sqlite3
+from engagement import routers
+from engagement.management.commands.snapshot_analytics_db import snapshot_sqlite
+
+
+def test_analytics_reads_use_replica_only_inside_block(monkeypatch):
+    monkeypatch.setattr(routers, "replica_available", lambda: True)
+    router = routers.AnalyticsRouter()
+    assert router.db_for_read(None) is None
+    with routers.analytics_reads():
+        assert router.db_for_read(None) == "analytics"
+        assert router.db_for_write(None) == "default"
+    assert router.db_for_read(None) is None
+
+def test_analytics_reads_fall_back_without_replica(monkeypatch):
+    monkeypatch.setattr(routers, "replica_available", lambda: False)
+    with routers.analytics_reads():
+        assert routers.AnalyticsRouter().db_for_read(None) is None
+
+def test_snapshot_is_consistent_copy(tmp_path):
+    source, target = tmp_path / "primary.sqlite3", tmp_path / "analytics.sqlite3"
+    conn = sqlite3.connect(source)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(100)])
+    conn.commit()
+    snapshot_sqlite(str(source), str(target))
+    conn.execute("INSERT INTO t VALUES (100)")
+    conn.commit()
+    conn.close()
+    copy = sqlite3.connect(target)
+    assert copy.execute("SELECT COUNT(*) FROM t").fetchone() == (100,)
+    assert copy.execute("PRAGMA journal_mode").fetchone() == ("delete",)
+    copy.close()
@@ -0,0 +1,28 @@
+import pytest
+
+from engagement.models import WritingInteraction
+from engagement.search import search_writing, rebuild_index
+
+
+@pytest.mark.django_db
+def test_search_tracks_saves_and_deletes():
+    photo = WritingInteraction.objects.create(page_id=1, user_input="Plants use photosynthesis", openai_response="Good")
+    cells = WritingInteraction.objects.create(page_id=2, user_input="Cells divide", openai_response="Mention photosynthesis")
+    assert set(search_writing("photosynthesis")) == {photo.id, cells.id}
+    assert search_writing("plant") == [photo.id]  # stemmed
+    assert search_writing('photo* ")(') == search_writing("photo*")  # syntax is quoted away
+
+    cells.openai_response = "Mention mitosis"
+    cells.save()
+    assert search_writing("photosynthesis") == [photo.id]
+    photo.delete()
+    assert search_writing("photosynthesis") == []
+    assert rebuild_index() == 1 and search_writing("mitosis") == [cells.id]
+
+@pytest.mark.django_db
+def test_search_endpoint_and_admin(admin_client):
+    w = WritingInteraction.objects.create(page_id=3, user_input="Newton's third law", openai_response="Correct")
+    response = admin_client.get("/engagement/writing/search/", {"q": "newton law"})
+    assert [r["id"] for r in response.json()["results"]] == [w.id]
+    response = admin_client.get("/admin/engagement/writinginteraction/", {"q": "newton"})
+    assert response.status_code == 200 and list(response.context["cl"].result_list) == [w]
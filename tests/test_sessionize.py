@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta, timezone as tz
+
+import numpy as np
+import pytest
+
+from engagement.models import User, TextbookSlide, UserSlideRead, UserSlideReadSession
+from engagement.sessionize import active_seconds, merge_intervals, read_stats_by_student
+from engagement.utils import aggregate_student_features
+
+
+def test_merge_intervals_per_key():
+    keys = [2, 1, 1, 1, 2, 1]
+    starts = [0, 0, 5000, 20000, 1000, 8000]
+    ends = [3000, 10000, 7000, 25000, 2000, 12000]
+    merged = merge_intervals(keys, starts, ends, idle_cap=0)
+    assert [a.tolist() for a in merged] == [[1, 1, 2], [0, 20000, 0], [12000, 25000, 3000]]
+    # With a 4s cap the first key-1 session only covers 0-4s, leaving a gap before 5s
+    assert active_seconds(keys, starts, ends, idle_cap=4) == 4 + 2 + 4 + 4 + 3
+    assert active_seconds(keys, starts, ends, groups=["a", "a", "a", "b", "a", "b"], idle_cap=0) == {"a": 10 + 3, "b": 5 + 4}
+
+
+def test_merge_matches_row_by_row():
+    rng = np.random.default_rng(1)
+    keys = rng.integers(0, 50, 5000)
+    starts = rng.integers(0, 10**7, 5000)
+    ends = starts + rng.integers(0, 10**5, 5000)
+    expected = 0
+    for key in range(50):
+        covered = 0
+        for start, end in sorted(zip(starts[keys == key], ends[keys == key])):
+            covered = max(covered, start)
+            expected += max(0, end - covered)
+            covered = max(covered, end)
+    mk, ms, me = merge_intervals(keys, starts, ends, idle_cap=0)
+    assert int((me - ms).sum()) == expected
+
+
+@pytest.mark.django_db
+def test_overlapping_sessions_are_not_double_counted():
+    user = User.objects.create(username="s")
+    slide_read = UserSlideRead.objects.create(user=user, slide=TextbookSlide.objects.create(slide_title="A"))
+    start = datetime.now(tz.utc) - timedelta(days=1)
+    for offset, length in ((0, 600), (0, 600), (300, 600), (0, 100000)):
+        UserSlideReadSession.objects.create(
+            slide_read=slide_read, expanded=start + timedelta(seconds=offset),
+            collapsed=start + timedelta(seconds=offset + length),
+        )
+    # 0-900s merged; the day-long session is capped at 30 minutes
+    assert read_stats_by_student(UserSlideReadSession.objects.all()) == {user.id: (1800, {slide_read.slide_id})}
+    assert aggregate_student_features(user.id)["time_spent_per_slide"] == 1800
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from engagement.models import User
+from engagement.sketches import FEATURES, QuantileSketch, load_sketches, record_features
+
+
+def test_sketch_quantiles_merge_and_remove():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(3, 1.5, 20000)
+    left, right = QuantileSketch(), QuantileSketch()
+    for value in values[:12000]:
+        left.add(value)
+    for value in values[12000:]:
+        right.add(value)
+    sketch = QuantileSketch.from_dict(left.to_dict()).merge(right)
+
+    assert sketch.count == len(values)
+    ordered = np.sort(values)
+    for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+        # Within the relative accuracy of the value at the same rank
+        exact = ordered[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact + 1e-9
+    assert abs(sketch.percentile_of(np.median(values)) - 50) < 1
+
+    for value in values[12000:]:
+        sketch.remove(value)
+    assert sketch.to_dict() == left.to_dict()
+
+
+@pytest.mark.django_db
+def test_record_features_is_incremental(client):
+    for sid in range(1, 6):
+        User.objects.create(id=sid, username=f"user_{sid}")
+    rows = [{"student_id": sid, **{name: sid * 10.0 for name in FEATURES}} for sid in range(1, 6)]
+    assert record_features(rows) == 5
+    assert record_features(rows) == 0
+
+    # Student 1 moves from the bottom of the cohort to the top
+    rows[0] = {"student_id": 1, **{name: 100.0 for name in FEATURES}}
+    assert record_features(rows[:1]) == 1
+    sketch = load_sketches(30)["time_spent_per_slide"]
+    assert sketch.count == 5
+    assert sketch.quantile(0) == pytest.approx(20, rel=0.01)
+
+    body = client.get("/engagement/cohort/percentiles/?student=1").json()
+    assert body["features"]["revisits"]["count"] == 5
+    assert body["student"]["time_spent_per_slide"] == {"value": 100.0, "percentile": 90.0}
+    assert client.get("/engagement/cohort/percentiles/?student=99").status_code == 404
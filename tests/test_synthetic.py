@@ -0,0 +1,37 @@
+import pytest
+from django.utils import timezone
+
+from engagement.models import (
+    User, TextbookSection, TextbookPage, TextbookSlide,
+    UserSlideReadSession, RevisionQuestionAttemptDetail, WritingInteraction
+)
+from engagement.synthetic import SyntheticSpec, generate_payload, load_synthetic, student_records
+from engagement.views import import_engagement_data
+
+
+def test_student_records_are_seeded_and_independent_of_batching():
+    now = timezone.now()
+    spec = SyntheticSpec(5, sessions_per_student=4, seed=7, now=now)
+    assert student_records(spec, 3) == student_records(SyntheticSpec(50, sessions_per_student=4, seed=7, now=now), 3)
+    assert student_records(spec, 3) != student_records(SyntheticSpec(5, sessions_per_student=4, seed=8, now=now), 3)
+
+@pytest.mark.django_db
+def test_bulk_load_matches_import():
+    spec = SyntheticSpec(4, slides=20, questions=10, sessions_per_student=6, seed=1)
+    import_engagement_data(generate_payload(spec))
+    imported = (
+        sorted(UserSlideReadSession.objects.values_list('id', 'user_id', 'expanded')),
+        sorted(RevisionQuestionAttemptDetail.objects.values_list('id', 'user_id', 'is_correct')),
+        sorted((w.id, w.user_input) for w in WritingInteraction.objects.all()),
+    )
+    for model in (User, TextbookSection, TextbookPage, TextbookSlide, WritingInteraction):
+        model.objects.all().delete()
+
+    counts = load_synthetic(spec)
+    loaded = (
+        sorted(UserSlideReadSession.objects.values_list('id', 'user_id', 'expanded')),
+        sorted(RevisionQuestionAttemptDetail.objects.values_list('id', 'user_id', 'is_correct')),
+        sorted((w.id, w.user_input) for w in WritingInteraction.objects.all()),
+    )
+    assert counts['user_slide_sessions'] == 24
+    assert loaded == imported
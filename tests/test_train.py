@@ -0,0 +1,134 @@
+import json
+import sys
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from django.core.management import call_command
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "ml_model"))
+import train  # noqa: E402
+
+
+def _dataset(path, rows=120, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "student_id": np.arange(1, rows + 1),
+        "time_spent_per_slide": rng.uniform(1, 100, rows),
+        "average_accuracy_per_page": rng.uniform(0, 1, rows),
+        "attempt_count_per_question": rng.integers(1, 5, rows),
+        "revisits": rng.integers(0, 3, rows),
+    })
+    df["score"] = df["time_spent_per_slide"] + rng.normal(size=rows)
+    df.to_csv(path, index=False)
+    return df
+
+
+def _forest(dataset_path, model_path, trees=5):
+    X, y, _ = train.load_dataset(dataset_path)
+    model = RandomForestRegressor(n_estimators=trees, random_state=0).fit(X, y)
+    train.joblib.dump(model, model_path)
+
+
+def test_search_picks_best_candidate(tmp_path):
+    _dataset(tmp_path / "dataset.csv")
+    X, y, _ = train.load_dataset(tmp_path / "dataset.csv")
+    space = {"ridge": {"alpha": [0.1, 1.0, 1e6]}}
+    best, summary = train.search_models(X, y, search_space=space, cv=3, n_jobs=1)
+    assert summary["n_evaluated"] == summary["n_candidates"] == 3
+    assert best["params"]["alpha"] != 1e6
+    assert best["cv_mean"] == max(t["cv_mean"] for t in summary["trials"])
+
+
+def test_search_stops_at_time_budget(monkeypatch):
+    clock = SimpleNamespace(now=0.0)
+
+    def evaluate(family, params, X, y, cv, metric):
+        # Each candidate takes one second of the fake clock
+        clock.now += 1
+        return {"family": family, "params": params, "cv_mean": params["alpha"], "cv_std": 0.0, "seconds": 1}
+
+    monkeypatch.setattr(train, "time", SimpleNamespace(perf_counter=lambda: clock.now))
+    monkeypatch.setattr(train, "_evaluate_candidate", evaluate)
+    X, y = pd.DataFrame({"a": range(10)}), pd.Series(range(10))
+    space = {"ridge": {"alpha": [1, 2, 3, 4, 5]}}
+    best, summary = train.search_models(X, y, search_space=space, n_jobs=1, time_budget=2.5)
+    assert summary["n_candidates"] == 5
+    assert summary["n_evaluated"] == 3
+    assert best["params"]["alpha"] == 3
+
+
+def test_fingerprint_ignores_row_order(tmp_path):
+    df = _dataset(tmp_path / "a.csv")
+    df.sample(frac=1, random_state=1).to_csv(tmp_path / "b.csv", index=False)
+    df.iloc[:-1].to_csv(tmp_path / "c.csv", index=False)
+    fingerprint = train.dataset_fingerprint(tmp_path / "a.csv", chunksize=17)
+    assert train.dataset_fingerprint(tmp_path / "b.csv") == fingerprint
+    assert train.dataset_fingerprint(tmp_path / "c.csv") != fingerprint
+
+
+def test_incremental_adds_trees(tmp_path):
+    dataset = tmp_path / "dataset.csv"
+    _dataset(dataset)
+    _forest(dataset, tmp_path / "previous.pkl")
+    model, metrics, _ = train.train_incremental(
+        dataset, tmp_path / "previous.pkl", {"fit_seconds_per_tree": 0.1}, tmp_path, add_trees=3, n_jobs=1
+    )
+    assert len(model.estimators_) == 8
+    assert metrics["incremental"]["previous_trees"] == 5
+    assert metrics["optimistic_evaluation"] is True
+    assert json.loads((tmp_path / "metrics.json").read_text())["optimistic_evaluation"] is True
+
+    model, metrics, _ = train.train_incremental(
+        dataset, tmp_path / "model.pkl", output_dir=tmp_path, add_trees=3, max_trees=6, n_jobs=1
+    )
+    assert len(model.estimators_) == 6
+
+
+def test_incremental_falls_back_to_full_retrain(tmp_path):
+    dataset = tmp_path / "dataset.csv"
+    _dataset(dataset)
+    X, y, _ = train.load_dataset(dataset)
+    train.joblib.dump(Ridge().fit(X, y), tmp_path / "previous.pkl")
+    for previous in ("previous.pkl", "missing.pkl"):
+        model, metrics, _ = train.train_incremental(dataset, tmp_path / previous, output_dir=tmp_path, n_jobs=1)
+        assert "incremental" not in metrics
+        assert "optimistic_evaluation" not in metrics
+        assert len(model.estimators_) == train.DEFAULT_MODEL_PARAMS["n_estimators"]
+
+
+def test_iter_dataset_chunks(tmp_path):
+    df = _dataset(tmp_path / "dataset.csv", rows=50)
+    chunks = list(train.iter_dataset_chunks(tmp_path / "dataset.csv", chunksize=20))
+    assert [len(c) for c in chunks] == [20, 20, 10]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), df)
+
+
+@pytest.mark.parametrize("learner", ["forest", "sgd"])
+def test_streaming_training(tmp_path, learner):
+    dataset = tmp_path / "dataset.csv"
+    _dataset(dataset, rows=200)
+    model, metrics, _ = train.train_streaming(
+        dataset, tmp_path, chunksize=50, learner=learner, trees_per_chunk=2, n_jobs=1
+    )
+    assert metrics["n_train"] + metrics["n_test"] == 200
+    assert 0 < metrics["n_test"] < 100
+    assert metrics["r2"] > 0.8
+    assert metrics["data_fingerprint"] == train.dataset_fingerprint(dataset)
+    if learner == "forest":
+        assert len(model.estimators_) == 8
+    # The holdout is keyed on student_id, so a rerun evaluates the same rows
+    _, rerun, _ = train.train_streaming(dataset, tmp_path, chunksize=30, learner=learner, n_jobs=1)
+    assert rerun["n_test"] == metrics["n_test"]
+
+
+@pytest.mark.django_db
+def test_forced_retrain_without_data_stops():
+    out = StringIO()
+    call_command("retrain_model", force=True, stdout=out)
+    assert "cannot retrain without data" in out.getvalue()
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from engagement import model_store
+from engagement.ingest import ingest_ndjson
+from engagement.model_store import ModelStore
+from engagement.models import User
+from engagement.versions import DATA, MODEL, bump
+
+FEATURES = ["time_spent_per_slide", "average_accuracy_per_page", "attempt_count_per_question", "revisits"]
+
+
+def event(event_type, key, **data):
+    return json.dumps({"type": event_type, "key": key, "data": data})
+
+
+@pytest.mark.django_db
+def test_student_dashboard_revalidates_per_student(client):
+    for sid in (1, 2):
+        User.objects.create(id=sid, username=f"user_{sid}")
+    first = client.get("/engagement/student/1/")
+    other = client.get("/engagement/student/2/")
+    assert first.status_code == 200 and first["ETag"]
+    assert client.get("/engagement/student/1/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 304
+
+    # A push batch for student 2 leaves student 1's page valid
+    body = "\n".join([
+        event("section", "s1", id=1, section_title="S"),
+        event("page", "p1", id=1, page_title="P", sections=[1]),
+        event("slide", "sl1", id=1, pages=[1]),
+        event("user_slide_read", "r1", id=1, user=2, slide=1),
+    ]).encode()
+    ingest_ndjson(body)
+    assert client.get("/engagement/student/1/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 304
+    assert client.get("/engagement/student/2/", HTTP_IF_NONE_MATCH=other["ETag"]).status_code == 200
+
+
+@pytest.fixture
+def published_model(settings, tmp_path):
+    """A small forest published to a scratch model store"""
+    import joblib
+    import numpy as np
+    import pandas as pd
+    from sklearn.ensemble import RandomForestRegressor
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.random((100, 4)), columns=FEATURES)
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, rng.random(100))
+    artifacts = tmp_path / "artifacts"
+    artifacts.mkdir()
+    joblib.dump(model, artifacts / "model.pkl")
+    (artifacts / "metrics.json").write_text(json.dumps({}))
+    settings.MODEL_STORE_DIR = tmp_path / "store"
+    ModelStore().publish(artifacts, FEATURES, model=model)
+    model_store._model_cache.update(version=None, model=None)
+    yield model
+    model_store._model_cache.update(version=None, model=None)
+
+
+@pytest.mark.django_db
+def test_model_publish_invalidates_predictions(client, published_model):
+    User.objects.create(id=1, username="user_1")
+    first = client.get("/engagement/predict/1/")
+    assert first.status_code == 200, first.content
+    assert client.get("/engagement/predict/1/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 304
+    bump(DATA)
+    assert client.get("/engagement/predict/1/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 304
+    bump(MODEL)
+    again = client.get("/engagement/predict/1/", HTTP_IF_NONE_MATCH=first["ETag"])
+    assert again.status_code == 200 and again["ETag"] != first["ETag"]
+
+
+@pytest.mark.django_db
+def test_errors_carry_no_validators(client, published_model):
+    missing = client.get("/engagement/predict/999/")
+    assert missing.status_code == 404
+    assert not missing.has_header("ETag") and not missing.has_header("Last-Modified")
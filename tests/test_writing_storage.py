@@ -0,0 +1,32 @@
+import json
+import zlib
+
+import pytest
+from django.db import connection
+
+from engagement.models import WritingInteraction
+
+
+@pytest.mark.django_db
+def test_bodies_are_compressed_and_loaded_on_demand(django_assert_num_queries):
+    essay = "energy is transferred " * 200
+    w = WritingInteraction.objects.create(page_id=1, user_id=7, grade=5, user_input=essay, openai_response="ok")
+    WritingInteraction.objects.update_or_create(id=w.id, defaults={"openai_response": "better", "grade": 6})
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT user_input FROM engagement_writinginteractionbody WHERE interaction_id = %s", [w.id])
+        stored = bytes(cursor.fetchone()[0])
+    assert len(stored) < len(essay) / 10 and zlib.decompress(stored).decode() == essay
+
+    with django_assert_num_queries(1):
+        loaded = WritingInteraction.objects.get(id=w.id)
+    with django_assert_num_queries(1):
+        assert (loaded.user_input, loaded.openai_response, loaded.grade) == (essay, "better", 6)
+
+@pytest.mark.django_db
+def test_export_writing_streams_ndjson(client):
+    WritingInteraction.objects.create(page_id=1, user_input="a", openai_response="b")
+    WritingInteraction.objects.create(page_id=2)
+    response = client.get("/engagement/export/writing/")
+    rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+    assert [(r["page_id"], r["user_input"]) for r in rows] == [(1, "a"), (2, "")]